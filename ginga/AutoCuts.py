@@ -4,6 +4,7 @@
 # This is open-source software licensed under a BSD license.
 # Please see the file LICENSE.txt for details.
 #
+import math
 import numpy
 import time
 import threading
@@ -47,8 +48,44 @@ class AutoCutsBase(object):
     def get_algorithms(self):
         return autocut_methods
 
+    def get_cache_key(self):
+        """
+        Return a key identifying this algorithm and its parameters, for
+        caching the cut levels it calculates (see get_autocut_levels()).
+        """
+        params = [(param.name, getattr(self, param.name, None))
+                  for param in self.get_params_metadata()]
+        return (self.__class__.__name__, self.crop_radius) + tuple(params)
+
     def get_autocut_levels(self, image):
-        loval, hival = self.calc_cut_levels(image)
+        """
+        Get the cut levels for `image`, like calc_cut_levels(), but reuse
+        the levels calculated earlier by the same algorithm with the same
+        parameters if the data has not changed since (i.e. the image's
+        'modified' callback has not been made).
+
+        The levels are kept in the image metadata, so that they are
+        shared by all the viewers and plugins showing the image.
+        """
+        try:
+            key = self.get_cache_key()
+            hash(key)
+        except TypeError:
+            # unhashable parameter values
+            return self.calc_cut_levels(image)
+
+        # results are only valid for the current data of the image
+        data_key = (id(image.get_data()), image.get_data_version())
+        cache = image.get('autocut_cache', None)
+        if (cache is None) or (cache.data_key != data_key):
+            cache = Bunch.Bunch(data_key=data_key, levels={})
+            image.set(autocut_cache=cache)
+
+        levels = cache.levels.get(key, None)
+        if levels is None:
+            levels = self.calc_cut_levels(image)
+            cache.levels[key] = levels
+        loval, hival = levels
         return loval, hival
 
     def get_crop(self, image, crop_radius=None):
@@ -64,6 +101,25 @@ class AutoCutsBase(object):
                                                      crop_radius)
         return data
 
+    def get_sample(self, data, num_samples):
+        # Unlike a crop of the center, a sample represents the whole
+        # image (e.g. a wide field mosaic) at a bounded cost: the array is
+        # divided into equal tiles and one value is taken from a random
+        # position in each tile (stratified sampling).  The positions are
+        # the same each time, so that the results are repeatable.
+        ht, wd = data.shape[:2]
+        if ht * wd <= num_samples:
+            return data
+
+        step = int(math.ceil(math.sqrt(float(ht * wd) / num_samples)))
+        ys = numpy.arange(0, ht, step).reshape(-1, 1)
+        xs = numpy.arange(0, wd, step).reshape(1, -1)
+        shape = (ys.shape[0], xs.shape[1])
+        rs = numpy.random.RandomState(0)
+        yi = numpy.minimum(ys + rs.randint(0, step, size=shape), ht - 1)
+        xi = numpy.minimum(xs + rs.randint(0, step, size=shape), wd - 1)
+        return data[yi, xi]
+
     def cut_levels(self, data, loval, hival, vmin=0.0, vmax=255.0):
         loval, hival = float(loval), float(hival)
         self.logger.debug("loval=%.2f hival=%.2f" % (loval, hival))
@@ -131,18 +187,30 @@ class Histogram(AutoCutsBase):
             Param(name='numbins', type=int,
                   min=100, max=10000, default=2048,
                   description="Number of bins for the histogram"),
+            Param(name='usesample', type=_bool,
+                  valid=[True, False],
+                  default=False,
+                  description="Use a sample of the whole image for speed (instead of a crop)"),
+            Param(name='num_samples', type=int,
+                  min=1000, max=100000000, default=1000000,
+                  description="Number of values in the sample of the image"),
             ]
 
-    def __init__(self, logger, usecrop=True, pct=0.999, numbins=2048):
+    def __init__(self, logger, usecrop=True, pct=0.999, numbins=2048,
+                 usesample=False, num_samples=1000000):
         super(Histogram, self).__init__(logger)
 
         self.kind = 'histogram'
         self.usecrop = usecrop
         self.pct = pct
         self.numbins = numbins
+        self.usesample = usesample
+        self.num_samples = num_samples
 
     def calc_cut_levels(self, image):
-        if self.usecrop:
+        if self.usesample:
+            data = self.get_sample(image.get_data(), self.num_samples)
+        elif self.usecrop:
             data = self.get_crop(image)
         else:
             data = image.get_data()
@@ -159,31 +227,27 @@ class Histogram(AutoCutsBase):
         self.logger.debug("Median analysis array is %dx%d" % (
             width, height))
 
-        total_px = width * height
-        dsum = numpy.sum(data)
-        if numpy.isnan(dsum) or numpy.isinf(dsum):
-            # Oh crap, the array has a NaN or Inf value.
-            # We have to workaround this by making a copy of the array
-            # and substituting for the problem values, otherwise numpy's
-            # histogram() cannot handle it
-            self.logger.warning("NaN's found in data, using workaround for histogram")
-            data = data.copy()
-            # TODO: calculate a reasonable replacement value
-            data[numpy.isinf(data)] = 0.0
-            minval = numpy.nanmin(data)
-            maxval = numpy.nanmax(data)
-            substval = (minval + maxval)/2.0
-            data[numpy.isnan(data)] = substval
-            data[numpy.isinf(data)] = substval
-            ## dsum = numpy.sum(data)
-            ## if numpy.isnan(dsum) or numpy.isinf(dsum):
-            ##     print "NaNs STILL PRESENT"
-
-            dist, bins = numpy.histogram(data, bins=numbins,
-                                         density=False)
+        if data.dtype.kind in ('i', 'u'):
+            dist, bins = self._int_histogram(data, numbins)
+            total_px = data.size
+
         else:
-            dist, bins = numpy.histogram(data, bins=numbins,
-                                         density=False)
+            # Only the finite values are counted.  numpy's histogram()
+            # cannot calculate its own range if there are NaN or Inf values,
+            # but given a range it skips them, so the data is not copied.
+            finite = numpy.isfinite(data)
+            total_px = numpy.count_nonzero(finite)
+            if total_px == data.size:
+                dist, bins = numpy.histogram(data, bins=numbins,
+                                             density=False)
+            else:
+                self.logger.debug("NaN or Inf values found in data, "
+                                  "histogramming finite values only")
+                minval, maxval = self._finite_minmax(data, finite, total_px)
+                with numpy.errstate(invalid='ignore'):
+                    dist, bins = numpy.histogram(data, bins=numbins,
+                                                 range=(minval, maxval),
+                                                 density=False)
 
         cutoff = int((float(total_px)*(1.0-pct))/2.0)
         top = len(dist)-1
@@ -247,6 +311,46 @@ class Histogram(AutoCutsBase):
         return Bunch.Bunch(dist=dist, bins=bins, loval=loval, hival=hival,
                            loidx=loidx, hiidx=hiidx)
 
+    def _int_histogram(self, data, numbins):
+        # Integer data is counted with a single bincount of the values
+        # offset by the minimum, and the counts are then combined into
+        # the same bins that numpy's histogram() would use.
+        minval, maxval = int(data.min()), int(data.max())
+        span = maxval - minval
+        if span == 0 or span >= max(data.size, 1 << 20):
+            # too few values to bin, or too many to count
+            return numpy.histogram(data, bins=numbins, density=False)
+
+        counts = numpy.bincount(numpy.subtract(data, minval,
+                                               dtype=numpy.intp).ravel(),
+                                minlength=span + 1)
+        # bin each distinct value as numpy does: scale it to a bin index
+        # and then correct the index against the float bin edges, so that
+        # values on or near an edge fall in the same bin
+        bins = numpy.linspace(minval, maxval, numbins + 1)
+        vals = numpy.arange(span + 1, dtype=numpy.float64)
+        idx = (vals * (numbins / float(span))).astype(numpy.intp)
+        idx[idx == numbins] -= 1
+        vals += minval
+        idx[vals < bins[idx]] -= 1
+        idx[(vals >= bins[idx + 1]) & (idx != numbins - 1)] += 1
+        dist = numpy.bincount(idx, weights=counts,
+                              minlength=numbins).astype(numpy.intp)
+        return dist, bins
+
+    def _finite_minmax(self, data, finite, count):
+        # `count` is the number of finite values
+        if count == 0:
+            # (nanmin() and nanmax() would warn about an all-NaN slice)
+            return 0.0, 0.0
+        minval, maxval = numpy.nanmin(data), numpy.nanmax(data)
+        if not (numpy.isfinite(minval) and numpy.isfinite(maxval)):
+            # there are Inf values, so the range has to come from
+            # the finite values themselves
+            vals = data[finite]
+            minval, maxval = vals.min(), vals.max()
+        return float(minval), float(maxval)
+
 
 class StdDev(AutoCutsBase):
 
@@ -43,10 +43,23 @@ class BaseImage(Callback.Callbacks):
 
         self.autocuts = AutoCuts.Histogram(self.logger)
 
+        # multi-resolution pyramid of downsampled data (see
+        # get_pyramid_level()); levels are built lazily, on demand
+        self.use_pyramid = False
+        self.pyramid_min_size = 16
+        self._pyramid = []
+
+        # counts the changes to the data (see get_data_version())
+        self._data_version = 0
+
         # For callbacks
         for name in ('modified', ):
             self.enable_callback(name)
 
+        # any change to the data invalidates the pyramid and bumps the
+        # data version
+        self.add_callback('modified', self._data_modified_cb)
+
     @property
     def shape(self):
         return self._get_data().shape
@@ -213,6 +226,56 @@ class BaseImage(Callback.Callbacks):
         except:
             self.minval_noinf = self.minval
 
+    def enable_pyramid(self, tf):
+        """Enable or disable the use of a multi-resolution pyramid
+        for scaled cutouts.
+
+        When enabled, cutouts at scales of 0.5 or less are taken from
+        the closest coarser (2x, 4x, 8x, ...) downsampled level of the
+        data, so that the cost of a zoomed out cutout is proportional
+        to the size of the result and not to the size of the image.
+        """
+        self.use_pyramid = tf
+        self._pyramid = []
+
+    def _data_modified_cb(self, image):
+        self._pyramid = []
+        self._data_version += 1
+
+    def get_data_version(self):
+        """Return a number that changes whenever the data is modified
+        (i.e. the 'modified' callback is made), for keying results
+        calculated from the data.
+        """
+        return self._data_version
+
+    def get_pyramid_level(self, scale):
+        """Get the pyramid level of the data suitable for producing a
+        cutout at `scale`.
+
+        Returns a tuple of (data, factor), where `data` is the level
+        and `factor` is the power of 2 by which it has been downsampled
+        (1 is the original data).  Levels are built lazily and cached
+        until the image is modified.
+        """
+        data = self._get_data()
+        factor = 1
+        if (not self.use_pyramid) or (scale <= 0.0):
+            return (data, factor)
+
+        level = 0
+        while scale * factor * 2 <= 1.0:
+            if level >= len(self._pyramid):
+                ht, wd = data.shape[:2]
+                if min(wd, ht) < 2 * self.pyramid_min_size:
+                    break
+                self._pyramid.append(numpy.ascontiguousarray(data[::2, ::2]))
+            data = self._pyramid[level]
+            factor *= 2
+            level += 1
+
+        return (data, factor)
+
     def get_minmax(self, noinf=False):
         if not noinf:
             return (self.minval, self.maxval)
@@ -348,6 +411,11 @@ class BaseImage(Callback.Callbacks):
         default "basic" is nearest neighbor.
         """
 
+        if self.use_pyramid:
+            return self._get_scaled_cutout_pyramid(x1, y1, x2, y2,
+                                                   new_wd, new_ht,
+                                                   method=method)
+
         if method in ('basic', 'view'):
             shp = self.shape
 
@@ -367,6 +435,39 @@ class BaseImage(Callback.Callbacks):
         res = Bunch.Bunch(data=newdata, scale_x=scale_x, scale_y=scale_y)
         return res
 
+    def _get_scaled_cutout_pyramid(self, x1, y1, x2, y2, new_wd, new_ht,
+                                   method='basic'):
+        """Like get_scaled_cutout_wdht(), but extracts the cutout from
+        the closest coarser level of the pyramid.
+        """
+        old_wd, old_ht = max(x2 - x1 + 1, 1), max(y2 - y1 + 1, 1)
+        scale = max(float(new_wd) / old_wd, float(new_ht) / old_ht)
+        data_np, factor = self.get_pyramid_level(scale)
+        if factor > 1:
+            x1, y1 = x1 // factor, y1 // factor
+            x2, y2 = x2 // factor, y2 // factor
+
+        if method in ('basic', 'view'):
+            (view, (scale_x, scale_y)) = \
+                   trcalc.get_scaled_cutout_wdht_view(data_np.shape,
+                                                      x1, y1, x2, y2,
+                                                      new_wd, new_ht)
+            newdata = data_np[view]
+
+        else:
+            (newdata, (scale_x, scale_y)) = \
+                      trcalc.get_scaled_cutout_wdht(data_np, x1, y1, x2, y2,
+                                                    new_wd, new_ht,
+                                                    interpolation=method,
+                                                    logger=self.logger)
+
+        # report scale relative to the full resolution data
+        ht, wd = newdata.shape[:2]
+        scale_x, scale_y = float(wd) / old_wd, float(ht) / old_ht
+
+        res = Bunch.Bunch(data=newdata, scale_x=scale_x, scale_y=scale_y)
+        return res
+
     def get_scaled_cutout_basic(self, x1, y1, x2, y2, scale_x, scale_y,
                                 method='basic'):
         """Extract a region of the image defined by corners (x1, y1) and
@@ -384,9 +485,10 @@ class BaseImage(Callback.Callbacks):
 
     def get_scaled_cutout(self, x1, y1, x2, y2, scale_x, scale_y,
                           method='basic', logger=None):
-        if method == 'basic':
+        if method == 'basic' or self.use_pyramid:
             return self.get_scaled_cutout_basic(x1, y1, x2, y2,
-                                                scale_x, scale_y)
+                                                scale_x, scale_y,
+                                                method=method)
 
         data = self._get_data()
         newdata, (scale_x, scale_y) = trcalc.get_scaled_cutout_basic(
@@ -633,6 +633,7 @@ class ImageViewBindings(object):
         viewer.cut_levels(loval, hival)
 
     def _adjust_cuts(self, viewer, direction, pct, msg=True):
+        self._note_interaction(viewer)
         direction = self.get_direction(direction)
         if direction == 'up':
             self._cut_pct(viewer, pct, msg=msg)
@@ -640,6 +641,7 @@ class ImageViewBindings(object):
             self._cut_pct(viewer, -pct, msg=msg)
 
     def _scale_image(self, viewer, direction, factor, msg=True):
+        self._note_interaction(viewer)
         msg = self.settings.get('msg_zoom', msg)
         rev = self.settings.get('zoom_scroll_reverse', False)
         scale_x, scale_y = viewer.get_scale_xy()
@@ -844,6 +846,13 @@ class ImageViewBindings(object):
         self._ispanning = False
         viewer.switch_cursor('pick')
 
+    def _note_interaction(self, viewer):
+        """Mark a single interactive change of the view (e.g. one step
+        of a scroll); see ImageViewBase.start_interaction().
+        """
+        viewer.start_interaction()
+        viewer.end_interaction()
+
     def pan_start(self, viewer, ptype=1):
         # If already panning then ignore multiple keystrokes
         if self._ispanning:
@@ -851,6 +860,7 @@ class ImageViewBindings(object):
         self._pantype = ptype
         viewer.switch_cursor('pan')
         self._ispanning = True
+        viewer.start_interaction()
 
     def pan_set_origin(self, viewer, win_x, win_y, data_x, data_y):
         self._start_x, self._start_y = viewer.window_to_offset(win_x, win_y)
@@ -858,6 +868,7 @@ class ImageViewBindings(object):
 
     def pan_stop(self, viewer):
         self._ispanning = False
+        viewer.end_interaction()
         self._start_x = None
         self._pantype = 1
         self.to_default_mode(viewer)
@@ -1271,6 +1282,7 @@ class ImageViewBindings(object):
             self._zoom_xy(viewer, x, y)
 
         elif event.state == 'down':
+            viewer.start_interaction()
             if msg:
                 viewer.onscreen_message("Zoom (drag mouse L-R)",
                                            delay=1.0)
@@ -1278,6 +1290,7 @@ class ImageViewBindings(object):
 
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
     def _scale_adjust(self, factor, zoom_accel, max_limit=None):
@@ -1354,6 +1367,7 @@ class ImageViewBindings(object):
             self._rotate_xy(viewer, x, y)
 
         elif event.state == 'down':
+            viewer.start_interaction()
             if msg:
                 viewer.onscreen_message("Rotate (drag mouse L-R)",
                                            delay=1.0)
@@ -1362,6 +1376,7 @@ class ImageViewBindings(object):
 
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
 
@@ -1391,12 +1406,14 @@ class ImageViewBindings(object):
             self._tweak_colormap(viewer, x, y, 'preview')
 
         elif event.state == 'down':
+            viewer.start_interaction()
             self._start_x, self._start_y = x, y
             if msg:
                 viewer.onscreen_message("Shift and stretch colormap (drag mouse)",
                                            delay=1.0)
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
 
@@ -1424,12 +1441,14 @@ class ImageViewBindings(object):
             self._rotate_colormap(viewer, x, y, 'preview')
 
         elif event.state == 'down':
+            viewer.start_interaction()
             self._start_x, self._start_y = x, y
             if msg:
                 viewer.onscreen_message("Rotate colormap (drag mouse L/R)",
                                            delay=1.0)
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
 
@@ -1496,11 +1515,13 @@ class ImageViewBindings(object):
             self._cutlow_xy(viewer, x, y)
 
         elif event.state == 'down':
+            viewer.start_interaction()
             self._start_x, self._start_y = x, y
             self._loval, self._hival = viewer.get_cut_levels()
 
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
     def ms_cuthi(self, viewer, event, data_x, data_y):
@@ -1514,11 +1535,13 @@ class ImageViewBindings(object):
             self._cuthigh_xy(viewer, x, y)
 
         elif event.state == 'down':
+            viewer.start_interaction()
             self._start_x, self._start_y = x, y
             self._loval, self._hival = viewer.get_cut_levels()
 
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
     def ms_cutall(self, viewer, event, data_x, data_y):
@@ -1534,13 +1557,15 @@ class ImageViewBindings(object):
             self._cutboth_xy(viewer, x, y)
 
         elif event.state == 'down':
+            viewer.start_interaction()
             self._start_x, self._start_y = x, y
             image = viewer.get_image()
             #self._loval, self._hival = viewer.get_cut_levels()
-            self._loval, self._hival = self.autocuts.calc_cut_levels(image)
+            self._loval, self._hival = self.autocuts.get_autocut_levels(image)
 
         else:
             viewer.onscreen_message(None)
+            viewer.end_interaction()
         return True
 
     def ms_cut_auto(self, viewer, event, data_x, data_y, msg=True):
@@ -1585,6 +1610,7 @@ class ImageViewBindings(object):
         return True
 
     def zoom_step(self, viewer, event, msg=True, origin=None, adjust=1.5):
+        self._note_interaction(viewer)
 
         with viewer.suppress_redraw:
 
@@ -1679,6 +1705,7 @@ class ImageViewBindings(object):
         """
         if not self.canpan:
             return True
+        self._note_interaction(viewer)
 
         # User has "Pan Reverse" preference set?
         rev = self.settings.get('pan_reverse', False)
@@ -1750,9 +1777,12 @@ class ImageViewBindings(object):
     def gs_pinch(self, viewer, state, rot_deg, scale, msg=True):
         pinch_actions = self.settings.get('pinch_actions', [])
         if state == 'start':
+            viewer.start_interaction()
             self._start_scale_x, self._start_scale_y = viewer.get_scale_xy()
             self._start_rot = viewer.get_rotation()
         else:
+            if state == 'end':
+                viewer.end_interaction()
             msg_str = None
             if self.canzoom and ('zoom' in pinch_actions):
                 scale_accel = self.settings.get('pinch_zoom_acceleration', 1.0)
@@ -1799,8 +1829,11 @@ class ImageViewBindings(object):
 
     def gs_rotate(self, viewer, state, rot_deg, msg=True):
         if state == 'start':
+            viewer.start_interaction()
             self._start_rot = viewer.get_rotation()
         else:
+            if state == 'end':
+                viewer.end_interaction()
             msg_str = None
             if self.canrotate:
                 deg = self._start_rot - rot_deg
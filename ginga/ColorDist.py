@@ -264,38 +264,82 @@ class HistogramEqualizationDist(ColorDistBase):
     """
     The histogram equalization distribution function distributes colors
     based on the frequency of each data value.
+
+    By default the equalization table is calculated from each index
+    array passed to hash_array().  A caller that knows where the data
+    comes from can instead calculate it once with calc_hash_from() and a
+    key (e.g. identifying the image, its cut levels and data version);
+    the table is then used for the arrays passed to hash_array() with
+    the same key, until it is calculated again.
+
+    If `whole_image` is True, viewers calculate the table from a
+    subsample of at most `sample_size` values of the whole image, rather
+    than from the part of it being shown, so that the colors stay the
+    same while panning and zooming.
     """
 
-    def __init__(self, hashsize, colorlen=None):
+    def __init__(self, hashsize, colorlen=None, whole_image=False,
+                 sample_size=512*512):
+        self.whole_image = whole_image
+        self.sample_size = sample_size
         super(HistogramEqualizationDist, self).__init__(hashsize,
                                                          colorlen=colorlen)
 
     def calc_hash(self):
-        pass
-
-    # TODO: this method has a lot more overhead compared to the other
-    # scaling methods because the hash array must be computed each time
-    # the data is delivered to hash_array()--in the other scaling
-    # methods it is precomputed in calc_hash().  Investigate whether
-    # there is a way to make this more efficient.
-    #
-    def hash_array(self, idx):
+        # the table depends on the data (see calc_hash_from())
+        self.hash = None
+        self.hash_key = None
+
+    def calc_hash_from(self, idx, key=None):
+        """Calculate the equalization table from the index array `idx`.
+        If `key` is not None the table is kept for later arrays with the
+        same key (see hash_array()), until this is called again.
+        """
+        self.hash = self._calc_table(idx)
+        self.hash_key = key
+        self.check_hash()
+
+    def _calc_table(self, idx):
         # NOTE: data could be assumed to be in the range 0..hashsize-1
         # at this point but clip as a precaution
-        idx = idx.clip(0, self.hashsize-1)
+        idx = idx.clip(0, self.hashsize-1).ravel()
+        # bincount needs native integer indexes; values are small enough
+        # that unsigned ones of the same size can simply be viewed as such
+        if ((idx.dtype.kind == 'u') and
+            (idx.dtype.itemsize == numpy.dtype(numpy.intp).itemsize)):
+            idx = idx.view(numpy.intp)
+        else:
+            idx = idx.astype(numpy.intp)
 
         #get image histogram
-        hist, bins = numpy.histogram(idx.flatten(),
-                                     self.hashsize, density=False)
+        hist = numpy.bincount(idx, minlength=self.hashsize)
         cdf = hist.cumsum()
 
         # normalize to color range
-        l = (cdf - cdf.min()) * (self.colorlen - 1) / (
-            cdf.max() - cdf.min())
-        self.hash = l.astype(numpy.uint)
-        self.check_hash()
+        rng = max(cdf[-1] - cdf[0], 1)
+        l = (cdf - cdf[0]) * (self.colorlen - 1) / float(rng)
+        return l.astype(numpy.uint)
+
+    def get_hash_key(self):
+        return self.hash_key
+
+    def hash_array(self, idx, hash_key=None):
+        """Equalize the index array `idx`, with the table kept for
+        `hash_key` (see calc_hash_from()) if that is the table kept, and
+        otherwise with a table calculated from `idx` itself.
+        """
+        # NOTE: data could be assumed to be in the range 0..hashsize-1
+        # at this point but clip as a precaution
+        idx = idx.clip(0, self.hashsize-1)
 
-        arr = self.hash[idx]
+        if (hash_key is not None) and (hash_key == self.hash_key):
+            hash = self.hash
+        else:
+            # no table kept for this data--calculate it from the array,
+            # leaving any kept table alone
+            hash = self._calc_table(idx)
+
+        arr = hash[idx]
         return arr
 
     def get_dist_pct(self, pct):
@@ -13,7 +13,7 @@ import sys
 import traceback
 import time
 
-from ginga.misc import Callback, Settings
+from ginga.misc import Callback, Settings, BufferPool, RenderStats, Task
 from ginga import RGBMap, AstroImage, AutoCuts, ColorDist
 from ginga import cmap, imap, trcalc, version
 from ginga.canvas import coordmap
@@ -35,6 +35,32 @@ class ImageViewNoDataError(ImageViewError):
     pass
 
 
+def _apply_linear(a, b, c, d, x, y):
+    """Apply the 2x2 matrix ``((a, b), (c, d))`` to the points `x`, `y`.
+    Zero terms are skipped, so that without rotation the result is
+    exactly that of the step by step transforms.
+    """
+    if b == 0 and c == 0:
+        return (a * x, d * y)
+    if a == 0 and d == 0:
+        return (b * y, c * x)
+    return (a * x + b * y, c * x + d * y)
+
+
+def _render_attr(name):
+    """Make a property for the viewer attribute `name`, which is part of
+    the state written by making an RGB image (see
+    ImageViewBase._get_render_geom()).
+    """
+    def _get(self):
+        return self._get_render_geom()[name]
+
+    def _set(self, val):
+        self._get_render_geom()[name] = val
+
+    return property(_get, _set)
+
+
 class ImageViewBase(Callback.Callbacks):
     """An abstract base class for displaying images represented by
     Numpy data arrays.
@@ -57,9 +83,32 @@ class ImageViewBase(Callback.Callbacks):
         Viewer preferences. If not given, one will be created.
 
     """
+    # the geometry of the RGB image (and whether it is a draft), which is
+    # written while making it (see _get_render_geom())
+    _org_x = _render_attr('_org_x')
+    _org_y = _render_attr('_org_y')
+    _org_xoff = _render_attr('_org_xoff')
+    _org_yoff = _render_attr('_org_yoff')
+    _org_x1 = _render_attr('_org_x1')
+    _org_y1 = _render_attr('_org_y1')
+    _org_x2 = _render_attr('_org_x2')
+    _org_y2 = _render_attr('_org_y2')
+    _org_scale_x = _render_attr('_org_scale_x')
+    _org_scale_y = _render_attr('_org_scale_y')
+    _dst_x = _render_attr('_dst_x')
+    _dst_y = _render_attr('_dst_y')
+    _tform = _render_attr('_tform')
+    _tform_key = _render_attr('_tform_key')
+    _draft = _render_attr('_draft')
+
     def __init__(self, logger=None, rgbmap=None, settings=None):
         Callback.Callbacks.__init__(self)
 
+        # state written while making the RGB image; the render thread
+        # works on a copy of it (see _get_render_geom())
+        self._render_geom = {}
+        self._render_local = threading.local()
+
         if logger is not None:
             self.logger = logger
         else:
@@ -165,10 +214,17 @@ class ImageViewBase(Callback.Callbacks):
         # misc
         self.t_.addDefaults(auto_orient=False,
                             defer_redraw=True, defer_lagtime=0.025,
+                            redraw_adaptive=True, redraw_max_fps=30.0,
+                            progressive_redraw=False,
+                            progressive_idle_time=0.25,
+                            progressive_subsample=2,
+                            render_strips=1,
+                            partial_redraw_limit=0.5,
                             show_pan_position=False,
                             show_mode_indicator=True,
                             onscreen_font='Sans Serif',
-                            onscreen_font_size=24)
+                            onscreen_font_size=24,
+                            render_stats_window=100)
 
         # embedded image "profiles"
         self.t_.addDefaults(profile_use_scale=False, profile_use_pan=False,
@@ -234,9 +290,19 @@ class ImageViewBase(Callback.Callbacks):
         self._org_scale_x = 1.0
         self._org_scale_y = 1.0
 
+        # affine transform between data and window coordinates, and the
+        # viewer state it was computed for (see _get_transform())
+        self._tform = None
+        self._tform_key = None
+
         self._rgbarr = None
         self._rgbarr2 = None
         self._rgbobj = None
+        # reusable buffers for the stages of get_rgb_object()
+        self._bufpool = BufferPool.BufferPool()
+        # timing of the stages of redraws (see get_render_stats())
+        self.render_stats = RenderStats.RenderStats(
+            window=self.t_['render_stats_window'])
 
         # optimization of redrawing
         self.defer_redraw = self.t_.get('defer_redraw', True)
@@ -245,7 +311,37 @@ class ImageViewBase(Callback.Callbacks):
         self._defer_whence = 0
         self._defer_lock = threading.RLock()
         self._defer_flag = False
+        # adaptive redraw scheduling (see _get_redraw_lag())
+        self.redraw_adaptive = self.t_.get('redraw_adaptive', True)
+        self.redraw_max_fps = self.t_.get('redraw_max_fps', 30.0)
+        self._frame_cost = 0.0
+        self._redraw_counts = dict(requests=0, frames=0, partial=0,
+                                   coalesced=0, dropped=0, stale=0)
+        # partial redrawing of the areas of the window changed on the
+        # canvas (see canvas_changed_cb())
+        self.partial_redraw_limit = self.t_.get('partial_redraw_limit', 0.5)
+        self._redraw_rects = None
+        self._redraw_rects_pending = False
+        self.max_redraw_rects = 16
+        # subclasses that can restrict rendering to some areas of the
+        # window (see set_clip_rects()) set this to True
+        self._can_clip = False
+        self._clip_rects = None
+        # progressive redrawing (see start_interaction())
+        self._interacting = False
+        self._time_interaction = 0.0
+        self._draft = False
+        self._refine_pending = False
+        # optional rendering in a background thread (see
+        # enable_render_thread())
+        self._render_lock = threading.RLock()
+        self._render_thread = None
+        self._rgbobj_shown = None
+        # optional concurrent color mapping (see set_render_pool())
+        self._render_pool = None
+        self.render_strip_min_rows = 32
         self._hold_redraw_cnt = 0
+        self._hold_whence = None
         self.suppress_redraw = SuppressRedraw(self)
 
         self.img_bg = (0.2, 0.2, 0.2)
@@ -934,7 +1030,7 @@ class ImageViewBase(Callback.Callbacks):
         image = self.get_image()
         target.set_image(image)
 
-    def redraw(self, whence=0):
+    def redraw(self, whence=0, rects=None):
         """Redraw the canvas.
 
         Parameters
@@ -942,26 +1038,51 @@ class ImageViewBase(Callback.Callbacks):
         whence
             See :meth:`get_rgb_object`.
 
+        rects : list of tuple or `None`
+            If given (and ``whence`` is 3), only these areas of the
+            window need to be redrawn.  Each area is a rectangle
+            ``(x1, y1, x2, y2)`` in window coordinates.
+
         """
+        self._add_redraw_rects(whence, rects)
+
+        if self._hold_redraw_cnt > 0:
+            # remember the lowest level of redraw requested while
+            # redraws are suppressed (see SuppressRedraw)
+            if self._hold_whence is None:
+                self._hold_whence = whence
+            else:
+                self._hold_whence = min(self._hold_whence, whence)
+
+        self._redraw_counts['requests'] += 1
+
         if not self.defer_redraw:
             if self._hold_redraw_cnt == 0:
                 self.redraw_now(whence=whence)
+            else:
+                self._redraw_counts['coalesced'] += 1
             return
 
         with self._defer_lock:
             whence = min(self._defer_whence, whence)
             elapsed = time.time() - self.time_last_redraw
+            lagtime = self._get_redraw_lag()
 
             # If there is no redraw scheduled, or we are overdue for one:
-            if (not self._defer_flag) or (elapsed > self.defer_lagtime):
-                # If more time than defer_lagtime has passed since the
+            if (not self._defer_flag) or (elapsed > lagtime):
+                # If more time than the lag time has passed since the
                 # last redraw then just do the redraw immediately
-                if elapsed > self.defer_lagtime:
+                if elapsed > lagtime:
                     if self._hold_redraw_cnt > 0:
                         #self._defer_flag = True
                         self._defer_whence = whence
+                        self._redraw_counts['coalesced'] += 1
                         return
 
+                    # this redraw takes care of any scheduled one
+                    if self._defer_flag:
+                        self._redraw_counts['coalesced'] += 1
+                    self._defer_flag = False
                     self._defer_whence = 3
                     self.logger.debug("lagtime expired--forced redraw")
                     self.redraw_now(whence=whence)
@@ -971,8 +1092,8 @@ class ImageViewBase(Callback.Callbacks):
                 self._defer_flag = True
                 self._defer_whence = whence
 
-                # schedule a redraw by the end of the defer_lagtime
-                secs = self.defer_lagtime - elapsed
+                # schedule a redraw by the end of the lag time
+                secs = lagtime - elapsed
                 self.logger.debug("defer redraw (whence=%.2f) in %.f sec" % (
                     whence, secs))
                 self.reschedule_redraw(secs)
@@ -980,12 +1101,97 @@ class ImageViewBase(Callback.Callbacks):
             else:
                 # A redraw is already scheduled.  Just record whence.
                 self._defer_whence = whence
+                self._redraw_counts['coalesced'] += 1
                 self.logger.debug("update whence=%.2f" % (whence))
 
+    def _get_redraw_lag(self):
+        """Get the time to wait after a redraw before doing another one.
+
+        This is the ``defer_lagtime``.  If adaptive redrawing is enabled,
+        it is lengthened so that a redraw (which, on average, recently
+        took ``_frame_cost`` seconds) plus the lag takes at least one frame
+        interval of ``redraw_max_fps``, and so that rendering takes at most
+        about two thirds of the time even when frames are slow, leaving
+        time to handle the events that cause the redraws.
+        """
+        lagtime = self.defer_lagtime
+        if not self.redraw_adaptive:
+            return lagtime
+
+        cost = self._frame_cost
+        if self.redraw_max_fps > 0:
+            lagtime = max(lagtime, 1.0 / self.redraw_max_fps - cost)
+        return max(lagtime, 0.5 * cost)
+
+    def _add_redraw_rects(self, whence, rects):
+        # accumulate the areas to redraw until the next redraw
+        with self._defer_lock:
+            if (whence < 3) or (rects is None):
+                self._redraw_rects = None
+            elif not self._redraw_rects_pending:
+                self._redraw_rects = list(rects)
+            elif self._redraw_rects is not None:
+                for rect in rects:
+                    if rect not in self._redraw_rects:
+                        self._redraw_rects.append(rect)
+            self._redraw_rects_pending = True
+
+    def _get_redraw_rects(self):
+        """Get the areas of the window to redraw for the pending changes,
+        as a list of rectangles of whole pixels clipped to the window,
+        or `None` to redraw everything.
+        """
+        with self._defer_lock:
+            rects = None
+            if self._redraw_rects_pending:
+                rects = self._redraw_rects
+            self._redraw_rects = None
+            self._redraw_rects_pending = False
+
+        if rects is None:
+            return None
+
+        wd, ht = self.get_window_size()
+        res = []
+        area = 0
+        for rect in rects:
+            if not numpy.all(numpy.isfinite(rect)):
+                return None
+            x1, y1, x2, y2 = rect
+            x1, x2 = max(int(math.floor(min(x1, x2))), 0), \
+                     min(int(math.ceil(max(x1, x2))) + 1, wd)
+            y1, y2 = max(int(math.floor(min(y1, y2))), 0), \
+                     min(int(math.ceil(max(y1, y2))) + 1, ht)
+            if (x2 <= x1) or (y2 <= y1):
+                # not in the window
+                continue
+            res.append((x1, y1, x2, y2))
+            area += (x2 - x1) * (y2 - y1)
+
+        if area > self.partial_redraw_limit * wd * ht:
+            return None
+
+        if len(res) > self.max_redraw_rects:
+            # too many areas--redraw their bounding box
+            t_ = numpy.array(res).T
+            res = [(int(t_[0].min()), int(t_[1].min()),
+                    int(t_[2].max()), int(t_[3].max()))]
+            x1, y1, x2, y2 = res[0]
+            if (x2 - x1) * (y2 - y1) > self.partial_redraw_limit * wd * ht:
+                return None
+
+        return res
+
     def canvas_changed_cb(self, canvas, whence):
         """Handle callback for when canvas has changed."""
         self.logger.debug("root canvas changed, whence=%d" % (whence))
 
+        rects = None
+        if (whence >= 3) and (getattr(canvas, 'viewer', None) is self):
+            # areas of the window affected by the changes, if known
+            # (see CanvasMixin.mark_dirty())
+            rects = canvas.get_modified_rects()
+
         # special check for whether image changed out from under us in
         # a shared canvas scenario
         try:
@@ -1000,7 +1206,7 @@ class ImageViewBase(Callback.Callbacks):
         except KeyError:
             self._imgobj = None
 
-        self.redraw(whence=whence)
+        self.redraw(whence=whence, rects=rects)
 
     def delayed_redraw(self):
         """Handle delayed redrawing of the canvas."""
@@ -1017,6 +1223,82 @@ class ImageViewBase(Callback.Callbacks):
             # If a redraw was scheduled, do it now
             self.redraw_now(whence=whence)
 
+        elif self._refine_pending:
+            # redraw at full quality if the interaction has finished
+            # (allow for the timer going off a little early)
+            if not self._is_interacting(slack=0.02):
+                self.redraw_now(whence=0)
+
+        else:
+            # a forced redraw has already taken care of it
+            self._redraw_counts['dropped'] += 1
+
+    def start_interaction(self):
+        """Note the start of an interaction with the viewer.
+
+        This is called (e.g. by the bindings) when the user starts to
+        drag, scroll or make a gesture that changes the view.  If the
+        ``progressive_redraw`` setting is True, redraws are done in a
+        cheap "draft" mode (nearest neighbor interpolation, image cutouts
+        subsampled by ``progressive_subsample``, no ICC profile conversion)
+        until the interaction has ended and there has been no further
+        interaction for ``progressive_idle_time`` seconds, after which the
+        view is redrawn at full quality.
+
+        """
+        self._interacting = True
+        self._time_interaction = time.time()
+
+    def end_interaction(self):
+        """Note the end of an interaction with the viewer.
+
+        See :meth:`start_interaction`.
+
+        """
+        self._interacting = False
+        self._time_interaction = time.time()
+
+        if self._refine_pending and not self._defer_flag:
+            # schedule the redraw at full quality
+            self.reschedule_redraw(self.t_['progressive_idle_time'])
+
+    def _is_interacting(self, slack=0.0):
+        if self._interacting:
+            return True
+        elapsed = time.time() - self._time_interaction
+        return elapsed < self.t_['progressive_idle_time'] - slack
+
+    def _use_draft(self):
+        """Return True if the next redraw should be done in draft mode."""
+        t_ = self.t_
+        if not t_['progressive_redraw']:
+            return False
+
+        # is there anything to gain from a draft?
+        if ((t_['interpolation'] == 'basic') and
+            (t_['progressive_subsample'] <= 1) and
+            (t_.get('icc_output_profile', None) is None)):
+            return False
+
+        return self._is_interacting()
+
+    def is_draft(self):
+        """Return True if the current redraw is done in draft mode.
+
+        Canvas objects that are expensive to draw can use this to draw
+        themselves more cheaply during interactions (see
+        :meth:`start_interaction`).
+
+        """
+        return self._draft
+
+    def get_draft_subsample(self):
+        """Return the factor by which images may be subsampled in the
+        current redraw (1 if not drawing in draft mode)."""
+        if not self._draft:
+            return 1
+        return max(1, int(self.t_['progressive_subsample']))
+
     def set_redraw_lag(self, lag_sec):
         """Set lag time for redrawing the canvas.
 
@@ -1030,6 +1312,59 @@ class ImageViewBase(Callback.Callbacks):
         if self.defer_redraw:
             self.defer_lagtime = lag_sec
 
+    def set_redraw_rate(self, max_fps, adaptive=True):
+        """Set the maximum redraw rate.
+
+        If ``adaptive`` is True, the time to wait before another redraw
+        is adjusted according to how long recent redraws took, so that
+        the rate of redraws does not exceed ``max_fps`` and bursts of
+        changes (e.g. from scrolling or panning) are drawn in one redraw.
+        Otherwise redraws are simply delayed by the lag time (see
+        :meth:`set_redraw_lag`).
+
+        Parameters
+        ----------
+        max_fps : float
+            Maximum number of redraws per second (0 for no limit).
+
+        adaptive : bool
+            Adapt the lag time to the cost of redraws.
+
+        """
+        self.redraw_max_fps = max_fps
+        self.redraw_adaptive = adaptive
+
+    def get_redraw_stats(self):
+        """Get statistics about the scheduling of redraws.
+
+        Returns
+        -------
+        stats : dict
+            A dict with the number of redraws requested ('requests'),
+            the number actually done ('frames'), the number of those
+            that only redrew the changed areas of the window ('partial'),
+            the number of requests merged into another redraw
+            ('coalesced'), the number of
+            scheduled redraws that were dropped because an earlier
+            redraw had already taken care of them ('dropped'), the
+            number of images made by the render thread that were out of
+            date by the time they were finished ('stale'), the
+            recent average time of a redraw in seconds ('frame_cost')
+            and the current lag time in seconds ('lagtime').
+
+        """
+        with self._defer_lock:
+            stats = dict(self._redraw_counts)
+            stats.update(frame_cost=self._frame_cost,
+                         lagtime=self._get_redraw_lag())
+        return stats
+
+    def reset_redraw_stats(self):
+        """Reset the counters of :meth:`get_redraw_stats`."""
+        with self._defer_lock:
+            for key in list(self._redraw_counts.keys()):
+                self._redraw_counts[key] = 0
+
     def redraw_now(self, whence=0):
         """Redraw the displayed image.
 
@@ -1039,16 +1374,51 @@ class ImageViewBase(Callback.Callbacks):
             See :meth:`get_rgb_object`.
 
         """
+        draft = self._use_draft()
+        if draft:
+            self._refine_pending = True
+        elif self._refine_pending:
+            # last redraw was a draft--everything needs to be redone
+            self._refine_pending = False
+            whence = 0
+
+        rects = self._get_redraw_rects()
+        if (whence < 3) or draft or (not self._can_clip):
+            rects = None
+
+        if ((self._render_thread is not None) and self._imgwin_set and
+            (not self._self_scaling)):
+            # the RGB image is made in the background and handed back
+            # to us to blit (see finish_redraw())
+            self._render_thread.request(whence, draft)
+            return
+
+        self.render_stats.start_frame()
+        self._draft = draft
         try:
             time_start = time.time()
-            self.redraw_data(whence=whence)
+            if rects is None:
+                self.redraw_data(whence=whence)
 
-            # finally update the window drawable from the offscreen surface
-            self.update_image()
+                # finally update the window drawable from the offscreen
+                # surface
+                with self.render_stats.timer('blit'):
+                    self.update_image()
+            else:
+                # only some areas of the window have changed
+                self.redraw_data_rects(rects)
+
+                with self.render_stats.timer('blit'):
+                    self.update_image_rects(rects)
+                self._redraw_counts['partial'] += 1
             time_done = time.time()
             time_delta = time_start - self.time_last_redraw
             time_elapsed = time_done - time_start
             self.time_last_redraw = time_done
+            self.render_stats.record('total', time_elapsed)
+            self._redraw_counts['frames'] += 1
+            # running average of the cost of a redraw
+            self._frame_cost = 0.7 * self._frame_cost + 0.3 * time_elapsed
             self.logger.debug("widget '%s' redraw (whence=%d) delta=%.4f "
                               "elapsed=%.4f sec" % (
                 self.name, whence, time_delta, time_elapsed))
@@ -1064,6 +1434,245 @@ class ImageViewBase(Callback.Callbacks):
                 tb_str = "Traceback information unavailable."
                 self.logger.error(tb_str)
 
+        finally:
+            self.render_stats.end_frame()
+            self._draft = False
+
+        if self._refine_pending and not self._defer_flag:
+            # make sure we get called back to redraw at full quality
+            self.reschedule_redraw(self.t_['progressive_idle_time'])
+
+    def get_render_stats(self, percentiles=(50, 90, 99)):
+        """Get timing statistics for the stages of recent redraws.
+
+        The stages are 'cutout', 'cuts' (cut levels), 'colormap' (color
+        distribution and mapping), 'overlay' (compositing images onto
+        the backing image), 'transform' (flips and swaps), 'rotate',
+        'icc' (ICC profile conversion), 'canvas' (drawing the canvas
+        objects), 'blit' (rendering to the widget) and 'total' (the
+        whole redraw).  Stages that have not been run are missing.
+
+        Parameters
+        ----------
+        percentiles : sequence of float
+            Percentiles to calculate.
+
+        Returns
+        -------
+        stats : dict
+            Keyed by stage, each value is a dict with the number of
+            times the stage has been timed ('count'), and the 'last',
+            'mean', 'max' and percentile (e.g. 'p90') times in seconds
+            over the last ``render_stats_window`` redraws.
+
+        """
+        return self.render_stats.get_stats(percentiles=percentiles)
+
+    def reset_render_stats(self):
+        """Discard all timing statistics (see :meth:`get_render_stats`)."""
+        self.render_stats.reset()
+
+    def enable_render_thread(self, tf, gui_do=None):
+        """Enable or disable rendering in a background thread.
+
+        When enabled, redraws make the RGB image (cutouts, color mapping,
+        rotation, compositing, etc.) in a background thread, so that the
+        user interface is not blocked while it is being made.  Results
+        that are out of date by the time they are finished (e.g. because
+        the image was panned in the meantime) are discarded.  Only the
+        final steps (:meth:`render_image`, drawing the canvas and
+        :meth:`update_image`) are done in the GUI thread.
+
+        Parameters
+        ----------
+        tf : bool
+            Enable or disable the render thread.
+
+        gui_do : function or `None`
+            A function ``gui_do(method, *args)`` that calls ``method`` with
+            ``args`` in the GUI thread, such as the ``gui_do`` method of
+            the reference viewer.  If `None`, the final steps are also done
+            in the render thread, which is only safe for backends that do
+            not draw on GUI widgets (e.g. PIL, Agg and mock viewers).
+
+        """
+        if self._render_thread is not None:
+            self._render_thread.stop()
+            self._render_thread = None
+            self._rgbobj_shown = None
+
+        if tf:
+            self._render_thread = RenderThread(self, gui_do=gui_do)
+            self._render_thread.start()
+
+    def set_render_pool(self, pool):
+        """Set the thread pool used for rendering in strips.
+
+        When the ``render_strips`` setting is greater than 1, the cut
+        levels and color mapping of large images are done in that many
+        horizontal strips, which are processed concurrently on ``pool``.
+        Most of the NumPy operations involved release the GIL, so this
+        makes use of several processor cores.
+
+        Parameters
+        ----------
+        pool : `~ginga.misc.Task.ThreadPool` or `None`
+            A started thread pool, such as the one of the reference viewer.
+            It should have at least ``render_strips - 1`` threads.  If
+            `None`, rendering is done in one piece.
+
+        """
+        self._render_pool = pool
+
+    def get_render_pool(self):
+        """Get the thread pool used for rendering in strips (see
+        :meth:`set_render_pool`), or `None`.
+        """
+        return self._render_pool
+
+    def get_render_strips(self, ht):
+        """Get the number of strips an array of ``ht`` rows should be
+        processed in (see :meth:`set_render_pool`).
+        """
+        if self._render_pool is None:
+            return 1
+        num = int(self.t_.get('render_strips', 1))
+        return max(1, min(num, ht // self.render_strip_min_rows))
+
+    def run_strips(self, func, ht, num):
+        """Call ``func(y1, y2)`` concurrently for ``num`` horizontal strips
+        covering the rows 0 to ``ht``.
+
+        The first strip is processed in the calling thread and the others
+        on the render pool (see :meth:`set_render_pool`).  Returns when
+        all strips are finished; an exception raised for any strip is
+        raised again here.
+        """
+        rows = numpy.linspace(0, ht, num + 1).astype(numpy.int_)
+        tasks = []
+        for y1, y2 in zip(rows[1:-1], rows[2:]):
+            task = Task.FuncTask2(func, y1, y2)
+            task.initialize(None)
+            task.logger = self.logger
+            task.threadPool = self._render_pool
+            task.start()
+            tasks.append(task)
+
+        try:
+            func(rows[0], rows[1])
+        finally:
+            for task in tasks:
+                task.wait()
+
+    def finish_redraw(self, rgbobj, dst_x, dst_y, whence=0, time_start=None,
+                      geom=None):
+        """Blit an RGB image made by the render thread.
+
+        .. note::
+
+            This is called by the render thread (in the GUI thread, if
+            possible); do not call it unless you are implementing a
+            subclass.
+
+        Parameters
+        ----------
+        rgbobj : `~ginga.RGBMap.RGBPlanes`
+            The RGB image (see :meth:`get_rgb_object`).
+
+        dst_x, dst_y : int
+            Position of the RGB image in the window.
+
+        whence
+            See :meth:`get_rgb_object`.
+
+        time_start : float or `None`
+            Time the redraw was started.
+
+        geom : dict or `None`
+            The geometry of the RGB image, which becomes that of the
+            viewer (coordinate conversions, canvas drawing, etc.)
+
+        """
+        self.render_stats.start_frame()
+        try:
+            if geom is not None:
+                self._render_geom.update(geom)
+            self._rgbobj_shown = (rgbobj, dst_x, dst_y)
+            with self.render_stats.timer('blit'):
+                self.render_image(rgbobj, dst_x, dst_y)
+
+            with self.render_stats.timer('canvas'):
+                self.private_canvas.draw(self)
+
+            if whence <= 0.5:
+                self.make_callback('redraw')
+
+            with self.render_stats.timer('blit'):
+                self.update_image()
+
+            time_done = time.time()
+            self.time_last_redraw = time_done
+            self._redraw_counts['frames'] += 1
+            if time_start is not None:
+                time_elapsed = time_done - time_start
+                self.render_stats.record('total', time_elapsed)
+                self._frame_cost = 0.7 * self._frame_cost + 0.3 * time_elapsed
+
+        except Exception as e:
+            self.logger.error("Error finishing redraw: %s" % (str(e)))
+
+        finally:
+            self.render_stats.end_frame()
+
+        if self._refine_pending and not self._defer_flag:
+            self.reschedule_redraw(self.t_['progressive_idle_time'])
+
+    def get_render_state(self):
+        """Get the state of the viewer that determines the RGB image.
+
+        Two states that compare equal produce the same RGB image (apart
+        from changes to the image data or canvas objects).  This is used
+        to discard images made in the background that are out of date.
+
+        Returns
+        -------
+        state : tuple
+            The window size, pan position, scale, rotation, flips and
+            swap, cut levels, color map settings and image.
+
+        """
+        t_ = self.t_
+        rgbmap = self.get_rgbmap()
+        return (self.get_window_size(), self.get_pan(), self.get_scale_xy(),
+                t_['rot_deg'], t_['flip_x'], t_['flip_y'], t_['swap_xy'],
+                t_['cuts'], rgbmap.get_hash_size(), str(rgbmap.get_dist()),
+                rgbmap.get_cmap().name, rgbmap.get_imap().name,
+                id(rgbmap.arr), id(rgbmap.sarr), id(self.get_image()))
+
+    def _get_render_geom(self):
+        """Get the dict holding the geometry of the RGB image (see the
+        `_render_attr` properties).  In the render thread this is the
+        copy being worked on (see _start_render_geom()), elsewhere that
+        of the image being shown.
+        """
+        geom = getattr(self._render_local, 'geom', None)
+        if geom is None:
+            return self._render_geom
+        return geom
+
+    def _start_render_geom(self):
+        """Make the calling thread work on a copy of the geometry of the
+        RGB image, until _end_render_geom() is called.
+        """
+        self._render_local.geom = dict(self._render_geom)
+
+    def _end_render_geom(self):
+        """Stop working on a copy of the geometry (see
+        _start_render_geom()), and return the copy.
+        """
+        geom, self._render_local.geom = self._render_local.geom, None
+        return geom
+
     def redraw_data(self, whence=0):
         """Render image from RGB map and redraw private canvas.
 
@@ -1083,15 +1692,76 @@ class ImageViewBase(Callback.Callbacks):
 
         if not self._self_scaling:
             rgbobj = self.get_rgb_object(whence=whence)
-            self.render_image(rgbobj, self._dst_x, self._dst_y)
+            with self.render_stats.timer('blit'):
+                self.render_image(rgbobj, self._dst_x, self._dst_y)
 
-        self.private_canvas.draw(self)
+        with self.render_stats.timer('canvas'):
+            self.private_canvas.draw(self)
 
         # TODO: see if we can deprecate this fake callback
-        if whence <= 0:
+        if whence <= 0.5:
             self.make_callback('redraw')
 
-    def getwin_array(self, order='RGB', alpha=1.0):
+    def redraw_data_rects(self, rects):
+        """Redraw only some areas of the window from the current RGB
+        image and private canvas.
+
+        .. note::
+
+            Do not call this method unless you are implementing a subclass.
+
+        Parameters
+        ----------
+        rects : list of tuple
+            Areas of the window to redraw.  Each area is a rectangle
+            ``(x1, y1, x2, y2)`` in window coordinates, where the
+            pixels at ``x2`` and ``y2`` are outside of the area.
+
+        """
+        if (not self._imgwin_set) or (len(rects) == 0):
+            return
+
+        self.set_clip_rects(rects)
+        try:
+            if not self._self_scaling:
+                rgbobj = self.get_rgb_object(whence=3)
+                with self.render_stats.timer('blit'):
+                    self.render_image(rgbobj, self._dst_x, self._dst_y)
+
+            with self.render_stats.timer('canvas'):
+                self.private_canvas.draw(self)
+
+        finally:
+            self.set_clip_rects(None)
+
+    def set_clip_rects(self, rects):
+        """Restrict rendering to some areas of the window.
+
+        Subclasses that support this extend this method to restrict
+        both :meth:`render_image` and the drawing of canvas objects to
+        the areas, and set ``_can_clip`` to True.
+
+        Parameters
+        ----------
+        rects : list of tuple or `None`
+            Areas of the window (see :meth:`redraw_data_rects`), or
+            `None` to lift the restriction.
+
+        """
+        self._clip_rects = rects
+
+    def get_clip_rects(self):
+        """Get the areas of the window rendering is restricted to.
+
+        Returns
+        -------
+        rects : list of tuple or `None`
+            See :meth:`set_clip_rects`.
+
+        """
+        return self._clip_rects
+
+    def getwin_array(self, order='RGB', alpha=1.0, rect=None):
         """Get Numpy data array for display window.
 
         Parameters
@@ -1102,6 +1772,10 @@ class ImageViewBase(Callback.Callbacks):
         alpha : float
             Opacity.
 
+        rect : tuple or `None`
+            If given, only get this area ``(x1, y1, x2, y2)`` of the
+            window (see :meth:`redraw_data_rects`).
+
         Returns
         -------
         outarr : ndarray
@@ -1112,12 +1786,20 @@ class ImageViewBase(Callback.Callbacks):
         depth = len(order)
 
         # Prepare data array for rendering
-        data = self._rgbobj.get_array(order)
+        rgbobj, dst_x, dst_y = self._rgbobj, self._dst_x, self._dst_y
+        if (self._render_thread is not None) and (self._rgbobj_shown is not None):
+            # the render thread may be busy making the next image
+            rgbobj, dst_x, dst_y = self._rgbobj_shown
+        data = rgbobj.get_array(order)
 
         # NOTE [A]
         height, width, depth = data.shape
 
         imgwin_wd, imgwin_ht = self.get_window_size()
+        if rect is not None:
+            x1, y1, x2, y2 = rect
+            imgwin_wd, imgwin_ht = x2 - x1, y2 - y1
+            dst_x, dst_y = dst_x - x1, dst_y - y1
 
         # create RGBA array for output
         outarr = numpy.zeros((imgwin_ht, imgwin_wd, depth), dtype='uint8')
@@ -1130,7 +1812,7 @@ class ImageViewBase(Callback.Callbacks):
             outarr[:, :, i] = bgval[order[i]]
 
         # overlay our data
-        trcalc.overlay_image(outarr, self._dst_x, self._dst_y,
+        trcalc.overlay_image(outarr, dst_x, dst_y,
                              data, flipy=False, fill=False, copy=False)
 
         return outarr
@@ -1163,12 +1845,15 @@ class ImageViewBase(Callback.Callbacks):
 
         Parameters
         ----------
-        whence : {0, 1, 2, 3}
+        whence : {0, 0.5, 1, 2, 3}
             Optimization flag that reduces the time to create
             the RGB object by only recalculating what is necessary:
 
-                0. New image, pan/scale has changed, or rotation/transform
+                0. New image, scale has changed, or rotation/transform
                    has changed; Recalculate everything
+                0.5. Only the pan position has changed; already color
+                   mapped pixels are shifted and only the newly exposed
+                   areas are calculated
                 1. Cut levels or similar has changed
                 2. Color mapping has changed
                 3. Graphical overlays have changed
@@ -1179,11 +1864,15 @@ class ImageViewBase(Callback.Callbacks):
             RGB object.
 
         """
+        with self._render_lock:
+            return self._get_rgb_object(whence=whence)
+
+    def _get_rgb_object(self, whence=0):
         time_start = time.time()
         win_wd, win_ht = self.get_window_size()
         order = self.get_rgb_order()
 
-        if (whence <= 0.0) or (self._rgbarr is None):
+        if (whence <= 0.5) or (self._rgbarr is None):
             # calculate dimensions of window RGB backing image
             pan_x, pan_y = self.get_pan()
             scale_x, scale_y = self.get_scale_xy()
@@ -1193,12 +1882,20 @@ class ImageViewBase(Callback.Callbacks):
 
             # create backing image
             depth = len(order)
-            rgba = numpy.zeros((ht, wd, depth), dtype=numpy.uint8)
-            self._rgbarr = rgba
+            if ((whence <= 0.0) or (self._rgbarr is None) or
+                    (self._rgbarr.shape != (ht, wd, depth))):
+                self._rgbarr = self._bufpool.get_buffer('backing',
+                                                        (ht, wd, depth),
+                                                        numpy.uint8, fill=0)
+                whence = 0
 
         if (whence <= 2.0) or (self._rgbarr2 is None):
             # Apply any RGB image overlays
-            self._rgbarr2 = numpy.copy(self._rgbarr)
+            with self.render_stats.timer('overlay'):
+                self._rgbarr2 = self._bufpool.get_buffer('overlay',
+                                                         self._rgbarr.shape,
+                                                         self._rgbarr.dtype)
+                numpy.copyto(self._rgbarr2, self._rgbarr)
             self.overlay_images(self.canvas, self._rgbarr2, whence=whence)
 
         if (whence <= 2.5) or (self._rgbobj is None):
@@ -1208,21 +1905,31 @@ class ImageViewBase(Callback.Callbacks):
             # if not applied earlier
             rotimg = self.apply_transforms(rotimg,
                                            self.t_['rot_deg'])
-            rotimg = numpy.ascontiguousarray(rotimg)
+            with self.render_stats.timer('transform'):
+                rotimg = self._get_contiguous('output', rotimg)
 
             self._rgbobj = RGBMap.RGBPlanes(rotimg, order)
 
             # convert to output ICC profile, if one is specified
             output_profile = self.t_.get('icc_output_profile', None)
-            if not (output_profile is None):
-                self.convert_via_profile(self._rgbobj, 'working',
-                                         output_profile)
+            if not ((output_profile is None) or self._draft):
+                with self.render_stats.timer('icc'):
+                    self.convert_via_profile(self._rgbobj, 'working',
+                                             output_profile)
 
         time_end = time.time()
         self.logger.debug("times: total=%.4f" % (
             (time_end - time_start)))
         return self._rgbobj
 
+    def _get_contiguous(self, name, data):
+        # like numpy.ascontiguousarray(), but copies into a pooled buffer
+        if data.flags.c_contiguous:
+            return data
+        buf = self._bufpool.get_buffer(name, data.shape, data.dtype)
+        numpy.copyto(buf, data)
+        return buf
+
     def _calc_bg_dimensions(self, scale_x, scale_y,
                             pan_x, pan_y, win_wd, win_ht):
 
@@ -1287,10 +1994,20 @@ class ImageViewBase(Callback.Callbacks):
         self._org_x2 = x2
         self._org_y2 = y2
 
-        # Make a square from the scaled cutout, with room to rotate
+        # NOTE: sizes are made odd so that the center falls on a whole
+        # pixel, otherwise the image shifts by one pixel depending on the
+        # window size
         slop = 20
-        side = int(math.sqrt(win_wd**2 + win_ht**2) + slop)
-        wd = ht = side
+        if math.fmod(self.t_['rot_deg'], 360.0) == 0.0:
+            # No rotation: just big enough to cover the window (before
+            # any swapping of axes)
+            wd, ht = (win_wd + slop) | 1, (win_ht + slop) | 1
+            if self.t_['swap_xy']:
+                wd, ht = ht, wd
+        else:
+            # Make a square from the scaled cutout, with room to rotate
+            side = int(math.sqrt(win_wd**2 + win_ht**2) + slop) | 1
+            wd = ht = side
 
         # Find center of new array
         ncx, ncy = wd // 2, ht // 2
@@ -1348,6 +2065,7 @@ class ImageViewBase(Callback.Callbacks):
             xoff, yoff = yoff, xoff
 
         split_time = time.time()
+        self.render_stats.record('transform', split_time - start_time)
         self.logger.debug("reshape time %.3f sec" % (
             split_time - start_time))
 
@@ -1358,11 +2076,14 @@ class ImageViewBase(Callback.Callbacks):
         if rot_deg != 0:
             # This is the slowest part of the rendering--install the OpenCv or pyopencl
             # packages to speed it up
-            data = numpy.ascontiguousarray(data)
-            data = trcalc.rotate_clip(data, -rot_deg, out=data,
+            data = self._get_contiguous('transform', data)
+            out = self._bufpool.get_buffer('rotate', data.shape, data.dtype)
+            data = trcalc.rotate_clip(data, -rot_deg, out=out,
                                       logger=self.logger)
 
         split2_time = time.time()
+        if rot_deg != 0:
+            self.render_stats.record('rotate', split2_time - split_time)
 
         # apply other transforms
         if self._invertY:
@@ -1460,11 +2181,22 @@ class ImageViewBase(Callback.Callbacks):
             Data coordinates in the form of ``(x, y)``.
 
         """
-        # First, translate window coordinates onto cartesian canvas
-        off_x, off_y = self.window_to_offset(win_x, win_y)
+        a, b, c, d, ctr_x, ctr_y = self._get_transform()[1]
 
-        # Then translate into window coordinates
-        return self.offset_to_data(off_x, off_y, center=center)
+        # make relative to center pixel, then reverse the scaling and
+        # transforms in one step
+        off_x = win_x - ctr_x
+        off_y = win_y - ctr_y
+        data_x, data_y = _apply_linear(a, b, c, d, off_x, off_y)
+
+        # Add data index at (_ctr_x, _ctr_y) to offset
+        data_x = self._org_x + data_x
+        data_y = self._org_y + data_y
+        if center:
+            data_x += self.data_off
+            data_y += self.data_off
+
+        return (data_x, data_y)
 
     def offset_to_data(self, off_x, off_y, center=True):
         """Get the closest coordinates in the data array to those
@@ -1502,22 +2234,89 @@ class ImageViewBase(Callback.Callbacks):
 
     def get_canvas_xy(self, data_x, data_y, center=True):
         """Reverse of :meth:`get_data_xy`."""
-        off_x, off_y = self.data_to_offset(data_x, data_y)
+        a, b, c, d, ctr_x, ctr_y = self._get_transform()[0]
+
+        # subtract data indexes at center reference pixel
+        off_x = (data_x - self.data_off) - self._org_x
+        off_y = (data_y - self.data_off) - self._org_y
+
+        # scale and transform in one step, then add center pixel
+        win_x, win_y = _apply_linear(a, b, c, d, off_x, off_y)
+        win_x = win_x + ctr_x
+        win_y = win_y + ctr_y
+
+        # round to pixel units
+        win_x = numpy.rint(win_x).astype(numpy.int)
+        win_y = numpy.rint(win_y).astype(numpy.int)
+
+        return (win_x, win_y)
+
+    def _get_transform(self):
+        """Get the affine transforms between data offsets and window
+        coordinates for the current pan position, scale, flip, swap and
+        rotation settings.
+
+        The transforms are only recomputed when one of those changes.
+
+        Returns
+        -------
+        tform : tuple
+            ``(fwd, rev)``, where each is ``(a, b, c, d, tx, ty)``:
+            `fwd` maps data offsets ``(x, y)`` from the reference pixel
+            to window coordinates as ``(a*x + b*y + tx, c*x + d*y + ty)``
+            and `rev` gives back the data offsets from window coordinates
+            as ``(a*(x - tx) + b*(y - ty), c*(x - tx) + d*(y - ty))``.
+
+        """
+        t_ = self.t_
+        key = (self._org_scale_x, self._org_scale_y,
+               t_['flip_x'], t_['flip_y'], t_['swap_xy'], t_['rot_deg'],
+               self._ctr_x, self._ctr_y, self._originUpper)
+        if key == self._tform_key:
+            return self._tform
+
+        # build up the matrix in the same order the steps are done in
+        # data_to_offset() and offset_to_window(), and the inverse in
+        # the order of window_to_offset() and offset_to_data()
+        scale_x, scale_y = self._org_scale_x, self._org_scale_y
+        fwd = numpy.array(((scale_x, 0.0), (0.0, scale_y)))
+        rev = numpy.array(((1.0 / scale_x, 0.0), (0.0, 1.0 / scale_y)))
+        if t_['flip_x']:
+            flip = numpy.array(((-1.0, 0.0), (0.0, 1.0)))
+            fwd, rev = numpy.dot(flip, fwd), numpy.dot(rev, flip)
+        if t_['flip_y']:
+            flip = numpy.array(((1.0, 0.0), (0.0, -1.0)))
+            fwd, rev = numpy.dot(flip, fwd), numpy.dot(rev, flip)
+        if t_['swap_xy']:
+            swap = numpy.array(((0.0, 1.0), (1.0, 0.0)))
+            fwd, rev = numpy.dot(swap, fwd), numpy.dot(rev, swap)
+        if t_['rot_deg'] != 0:
+            cos_t = numpy.cos(numpy.radians(t_['rot_deg']))
+            sin_t = numpy.sin(numpy.radians(t_['rot_deg']))
+            rot = numpy.array(((cos_t, -sin_t), (sin_t, cos_t)))
+            fwd, rev = numpy.dot(rot, fwd), numpy.dot(rev, rot.T)
+        if self._originUpper:
+            flip = numpy.array(((1.0, 0.0), (0.0, -1.0)))
+            fwd, rev = numpy.dot(flip, fwd), numpy.dot(rev, flip)
 
-        return self.offset_to_window(off_x, off_y)
+        ctr = (float(self._ctr_x), float(self._ctr_y))
+        self._tform = (tuple(fwd.ravel().tolist()) + ctr,
+                       tuple(rev.ravel().tolist()) + ctr)
+        self._tform_key = key
+        return self._tform
 
     def data_to_offset(self, data_x, data_y, center=True):
         """Reverse of :meth:`offset_to_data`."""
         if center:
-            data_x -= self.data_off
-            data_y -= self.data_off
+            data_x = data_x - self.data_off
+            data_y = data_y - self.data_off
         # subtract data indexes at center reference pixel
         off_x = data_x - self._org_x
         off_y = data_y - self._org_y
 
         # scale according to current settings
-        off_x *= self._org_scale_x
-        off_y *= self._org_scale_y
+        off_x = off_x * self._org_scale_x
+        off_y = off_y * self._org_scale_y
 
         return (off_x, off_y)
 
@@ -2161,7 +2960,7 @@ class ImageViewBase(Callback.Callbacks):
         pan_x, pan_y = value
 
         self.logger.debug("pan set to %.2f,%.2f" % (pan_x, pan_y))
-        self.redraw(whence=0)
+        self.redraw(whence=0.5)
 
     def get_pan(self, coord='data'):
         """Get pan positions.
@@ -2352,7 +3151,7 @@ class ImageViewBase(Callback.Callbacks):
         if image is None:
             return
 
-        loval, hival = autocuts.calc_cut_levels(image)
+        loval, hival = autocuts.get_autocut_levels(image)
 
         # this will invoke cut_levels_cb()
         self.t_.set(cuts=(loval, hival))
@@ -2753,6 +3552,19 @@ class ImageViewBase(Callback.Callbacks):
     def onscreen_message(self, text, delay=None, redraw=True):
         self.logger.warning("Subclass should override this abstract method!")
 
+    def update_image_rects(self, rects):
+        """Update some areas of the window from the offscreen surface.
+        Subclasses should override this to update only those areas,
+        otherwise the whole window is updated.
+
+        Parameters
+        ----------
+        rects : list of tuple
+            See :meth:`redraw_data_rects`.
+
+        """
+        self.update_image()
+
     def update_image(self):
         """Update image.
         This must be implemented by subclasses.
@@ -2944,11 +3756,121 @@ class SuppressRedraw(object):
         self.viewer._hold_redraw_cnt -= 1
 
         if (self.viewer._hold_redraw_cnt <= 0):
-            # TODO: whence should be largest possible
-            # maybe self.viewer._defer_whence ??
-            whence = 0
+            # redraw at the lowest level requested while redraws
+            # were suppressed, or everything if nothing was requested
+            whence = self.viewer._hold_whence
+            self.viewer._hold_whence = None
+            if whence is None:
+                whence = 0
             self.viewer.redraw(whence=whence)
         return False
 
 
+class RenderThread(object):
+    """Makes the RGB images of a viewer in a background thread.
+
+    Requests for redraws are merged (at the lowest `whence` level) while
+    the thread is busy.  If the state of the viewer (see
+    ImageViewBase.get_render_state()) has changed by the time an image is
+    finished, the image is discarded and remade, unless `max_stale` images
+    in a row have been discarded (so that something is shown during a long
+    interaction).  Finished images are handed to viewer.finish_redraw()
+    via `gui_do`, if given.
+    """
+
+    def __init__(self, viewer, gui_do=None, max_stale=2):
+        self.viewer = viewer
+        self.gui_do = gui_do
+        self.max_stale = max_stale
+
+        self._cond = threading.Condition()
+        self._whence = None
+        self._draft = False
+        self._num_stale = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def request(self, whence, draft=False):
+        """Request an image at redraw level `whence`."""
+        with self._cond:
+            if self._whence is None:
+                self._whence, self._draft = whence, draft
+            else:
+                self._whence = min(self._whence, whence)
+                self._draft = self._draft and draft
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (self._whence is None):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                whence, draft = self._whence, self._draft
+                self._whence = None
+
+            try:
+                self._render(whence, draft)
+
+            except Exception as e:
+                self.viewer.logger.error("Error rendering image: %s" % (
+                    str(e)))
+
+    def _render(self, whence, draft):
+        viewer = self.viewer
+        time_start = time.time()
+        state = viewer.get_render_state()
+
+        with viewer._render_lock:
+            # work on a copy of the geometry of the image, so that the
+            # GUI thread keeps using that of the image being shown until
+            # this one is handed over
+            viewer._start_render_geom()
+            viewer.render_stats.start_frame()
+            try:
+                viewer._draft = draft
+                rgbobj = viewer.get_rgb_object(whence=whence)
+                viewer._draft = False
+                dst_x, dst_y = viewer._dst_x, viewer._dst_y
+            finally:
+                viewer.render_stats.end_frame()
+                geom = viewer._end_render_geom()
+            # hand over a copy, because the buffers are reused for the
+            # next image
+            order = rgbobj.get_order()
+            rgbobj = RGBMap.RGBPlanes(numpy.copy(rgbobj.get_array(order)),
+                                      order)
+
+        if state != viewer.get_render_state():
+            # the view changed while we were working, so the image is out
+            # of date and the cached intermediate results may not match
+            # each other--remake everything
+            viewer._redraw_counts['stale'] += 1
+            self.request(0, draft)
+            if self._num_stale < self.max_stale:
+                self._num_stale += 1
+                return
+
+        self._num_stale = 0
+        if self.gui_do is not None:
+            self.gui_do(viewer.finish_redraw, rgbobj, dst_x, dst_y,
+                        whence, time_start, geom)
+        else:
+            viewer.finish_redraw(rgbobj, dst_x, dst_y, whence=whence,
+                                 time_start=time_start, geom=geom)
+
+
 #END
@@ -112,6 +112,11 @@ class RGBImage(BaseImage):
 
     def get_scaled_cutout_wdht(self, x1, y1, x2, y2, new_wd, new_ht,
                                   method='bicubic'):
+        if self.use_pyramid:
+            return self._get_scaled_cutout_pyramid(x1, y1, x2, y2,
+                                                   new_wd, new_ht,
+                                                   method=method)
+
         newdata, (scale_x, scale_y) = trcalc.get_scaled_cutout_wdht(
             self._get_data(), x1, y1, x2, y2, new_wd, new_ht,
             interpolation=method, logger=self.logger)
@@ -121,6 +126,13 @@ class RGBImage(BaseImage):
 
     def get_scaled_cutout(self, x1, y1, x2, y2, scale_x, scale_y,
                           method='bicubic'):
+        if self.use_pyramid:
+            new_wd = int(round(scale_x * (x2 - x1 + 1)))
+            new_ht = int(round(scale_y * (y2 - y1 + 1)))
+            return self._get_scaled_cutout_pyramid(x1, y1, x2, y2,
+                                                   new_wd, new_ht,
+                                                   method=method)
+
         newdata, (scale_x, scale_y) = trcalc.get_scaled_cutout_basic(
             self._get_data(), x1, y1, x2, y2, scale_x, scale_y,
             interpolation=method, logger=self.logger)
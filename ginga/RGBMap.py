@@ -71,6 +71,13 @@ class RGBMapper(Callback.Callbacks):
     # parameter, which avoids having to allocate a new array for the
     # result
     #
+    # [B] The shift array and color map are combined into a lookup
+    # table that maps an index directly to the final pixel.  Tables
+    # for each requested RGB order are made from it and cached; for 32bpp
+    # orders the pixels are packed into uint32 values so that each output
+    # pixel is filled with a single gather.  The table must be recalculated
+    # (via calc_lut()) whenever self.arr or self.sarr are changed.
+    #
 
     def __init__(self, logger, dist=None):
         Callback.Callbacks.__init__(self)
@@ -85,6 +92,9 @@ class RGBMapper(Callback.Callbacks):
         self.carr = None
         self.sarr = None
         self.scale_pct = 1.0
+        # See NOTE [B]
+        self.lut = None
+        self._order_luts = {}
 
         # For scaling algorithms
         hashsize = 65536
@@ -176,6 +186,7 @@ class RGBMapper(Callback.Callbacks):
     def reset_sarr(self, callback=True):
         self.sarr = numpy.arange(256)
         self.scale_pct = 1.0
+        self.calc_lut()
         if callback:
             self.make_callback('changed')
 
@@ -184,6 +195,7 @@ class RGBMapper(Callback.Callbacks):
                RGBMapError("shift map length %d != 256" % (len(sarr)))
         self.sarr = sarr.astype('uint')
         self.scale_pct = 1.0
+        self.calc_lut()
 
         if callback:
             self.make_callback('changed')
@@ -202,9 +214,45 @@ class RGBMapper(Callback.Callbacks):
 
         # NOTE: don't reset shift array
         #self.reset_sarr(callback=False)
+        self.calc_lut()
         if callback:
             self.make_callback('changed')
 
+    def calc_lut(self):
+        """
+        Recalculate the lookup table combining the shift array and the
+        color map (see NOTE [B]).
+        """
+        self._order_luts = {}
+        if (self.arr is None) or (self.sarr is None):
+            self.lut = None
+            return
+        sarr = self.sarr.clip(0, 255)
+        self.lut = numpy.ascontiguousarray(self.arr[:, sarr].transpose())
+
+    def get_order_lut(self, order):
+        """
+        Return the lookup table from index (0-255) to pixel values in RGB
+        order `order`.  For orders with 4 channels this is an array of
+        256 packed uint32 values, otherwise an array of shape (256, depth).
+        """
+        order = order.upper()
+        try:
+            return self._order_luts[order]
+
+        except KeyError:
+            depth = len(order)
+            lut = numpy.empty((256, depth), dtype=numpy.uint8)
+            for i, c in enumerate(order):
+                if c == 'A':
+                    lut[:, i] = 255
+                else:
+                    lut[:, i] = self.lut[:, 'RGB'.index(c)]
+            if depth == 4:
+                lut = lut.view(numpy.uint32).reshape(256)
+            self._order_luts[order] = lut
+            return lut
+
 
     def get_hash_size(self):
         return self.dist.get_hash_size()
@@ -253,6 +301,27 @@ class RGBMapper(Callback.Callbacks):
         # idx = idx.clip(0, 255)
         idx.clip(0, 255, out=idx)
 
+        out = rgbobj.rgbarr
+
+        if len(idx.shape) == 2:
+            # See NOTE [B]: shift array and color map in one gather,
+            # including the alpha channel, if any
+            order = rgbobj.get_order()
+            lut = self.get_order_lut(order)
+            # take() needs native integer indexes; values are 0-255 so
+            # unsigned ones of the same size can simply be viewed as such
+            if idx.dtype.itemsize == numpy.dtype(numpy.intp).itemsize:
+                idx = idx.view(numpy.intp)
+            else:
+                idx = idx.astype(numpy.intp)
+            if (lut.ndim == 1) and out.flags.c_contiguous:
+                out32 = out.view(numpy.uint32).reshape(idx.shape)
+                numpy.take(lut, idx, out=out32, mode='clip')
+            else:
+                out[...] = numpy.take(lut, idx, axis=0, mode='clip').reshape(
+                    out.shape)
+            return True
+
         # run it through the shift array and clip the result
         # See NOTE [A]
         # idx = self.sarr[idx].clip(0, 255)
@@ -260,19 +329,13 @@ class RGBMapper(Callback.Callbacks):
         idx.clip(0, 255, out=idx)
 
         ri, gi, bi = self.get_order_indexes(rgbobj.get_order(), 'RGB')
-        out = rgbobj.rgbarr
-
-        if len(idx.shape) == 2:
-            out[..., ri] = self.arr[0][idx]
-            out[..., gi] = self.arr[1][idx]
-            out[..., bi] = self.arr[2][idx]
-        else:
-            rj, gj, bj = self.get_order_indexes(image_order, 'RGB')
-            out[..., ri] = self.arr[0][idx[..., rj]]
-            out[..., gi] = self.arr[1][idx[..., gj]]
-            out[..., bi] = self.arr[2][idx[..., bj]]
+        rj, gj, bj = self.get_order_indexes(image_order, 'RGB')
+        out[..., ri] = self.arr[0][idx[..., rj]]
+        out[..., gi] = self.arr[1][idx[..., gj]]
+        out[..., bi] = self.arr[2][idx[..., bj]]
 
-    def get_rgbarray(self, idx, out=None, order='RGB', image_order='RGB'):
+    def get_rgbarray(self, idx, out=None, order='RGB', image_order='RGB',
+                     hash_key=None):
         # prepare output array
         shape = idx.shape
         depth = len(order)
@@ -287,19 +350,25 @@ class RGBMapper(Callback.Callbacks):
 
         res = RGBPlanes(out, order)
 
+        idx = self.get_hasharray(idx, hash_key=hash_key)
+
+        # _get_rgbarray() returns True if it has already filled in the
+        # alpha channel
+        has_alpha = self._get_rgbarray(idx, res, image_order)
+
         # set alpha channel
-        if res.hasAlpha:
+        if res.hasAlpha and not has_alpha:
             aa = res.get_slice('A')
             aa.fill(255)
 
-        idx = self.get_hasharray(idx)
-
-        self._get_rgbarray(idx, res, image_order)
-
         return res
 
-    def get_hasharray(self, idx):
-        return self.dist.hash_array(idx)
+    def get_hasharray(self, idx, hash_key=None):
+        # `hash_key` selects a table kept by a histogram equalization
+        # distribution (see ColorDist.HistogramEqualizationDist)
+        if hash_key is None:
+            return self.dist.hash_array(idx)
+        return self.dist.hash_array(idx, hash_key=hash_key)
 
     def _shift(self, sarr, pct, rotate=False):
         n = len(sarr)
@@ -330,6 +399,7 @@ class RGBMapper(Callback.Callbacks):
         assert len(work) == 256, \
                RGBMapError("shifted shift map is != 256")
         self.sarr = work
+        self.calc_lut()
         if callback:
             self.make_callback('changed')
 
@@ -367,6 +437,7 @@ class RGBMapper(Callback.Callbacks):
                RGBMapError("shifted shift map is != 256")
 
         self.sarr = work
+        self.calc_lut()
         if callback:
             self.make_callback('changed')
 
@@ -436,7 +507,7 @@ class PassThruRGBMapper(RGBMapper):
         # ignore passed in distribution
         self.dist = ColorDist.LinearDist(256)
 
-    def get_hasharray(self, idx):
+    def get_hasharray(self, idx, hash_key=None):
         # data is already constrained to 0..255 and we want to
         # bypass color redistribution
         return idx
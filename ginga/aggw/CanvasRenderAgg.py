@@ -12,13 +12,16 @@ import math
 import aggdraw as agg
 from . import AggHelp
 from itertools import chain
+from ginga.misc.LRUCache import LRUCache
 # force registration of all canvas types
 import ginga.canvas.types.all
 
 class RenderContext(object):
 
-    def __init__(self, viewer):
+    def __init__(self, viewer, cache=None):
         self.viewer = viewer
+        # cache of pens, brushes, fonts and text extents (an LRUCache)
+        self.cache = cache
 
         # TODO: encapsulate this drawable
         self.cr = AggHelp.AggContext(self.viewer.get_surface())
@@ -26,11 +29,34 @@ class RenderContext(object):
         self.pen = None
         self.brush = None
         self.font = None
+        self._font_key = None
 
-    def set_line_from_shape(self, shape):
+    def _get_cached(self, key, make_fn):
+        if self.cache is None:
+            return make_fn()
+        return self.cache.get(key, make_fn)
+
+    def _get_pen(self, color, alpha, linewidth, style):
         # TODO: support line width and style
+        return self._get_cached(('pen', color, alpha, linewidth, style),
+                                lambda: self.cr.get_pen(color, alpha=alpha))
+
+    def _get_brush(self, color, alpha):
+        return self._get_cached(('brush', color, alpha),
+                                lambda: self.cr.get_brush(color, alpha=alpha))
+
+    def _set_font(self, fontname, fontsize, color, alpha):
+        key = ('font', fontname, fontsize, color, alpha)
+        self.font = self._get_cached(
+            key, lambda: self.cr.get_font(fontname, fontsize, color,
+                                          alpha=alpha))
+        self._font_key = key
+
+    def set_line_from_shape(self, shape):
         alpha = getattr(shape, 'alpha', 1.0)
-        self.pen = self.cr.get_pen(shape.color, alpha=alpha)
+        linewidth = getattr(shape, 'linewidth', 1)
+        style = getattr(shape, 'linestyle', 'solid')
+        self.pen = self._get_pen(shape.color, alpha, linewidth, style)
 
     def set_fill_from_shape(self, shape):
         fill = getattr(shape, 'fill', False)
@@ -41,7 +67,7 @@ class RenderContext(object):
                 color = shape.color
             alpha = getattr(shape, 'alpha', 1.0)
             alpha = getattr(shape, 'fillalpha', alpha)
-            self.brush = self.cr.get_brush(color, alpha=alpha)
+            self.brush = self._get_brush(color, alpha)
         else:
             self.brush = None
 
@@ -52,10 +78,10 @@ class RenderContext(object):
             else:
                 fontsize = shape.scale_font(self.viewer)
             alpha = getattr(shape, 'alpha', 1.0)
-            self.font = self.cr.get_font(shape.font, fontsize, shape.color,
-                                         alpha=alpha)
+            self._set_font(shape.font, fontsize, shape.color, alpha)
         else:
             self.font = None
+            self._font_key = None
 
     def initialize_from_shape(self, shape, line=True, fill=True, font=True):
         if line:
@@ -66,21 +92,22 @@ class RenderContext(object):
             self.set_font_from_shape(shape)
 
     def set_line(self, color, alpha=1.0, linewidth=1, style='solid'):
-        # TODO: support line width and style
-        self.pen = self.cr.get_pen(color, alpha=alpha)
+        self.pen = self._get_pen(color, alpha, linewidth, style)
 
     def set_fill(self, color, alpha=1.0):
         if color is None:
             self.brush = None
         else:
-            self.brush = self.cr.get_brush(color, alpha=alpha)
+            self.brush = self._get_brush(color, alpha)
 
     def set_font(self, fontname, fontsize, color='black', alpha=1.0):
-        self.font = self.cr.get_font(fontname, fontsize, color,
-                                     alpha=alpha)
+        self._set_font(fontname, fontsize, color, alpha)
 
     def text_extents(self, text):
-        return self.cr.text_extents(text, self.font)
+        if self._font_key is None:
+            return self.cr.text_extents(text, self.font)
+        return self._get_cached(('extents', self._font_key, text),
+                                lambda: self.cr.text_extents(text, self.font))
 
     def get_affine_transform(self, cx, cy, rot_deg):
         x, y = 0, 0          # old center
@@ -100,7 +127,7 @@ class RenderContext(object):
 
     def draw_text(self, cx, cy, text, rot_deg=0.0):
 
-        wd, ht = self.cr.text_extents(text, self.font)
+        wd, ht = self.text_extents(text)
 
         self.cr.canvas.text((cx, cy-ht), text, self.font)
         ## affine = self.get_affine_transform(cx, cy-ht, rot_deg)
@@ -149,14 +176,38 @@ class RenderContext(object):
             path.lineto(pt[0], pt[1])
         self.cr.canvas.path(path, self.pen, self.brush)
 
+    def draw_lines(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        # draw all the line segments as one path
+        path = agg.Path()
+        for cx1, cy1, cx2, cy2 in zip(cx1_arr.tolist(), cy1_arr.tolist(),
+                                      cx2_arr.tolist(), cy2_arr.tolist()):
+            path.moveto(cx1, cy1)
+            path.lineto(cx2, cy2)
+        self.cr.canvas.path(path, self.pen)
+
+    def draw_circles(self, cx_arr, cy_arr, cradius_arr):
+        ellipse = self.cr.canvas.ellipse
+        for cx, cy, cradius in zip(cx_arr.tolist(), cy_arr.tolist(),
+                                   cradius_arr.tolist()):
+            ellipse((cx-cradius, cy-cradius, cx+cradius, cy+cradius),
+                    self.pen, self.brush)
+
+    def draw_rectangles(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        rectangle = self.cr.canvas.rectangle
+        for cx1, cy1, cx2, cy2 in zip(cx1_arr.tolist(), cy1_arr.tolist(),
+                                      cx2_arr.tolist(), cy2_arr.tolist()):
+            rectangle((cx1, cy1, cx2, cy2), self.pen, self.brush)
+
 
 class CanvasRenderer(object):
 
     def __init__(self, viewer):
         self.viewer = viewer
+        # pens, brushes, fonts and text extents reused between shapes
+        self.cache = LRUCache(maxsize=1024)
 
     def setup_cr(self, shape):
-        cr = RenderContext(self.viewer)
+        cr = RenderContext(self.viewer, cache=self.cache)
         cr.initialize_from_shape(shape, font=False)
         return cr
 
@@ -8,21 +8,34 @@ import math
 import cairo
 
 from ginga import colors
+from ginga.misc.LRUCache import LRUCache
 # force registration of all canvas types
 import ginga.canvas.types.all
 
 class RenderContext(object):
 
-    def __init__(self, viewer):
+    def __init__(self, viewer, cache=None):
         self.viewer = viewer
+        # cache of colors, font faces and text extents (an LRUCache)
+        self.cache = cache
 
         self.cr = viewer.get_offscreen_context()
 
         self.fill = False
         self.fill_color = None
         self.fill_alpha = 1.0
+        self._font_key = None
+
+    def _get_cached(self, key, make_fn):
+        if self.cache is None:
+            return make_fn()
+        return self.cache.get(key, make_fn)
 
     def __get_color(self, color, alpha):
+        return self._get_cached(('color', color, alpha),
+                                lambda: self.__lookup_color(color, alpha))
+
+    def __lookup_color(self, color, alpha):
         if isinstance(color, str) or isinstance(color, type(u"")):
             r, g, b = colors.lookup_color(color)
         elif isinstance(color, tuple):
@@ -73,8 +86,14 @@ class RenderContext(object):
                 fontsize = shape.fontsize
             else:
                 fontsize = shape.scale_font(self.viewer)
-            self.cr.select_font_face(shape.font)
-            self.cr.set_font_size(fontsize)
+            self._set_font(shape.font, fontsize)
+
+    def _set_font(self, fontname, fontsize):
+        face = self._get_cached(('font', fontname),
+                                lambda: cairo.ToyFontFace(fontname))
+        self.cr.set_font_face(face)
+        self.cr.set_font_size(fontsize)
+        self._font_key = (fontname, fontsize)
 
     def initialize_from_shape(self, shape, line=True, fill=True, font=True):
         if line:
@@ -101,14 +120,19 @@ class RenderContext(object):
             self.fill_alpha = alpha
 
     def set_font(self, fontname, fontsize, color='black', alpha=1.0):
-        self.cr.select_font_face(fontname)
-        self.cr.set_font_size(fontsize)
+        self._set_font(fontname, fontsize)
         self._set_color(color, alpha=alpha)
 
-    def text_extents(self, text):
+    def _text_extents(self, text):
         a, b, wd, ht, i, j = self.cr.text_extents(text)
         return wd, ht
 
+    def text_extents(self, text):
+        if self._font_key is None:
+            return self._text_extents(text)
+        return self._get_cached(('extents', self._font_key, text),
+                                lambda: self._text_extents(text))
+
     ##### DRAWING OPERATIONS #####
 
     def draw_text(self, cx, cy, text, rot_deg=0.0):
@@ -173,14 +197,45 @@ class RenderContext(object):
         self.cr.stroke()
         self.cr.new_path()
 
+    def draw_lines(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        # stroke all the line segments as one path
+        self.cr.set_line_cap(cairo.LINE_CAP_ROUND)
+        for cx1, cy1, cx2, cy2 in zip(cx1_arr.tolist(), cy1_arr.tolist(),
+                                      cx2_arr.tolist(), cy2_arr.tolist()):
+            self.cr.move_to(cx1, cy1)
+            self.cr.line_to(cx2, cy2)
+        self.cr.stroke()
+        self.cr.new_path()
+
+    def draw_circles(self, cx_arr, cy_arr, cradius_arr):
+        for cx, cy, cradius in zip(cx_arr.tolist(), cy_arr.tolist(),
+                                   cradius_arr.tolist()):
+            self.cr.new_sub_path()
+            self.cr.arc(cx, cy, cradius, 0, 2*math.pi)
+        self.cr.stroke_preserve()
+
+        self._draw_fill()
+        self.cr.new_path()
+
+    def draw_rectangles(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        for cx1, cy1, cx2, cy2 in zip(cx1_arr.tolist(), cy1_arr.tolist(),
+                                      cx2_arr.tolist(), cy2_arr.tolist()):
+            self.cr.rectangle(cx1, cy1, cx2 - cx1, cy2 - cy1)
+        self.cr.stroke_preserve()
+
+        self._draw_fill()
+        self.cr.new_path()
+
 
 class CanvasRenderer(object):
 
     def __init__(self, viewer):
         self.viewer = viewer
+        # colors, font faces and text extents reused between shapes
+        self.cache = LRUCache(maxsize=1024)
 
     def setup_cr(self, shape):
-        cr = RenderContext(self.viewer)
+        cr = RenderContext(self.viewer, cache=self.cache)
         cr.initialize_from_shape(shape, font=False)
         return cr
 
@@ -5,7 +5,8 @@
 # Please see the file LICENSE.txt for details.
 #
 from ginga.canvas.CompoundMixin import CompoundMixin
-from ginga.util.six.moves import map, filter
+from ginga.canvas.CanvasObject import new_change_stamp
+from ginga.util.six.moves import map, filter, zip
 
 __all__ = ['CanvasMixin']
 
@@ -20,20 +21,146 @@ class CanvasMixin(object):
     CompoundMixin in the inheritance (and so, method resolution) order.
     """
 
+    # more changed areas than this are redrawn as the whole window
+    max_dirty_rects = 1000
+
     def __init__(self):
         assert isinstance(self, CompoundMixin), "Missing CompoundMixin class"
         # holds the list of tags
         self.tags = {}
         self.count = 0
+        # areas of the window affected by changes since the last update
+        # (see mark_dirty())
+        self._dirty_rects = []
+        # marked objects, by id (None if too many to keep track of)
+        self._dirty_objs = {}
+        self._dirty_unknown = False
+        # objects changed after this were not redrawn by the last update
+        self._update_stamp = new_change_stamp()
+        # areas affected by the modification being reported
+        self._modified_rects = None
 
         for name in ('modified', ):
             self.enable_callback(name)
 
     def update_canvas(self, whence=3):
-        self.make_callback('modified', whence)
+        rects = None
+        if whence >= 3:
+            rects = self._get_dirty_rects()
+        self._clear_dirty()
+        self._modified(whence, rects)
 
     def redraw(self, whence=3):
-        self.make_callback('modified', whence)
+        self._clear_dirty()
+        self._modified(whence, None)
+
+    def mark_dirty(self, obj):
+        """
+        Note that an object on this canvas is about to be changed, so
+        that the next update_canvas(whence=3) only redraws the parts of
+        the window covered by the object before and after the change.
+        Updates without any marked objects, or after objects were
+        changed without being marked, redraw the whole window.
+        The object's entry in the spatial index (if enabled) is also
+        updated then.
+
+        Objects added, deleted, raised or lowered with the methods of
+        this canvas are marked whether or not they redraw.
+        """
+        if self._dirty_objs is None:
+            return
+        if len(self._dirty_objs) >= self.max_dirty_rects:
+            # too many changes to be worth keeping track of
+            self._dirty_objs = None
+            self._dirty_unknown = True
+            self._dirty_rects = []
+            return
+        self._dirty_objs[id(obj)] = obj
+        if self._dirty_unknown:
+            return
+        rects = self._get_canvas_rects(obj)
+        if (rects is None or
+                len(self._dirty_rects) + len(rects) > self.max_dirty_rects):
+            self._dirty_unknown = True
+            self._dirty_rects = []
+            return
+        self._dirty_rects.extend(rects)
+
+    def get_index_llur(self):
+        # changes to a canvas are reported to its container (see
+        # subcanvas_updated_cb()), so it can be put in a spatial index
+        llurs = [self._get_index_llur(obj) for obj in self.objects]
+        if (len(llurs) == 0) or any([llur is None for llur in llurs]):
+            return None
+        t_ = list(zip(*llurs))
+        return (min(t_[0]), min(t_[1]), max(t_[2]), max(t_[3]))
+
+    def _get_canvas_rects(self, obj):
+        viewer = getattr(self, 'viewer', None)
+        if viewer is None:
+            return None
+        try:
+            return obj.get_canvas_rects(viewer)
+        except Exception as e:
+            return None
+
+    def _changed_unmarked(self, objects, stamp):
+        # True if any of `objects` (or their parts) that are not marked
+        # dirty have been changed since `stamp`
+        for obj in objects:
+            if id(obj) in self._dirty_objs:
+                continue
+            if obj.get_change_stamp() > stamp:
+                return True
+            if obj.is_compound() and self._changed_unmarked(obj.objects,
+                                                            stamp):
+                return True
+        return False
+
+    def _get_dirty_rects(self):
+        if self._dirty_unknown or (len(self._dirty_objs) == 0):
+            return None
+        if self._changed_unmarked(self.objects, self._update_stamp):
+            # the areas of some changes are unknown
+            return None
+        rects = list(self._dirty_rects)
+        for obj in self._dirty_objs.values():
+            # add the area of the object after the change
+            _rects = self._get_canvas_rects(obj)
+            if _rects is None:
+                return None
+            rects.extend(_rects)
+        return rects
+
+    def _clear_dirty(self):
+        if self._dirty_objs is None:
+            self.update_index()
+        else:
+            for obj in self._dirty_objs.values():
+                self.update_index(obj)
+        self._dirty_rects = []
+        self._dirty_objs = {}
+        self._dirty_unknown = False
+        self._update_stamp = new_change_stamp()
+
+    def _modified(self, whence, rects):
+        save_rects, self._modified_rects = self._modified_rects, rects
+        try:
+            self.make_callback('modified', whence)
+        finally:
+            self._modified_rects = save_rects
+
+    def get_modified_rects(self):
+        """
+        Get the areas of the window affected by the modification of this
+        canvas that is currently being reported by the 'modified' callback.
+
+        Returns
+        -------
+        rects: a list of (x1, y1, x2, y2) rectangles in canvas (window)
+            coordinates, or None if the whole window is affected
+        """
+        return self._modified_rects
 
     def subcanvas_updated_cb(self, canvas, whence):
         """
@@ -44,7 +171,14 @@ class CanvasMixin(object):
         # avoid self-referential loops
         if canvas != self:
             #print("%s subcanvas %s was updated" % (self.name, canvas.name))
-            self.make_callback('modified', whence)
+            self.update_index(canvas)
+            rects = None
+            if ((whence >= 3) and hasattr(canvas, 'get_modified_rects') and
+                    (getattr(canvas, 'viewer', None) is
+                     getattr(self, 'viewer', None))):
+                # (the areas are only valid in the subcanvas' viewer)
+                rects = canvas.get_modified_rects()
+            self._modified(whence, rects)
 
     def add(self, obj, tag=None, tagpfx=None, belowThis=None, redraw=True):
         self.count += 1
@@ -65,6 +199,7 @@ class CanvasMixin(object):
         obj.tag = tag
         self.tags[tag] = obj
         self.add_object(obj, belowThis=belowThis)
+        self.mark_dirty(obj)
 
         # propagate change notification on this canvas
         if obj.has_callback('modified'):
@@ -78,6 +213,7 @@ class CanvasMixin(object):
         for tag in tags:
             try:
                 obj = self.tags[tag]
+                self.mark_dirty(obj)
                 del self.tags[tag]
                 super(CanvasMixin, self).delete_object(obj)
             except Exception as e:
@@ -111,6 +247,7 @@ class CanvasMixin(object):
     def delete_all_objects(self, redraw=True):
         self.tags = {}
         CompoundMixin.delete_all_objects(self)
+        self._dirty_unknown = True
 
         if redraw:
             self.update_canvas(whence=3)
@@ -134,6 +271,7 @@ class CanvasMixin(object):
             obj2 = self.get_object_by_tag(aboveThis)
             self.raise_object(obj1, obj2)
 
+        self.mark_dirty(obj1)
         if redraw:
             self.update_canvas(whence=3)
 
@@ -145,6 +283,7 @@ class CanvasMixin(object):
             obj2 = self.get_object_by_tag(belowThis)
             self.lower_object(obj1, obj2)
 
+        self.mark_dirty(obj1)
         if redraw:
             self.update_canvas(whence=3)
 
@@ -5,6 +5,7 @@
 # Please see the file LICENSE.txt for details.
 #
 import math
+import itertools
 import numpy
 from collections import namedtuple
 
@@ -21,6 +22,14 @@ colors_plus_none = [ None ] + colors.get_colors()
 
 Point = namedtuple('Point', ['x', 'y'])
 
+# stamps the changes made to canvas objects (see CanvasObjectBase.__setattr__)
+_change_count = itertools.count(1)
+
+def new_change_stamp():
+    """Get a stamp that is later than the last change made to any canvas
+    object so far."""
+    return next(_change_count)
+
 class EditPoint(Point):
     edit_color = 'yellow'
 class MovePoint(EditPoint):
@@ -63,6 +72,19 @@ class CanvasObjectBase(Callback.Callbacks):
         for name in ('edited', 'pick-down', 'pick-move', 'pick-up'):
             self.enable_callback(name)
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith('_'):
+            # stamp the change, so that a canvas can tell that the object
+            # was changed without being marked (see CanvasMixin.mark_dirty())
+            self.__dict__['_changed'] = next(_change_count)
+
+    def get_change_stamp(self):
+        """Get the stamp of the last change made to an attribute of this
+        object, or 0 if none.  Compare with new_change_stamp().
+        """
+        return self.__dict__.get('_changed', 0)
+
     def initialize(self, canvas, viewer, logger):
         self.viewer = viewer
         self.logger = logger
@@ -496,8 +518,13 @@ class CanvasObjectBase(Callback.Callbacks):
             ctr_x, ctr_y = self.get_center_pt()
             points = trcalc.rotate_coord(points, self.rot_deg, (ctr_x, ctr_y))
 
-        cpoints = tuple(map(lambda p: self.canvascoords(viewer, p[0], p[1]),
-                            points))
+        if len(points) == 0:
+            return ()
+
+        # map all the points to the window at once
+        cx, cy = self.canvascoords(viewer, points.T[0], points.T[1])
+        cpoints = tuple(zip(numpy.asarray(cx).tolist(),
+                            numpy.asarray(cy).tolist()))
         return cpoints
 
     def get_bbox(self):
@@ -512,6 +539,46 @@ class CanvasObjectBase(Callback.Callbacks):
         x1, y1, x2, y2 = self.get_llur()
         return ((x1, y1), (x1, y2), (x2, y2), (x2, y1))
 
+    def get_index_llur(self):
+        """
+        Get the bounding box used to put this object in the spatial
+        index of a canvas (see CompoundMixin.enable_spatial_index()).
+
+        Returns
+        -------
+        x1, y1, x2, y2: a 4-tuple of the lower-left and upper-right coords
+            in data coordinates, or None if the extent of the object is
+            not fixed in data coordinates
+        """
+        if self.coord != 'data':
+            # position changes with the pan, zoom or image
+            return None
+        return self.get_llur()
+
+    def get_canvas_rects(self, viewer):
+        """
+        Get the areas of the window that drawing this object covers.
+        This is used to limit redrawing to the parts of the window that
+        change when the object is added, changed or deleted.
+
+        Returns
+        -------
+        rects: a list of (x1, y1, x2, y2) rectangles in canvas (window)
+            coordinates, or None if the area is not known
+        """
+        try:
+            points = list(self.get_cpoints(viewer, points=self.get_bbox(),
+                                           no_rotate=True))
+            points.extend(self.get_cpoints(viewer))
+        except Exception:
+            return None
+
+        t_ = numpy.asarray(points, dtype=numpy.double).T
+        # allow for line widths, caps, arrowheads and edit control points
+        pad = 16 + self.cap_radius + getattr(self, 'linewidth', 1)
+        return [(t_[0].min() - pad, t_[1].min() - pad,
+                 t_[0].max() + pad, t_[1].max() + pad)]
+
 
 # this is the data structure to which drawing classes are registered
 drawCatalog = Bunch.Bunch(caseless=True)
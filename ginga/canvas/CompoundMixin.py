@@ -12,6 +12,7 @@ import numpy
 
 from ginga.util.six.moves import map, zip, reduce, filter
 from ginga.canvas import coordmap
+from ginga.canvas.gridindex import GridIndex
 
 __all__ = ['CompoundMixin']
 
@@ -33,6 +34,11 @@ class CompoundMixin(object):
             self.coord = None
         self.opaque = False
         self._contains_reduce = numpy.logical_or
+        # optional spatial index of the objects (see enable_spatial_index())
+        self._sindex = None
+        self._sindex_pad = 32
+        self._sindex_order = None
+        self._sindex_next = 0
 
     def get_llur(self):
         """
@@ -50,6 +56,29 @@ class CompoundMixin(object):
         x2, y2 = max(t_[0].max(), t_[0].max()), min(t_[1].max(), t_[3].max())
         return (x1, y1, x2, y2)
 
+    def get_canvas_rects(self, viewer):
+        """
+        Get the areas of the window that drawing this compound object
+        covers.
+
+        Returns
+        -------
+        rects: a list of (x1, y1, x2, y2) rectangles in canvas (window)
+            coordinates, or None if the area is not known
+        """
+        res = []
+        for obj in self.objects:
+            rects = obj.get_canvas_rects(viewer)
+            if rects is None:
+                return None
+            res.extend(rects)
+        return res
+
+    def get_index_llur(self):
+        # a compound object can be changed without its container being
+        # notified, so it is not put in a spatial index
+        return None
+
     def get_edit_points(self, viewer):
         x1, y1, x2, y2 = self.get_llur()
         return [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
@@ -60,14 +89,14 @@ class CompoundMixin(object):
                           self.objects))
 
     def contains(self, x, y):
-        for obj in self.objects:
+        for obj in self._get_objects_at(x, y):
             if obj.contains(x, y):
                 return True
         return False
 
     def get_items_at(self, x, y):
         res = []
-        for obj in self.objects:
+        for obj in self._get_objects_at(x, y):
             if obj.contains(x, y):
                 #res.insert(0, obj)
                 res.append(obj)
@@ -80,7 +109,7 @@ class CompoundMixin(object):
         return filter(lambda obj: obj.kind in kinds, self.objects)
 
     def select_contains(self, viewer, x, y):
-        for obj in self.objects:
+        for obj in self._get_objects_at(x, y, viewer=viewer):
             if obj.select_contains(viewer, x, y):
                 return True
         return False
@@ -88,7 +117,7 @@ class CompoundMixin(object):
     def select_items_at(self, viewer, x, y, test=None):
         res = []
         try:
-            for obj in self.objects:
+            for obj in self._get_objects_at(x, y, viewer=viewer):
                 if obj.is_compound() and not obj.opaque:
                     # compound object, list up compatible members
                     res.extend(obj.select_items_at(viewer, x, y, test=test))
@@ -145,9 +174,131 @@ class CompoundMixin(object):
             obj.use_coordmap(mapobj)
 
     def draw(self, viewer):
-        for obj in self.objects:
+        for obj in self._get_visible_objects(viewer):
             obj.draw(viewer)
 
+    ##### SPATIAL INDEX #####
+
+    def enable_spatial_index(self, tf, cell_size=None):
+        """
+        Enable or disable a spatial index of the objects in this compound
+        object.  With an index, drawing skips the objects outside of the
+        area being drawn and finding the objects at a point only tests
+        the objects near it, which speeds up compounds holding many
+        objects (e.g. catalog markers).
+
+        Objects are indexed by the bounding box returned by their
+        get_index_llur() method; objects returning None (e.g. those
+        drawn in window coordinates) are always drawn and tested.
+        The index is updated when objects are added, deleted or moved
+        by the methods of this object.  Objects changed by other means
+        must be reported with update_index() (canvases also update the
+        index for objects reported with mark_dirty()).
+
+        Parameters
+        ----------
+        tf : bool
+            True to enable the index, False to disable it
+        cell_size : float or None
+            Size of the index cells in data coordinates; None picks a
+            size from the extent and number of the objects
+        """
+        if tf:
+            self._sindex = GridIndex(cell_size=cell_size)
+            self._sindex_order = None
+            for obj in self.objects:
+                self._sindex.insert(obj, self._get_index_llur(obj))
+        else:
+            self._sindex = None
+            self._sindex_order = None
+
+    def update_index(self, obj=None):
+        """
+        Update the spatial index (if enabled) after changing the position
+        or size of `obj`, or after changing any objects if `obj` is None.
+        """
+        if self._sindex is None:
+            return
+        if obj is None:
+            self.enable_spatial_index(True, cell_size=self._sindex.cell_size)
+        elif obj in self._sindex:
+            self._sindex.update(obj, self._get_index_llur(obj))
+
+    def _get_index_llur(self, obj):
+        try:
+            return obj.get_index_llur()
+        except Exception as e:
+            return None
+
+    def _get_index_order(self):
+        if self._sindex_order is None:
+            self._sindex_order = dict([(id(obj), i)
+                                       for i, obj in enumerate(self.objects)])
+            self._sindex_next = len(self.objects)
+        return self._sindex_order
+
+    def _query_index(self, rects):
+        """
+        Get the objects whose index bounding boxes overlap any of a list
+        of (x1, y1, x2, y2) rectangles in data coordinates, in drawing
+        order.
+        """
+        if len(self._sindex) != len(self.objects):
+            # objects list was changed behind our back
+            self.update_index()
+        res = {}
+        for x1, y1, x2, y2 in rects:
+            res.update(self._sindex.query(x1, y1, x2, y2))
+        if len(res) == len(self.objects):
+            return self.objects
+        order = self._get_index_order()
+        return sorted(res.values(), key=lambda obj: order[id(obj)])
+
+    def _get_objects_at(self, x, y, viewer=None):
+        """
+        Get the objects that might contain the data point (x, y), in
+        drawing order.  If `viewer` is given, allow for selection
+        tolerances in window pixels.
+        """
+        if self._sindex is None:
+            return self.objects
+        # allow for objects that test containment with a tolerance
+        pad = 1.0
+        if viewer is not None:
+            try:
+                pad = max(pad, self._sindex_pad / viewer.get_scale_min())
+            except Exception as e:
+                return self.objects
+        return self._query_index([(x - pad, y - pad, x + pad, y + pad)])
+
+    def _get_visible_objects(self, viewer):
+        """
+        Get the objects that might be visible in the area of `viewer`
+        being drawn, in drawing order.
+        """
+        if self._sindex is None:
+            return self.objects
+        try:
+            rects = viewer.get_clip_rects()
+            if rects is None:
+                wd, ht = viewer.get_window_size()
+                rects = [(0, 0, wd, ht)]
+            # allow for parts of objects drawn in window pixels, like
+            # line widths, caps and text
+            pad = self._sindex_pad / viewer.get_scale_min()
+
+            drects = []
+            for x1, y1, x2, y2 in rects:
+                # map the corners of the window area to data coordinates
+                points = [viewer.get_data_xy(x, y)
+                          for x, y in ((x1, y1), (x2, y1), (x2, y2), (x1, y2))]
+                t_ = numpy.asarray(points, dtype=numpy.double).T
+                drects.append((t_[0].min() - pad, t_[1].min() - pad,
+                               t_[0].max() + pad, t_[1].max() + pad))
+        except Exception as e:
+            return self.objects
+        return self._query_index(drects)
+
     def get_objects(self):
         return self.objects
 
@@ -156,6 +307,10 @@ class CompoundMixin(object):
 
     def delete_object(self, obj):
         self.objects.remove(obj)
+        if self._sindex is not None:
+            self._sindex.remove(obj)
+            if self._sindex_order is not None:
+                self._sindex_order.pop(id(obj), None)
 
     def delete_objects(self, objects):
         for obj in objects:
@@ -163,6 +318,9 @@ class CompoundMixin(object):
 
     def delete_all_objects(self):
         self.objects[:] = []
+        if self._sindex is not None:
+            self._sindex.clear()
+            self._sindex_order = None
 
     def roll_objects(self, n):
         num = len(self.objects)
@@ -170,12 +328,14 @@ class CompoundMixin(object):
             return
         n = n % num
         self.objects = self.objects[-n:] + self.objects[:-n]
+        self._sindex_order = None
 
     def swap_objects(self):
         num = len(self.objects)
         if num >= 2:
             l = self.objects
             self.objects = l[:num-2] + [l[num-1], l[num-2]]
+            self._sindex_order = None
 
     def set_attr_all(self, **kwdargs):
         for obj in self.objects:
@@ -189,9 +349,16 @@ class CompoundMixin(object):
 
         if belowThis is None:
             self.objects.append(obj)
+            if self._sindex_order is not None:
+                self._sindex_order[id(obj)] = self._sindex_next
+                self._sindex_next += 1
         else:
             index = self.objects.index(belowThis)
             self.objects.insert(index, obj)
+            self._sindex_order = None
+
+        if self._sindex is not None:
+            self._sindex.insert(obj, self._get_index_llur(obj))
 
     def raise_object(self, obj, aboveThis=None):
         if aboveThis is None:
@@ -204,6 +371,7 @@ class CompoundMixin(object):
             self.objects.remove(obj)
             index = self.objects.index(aboveThis)
             self.objects.insert(index+1, obj)
+        self._sindex_order = None
 
     def lower_object(self, obj, belowThis=None):
         if belowThis is None:
@@ -216,14 +384,17 @@ class CompoundMixin(object):
             self.objects.remove(obj)
             index = self.objects.index(belowThis)
             self.objects.insert(index, obj)
+        self._sindex_order = None
 
     def rotate(self, theta, xoff=0, yoff=0):
         for obj in self.objects:
             obj.rotate(theta, xoff=xoff, yoff=yoff)
+        self.update_index()
 
     def move_delta(self, xoff, yoff):
         for obj in self.objects:
             obj.move_delta(xoff, yoff)
+        self.update_index()
 
     def rotate_by(self, theta_deg):
         ref_x, ref_y = self.get_reference_pt()
@@ -233,6 +404,7 @@ class CompoundMixin(object):
     def scale_by(self, scale_x, scale_y):
         for obj in self.objects:
             obj.scale_by(scale_x, scale_y)
+        self.update_index()
 
     def get_reference_pt(self):
         # Reference point for a compound object is the average of all
@@ -247,9 +419,11 @@ class CompoundMixin(object):
         x, y = self.get_reference_pt()
         for obj in self.objects:
             obj.move_delta(xdst - x, ydst - y)
+        self.update_index()
 
     def reorder_layers(self):
         self.objects.sort(key=lambda obj: getattr(obj, '_zorder', 0))
+        self._sindex_order = None
         for obj in self.objects:
             if obj.is_compound():
                 obj.reorder_layers()
@@ -184,9 +184,14 @@ class DrawingMixin(object):
 
         obj = klass.idraw(self, cxt)
 
+        # only the areas of the old and new drawing objects need redrawing
+        if self._draw_obj is not None:
+            self.mark_dirty(self._draw_obj)
+
         if obj is not None:
             obj.initialize(self, cxt.viewer, self.logger)
             self._draw_obj = obj
+            self.mark_dirty(obj)
             if time.time() - self._process_time > self._delta_time:
                 self.process_drawing()
 
@@ -295,6 +300,9 @@ class DrawingMixin(object):
 
     def process_drawing(self):
         self._process_time = time.time()
+        # objects being edited may have been moved
+        for obj in self._selected:
+            self.update_index(obj)
         #self.redraw(whence=3)
         self.update_canvas()
 
@@ -708,6 +716,13 @@ class DrawingMixin(object):
                 cr = viewer.renderer.setup_cr(obj)
                 obj.draw_edit(cr, viewer)
 
+    def get_canvas_rects(self, viewer):
+        if self._draw_obj or (len(self._selected) > 0):
+            # the drawing object and the edit control points are
+            # drawn in addition to the objects
+            return None
+        return super(DrawingMixin, self).get_canvas_rects(viewer)
+
 
     ### NON-PEP8 EQUIVALENTS -- TO BE DEPRECATED ###
 
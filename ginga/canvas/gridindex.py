@@ -0,0 +1,195 @@
+#
+# gridindex.py -- a simple spatial index for canvas objects.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+import math
+
+__all__ = ['GridIndex']
+
+
+def _is_finite(bbox):
+    for val in bbox:
+        if math.isinf(val) or math.isnan(val):
+            return False
+    return True
+
+
+class GridIndex(object):
+    """A uniform grid spatial index of items by their bounding boxes.
+
+    Items are stored with a bounding box ``(x1, y1, x2, y2)`` and the
+    index is queried for the items whose boxes overlap a rectangle.
+    Items whose box is `None` (extent unknown) or that cover a very
+    large number of cells are returned by every query.
+
+    The grid is laid out lazily on the first query, with a cell size
+    chosen from the extent and number of the items, so that building up
+    a large index item by item is cheap.
+
+    Parameters
+    ----------
+    cell_size : float or `None`
+        Size of the (square) grid cells.  `None` picks a size when the
+        grid is laid out.
+
+    max_cells : int
+        Items covering more cells than this are not put in the grid.
+
+    """
+
+    def __init__(self, cell_size=None, max_cells=256):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+
+        # item id -> (item, bbox)
+        self._items = {}
+        # (i, j) -> {item id: item}
+        self._cells = {}
+        # item id -> list of cell keys the item is in
+        self._keys = {}
+        # item id -> item, returned by every query
+        self._always = {}
+        self._cell_size = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return id(item) in self._items
+
+    def clear(self):
+        self._items = {}
+        self._reset_grid()
+
+    def _reset_grid(self):
+        self._cells = {}
+        self._keys = {}
+        self._always = {}
+        self._cell_size = None
+
+    def insert(self, item, bbox):
+        """Add `item` to the index with bounding box `bbox`."""
+        key = id(item)
+        if key in self._items:
+            self._unlink(key)
+        self._items[key] = (item, bbox)
+        if self._cell_size is not None:
+            self._link(key, item, bbox)
+
+    def update(self, item, bbox):
+        """Change the bounding box of `item` in the index."""
+        self.insert(item, bbox)
+
+    def remove(self, item):
+        """Remove `item` from the index, if present."""
+        key = id(item)
+        if key in self._items:
+            self._unlink(key)
+            del self._items[key]
+
+    def query(self, x1, y1, x2, y2):
+        """Get the items whose bounding boxes overlap a rectangle.
+
+        Returns
+        -------
+        items : dict
+            Item id -> item for all the items whose bounding boxes
+            overlap the rectangle, plus all the items with unknown extent.
+
+        """
+        if self._cell_size is None:
+            self._layout()
+
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        try:
+            i1, j1, i2, j2 = self._cell_range(x1, y1, x2, y2)
+        except (ValueError, OverflowError):
+            # non-finite rectangle
+            return dict([(key, tup[0]) for key, tup in self._items.items()])
+
+        res = dict(self._always)
+        if (i2 - i1 + 1) * (j2 - j1 + 1) > len(self._cells):
+            # rectangle covers more cells than there are in use
+            keys = [k for k in self._cells.keys()
+                    if i1 <= k[0] <= i2 and j1 <= k[1] <= j2]
+        else:
+            keys = [(i, j) for i in range(i1, i2 + 1)
+                    for j in range(j1, j2 + 1)]
+
+        items = self._items
+        for k in keys:
+            cell = self._cells.get(k, None)
+            if cell is None:
+                continue
+            for key in cell:
+                if key in res:
+                    continue
+                bx1, by1, bx2, by2 = items[key][1]
+                if bx1 <= x2 and bx2 >= x1 and by1 <= y2 and by2 >= y1:
+                    res[key] = cell[key]
+        return res
+
+    def _layout(self):
+        self._reset_grid()
+        cell_size = self.cell_size
+        if cell_size is None:
+            cell_size = self._calc_cell_size()
+        self._cell_size = cell_size
+        for key, tup in self._items.items():
+            self._link(key, tup[0], tup[1])
+
+    def _calc_cell_size(self):
+        bboxes = [tup[1] for tup in self._items.values()
+                  if (tup[1] is not None) and _is_finite(tup[1])]
+        if len(bboxes) == 0:
+            return 1.0
+        x1 = min([b[0] for b in bboxes])
+        y1 = min([b[1] for b in bboxes])
+        x2 = max([b[2] for b in bboxes])
+        y2 = max([b[3] for b in bboxes])
+        # aim for a few items per cell, but no smaller than the items
+        size = math.sqrt(max(x2 - x1, 1.0) * max(y2 - y1, 1.0) /
+                         len(bboxes)) * 2.0
+        avg = sum([max(b[2] - b[0], b[3] - b[1]) for b in bboxes]) / \
+              len(bboxes)
+        return max(size, avg, 1.0)
+
+    def _cell_range(self, x1, y1, x2, y2):
+        size = self._cell_size
+        return (int(math.floor(x1 / size)), int(math.floor(y1 / size)),
+                int(math.floor(x2 / size)), int(math.floor(y2 / size)))
+
+    def _link(self, key, item, bbox):
+        if bbox is None:
+            self._always[key] = item
+            return
+        try:
+            i1, j1, i2, j2 = self._cell_range(*bbox)
+        except (ValueError, OverflowError):
+            # non-finite bounding box
+            self._always[key] = item
+            return
+        if (i2 - i1 + 1) * (j2 - j1 + 1) > self.max_cells:
+            self._always[key] = item
+            return
+        keys = []
+        for i in range(i1, i2 + 1):
+            for j in range(j1, j2 + 1):
+                k = (i, j)
+                cell = self._cells.setdefault(k, {})
+                cell[key] = item
+                keys.append(k)
+        self._keys[key] = keys
+
+    def _unlink(self, key):
+        self._always.pop(key, None)
+        for k in self._keys.pop(key, []):
+            cell = self._cells[k]
+            del cell[key]
+            if len(cell) == 0:
+                del self._cells[k]
+
+#END
@@ -7,5 +7,6 @@ from .image import *
 from .layer import *
 from .utils import *
 from .astro import *
+from .markers import *
 
 #END
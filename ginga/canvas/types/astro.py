@@ -232,6 +232,13 @@ class Ruler(TwoPointMixin, CanvasObjectBase):
         if self.showcap:
             self.draw_caps(cr, self.cap, ((cx2, cy1), ))
 
+    def get_canvas_rects(self, viewer):
+        # the text labels can be drawn outside of the bounding box
+        return None
+
+    def get_index_llur(self):
+        return None
+
 
 class Compass(OnePointOneRadiusMixin, CanvasObjectBase):
     """Draws a WCS compass on a DrawingCanvas.
@@ -349,6 +356,13 @@ class Compass(OnePointOneRadiusMixin, CanvasObjectBase):
         if self.showcap:
             self.draw_caps(cr, self.cap, ((cx1, cy1), ))
 
+    def get_canvas_rects(self, viewer):
+        # the text labels can be drawn outside of the bounding box
+        return None
+
+    def get_index_llur(self):
+        return None
+
     def get_textpos(self, cr, text, cx1, cy1, cx2, cy2):
         htwd, htht = cr.text_extents(text)
         diag_xoffset = 0
@@ -489,6 +503,23 @@ class Crosshair(OnePointMixin, CanvasObjectBase):
         cr.set_line(self.textcolor, alpha=self.alpha)
         cr.draw_text(cx+10, cy+4+txtht, text)
 
+    def get_canvas_rects(self, viewer):
+        wd, ht = viewer.get_window_size()
+        cx, cy = self.get_cpoints(viewer)[0]
+        pad = 2 + self.linewidth
+        fontsize = self.fontsize
+        if fontsize is None:
+            fontsize = self.scale_font(viewer)
+        txtht = 2 * fontsize
+        # the two lines and the text to the right of the center
+        return [(0, cy - pad, wd, cy + pad),
+                (cx - pad, 0, cx + pad, ht),
+                (cx, cy - pad, wd, cy + 4 + txtht + pad)]
+
+    def get_index_llur(self):
+        # the lines span the window
+        return None
+
 
 class AnnulusMixin(object):
 
@@ -92,6 +92,13 @@ class Text(OnePointMixin, CanvasObjectBase):
         if self.showcap:
             self.draw_caps(cr, self.cap, cpoints)
 
+    def get_canvas_rects(self, viewer):
+        # the extent of the text depends on the font
+        return None
+
+    def get_index_llur(self):
+        return None
+
 class Polygon(PolygonMixin, CanvasObjectBase):
     """Draws a polygon on a DrawingCanvas.
     Parameters are:
@@ -4,6 +4,8 @@
 # This is open-source software licensed under a BSD license.
 # Please see the file LICENSE.txt for details.
 #
+import math
+import itertools
 import numpy
 
 from ginga.canvas.CanvasObject import (CanvasObjectBase, _bool, _color,
@@ -12,10 +14,13 @@ from ginga.canvas.CanvasObject import (CanvasObjectBase, _bool, _color,
                                        colors_plus_none)
 from ginga.misc.ParamSet import Param
 from ginga.misc import Bunch
-from ginga import trcalc
+from ginga import trcalc, ColorDist
 
 from .mixins import OnePointMixin
 
+# for keying histogram equalization tables calculated from cutouts
+_histeq_count = itertools.count()
+
 class Image(OnePointMixin, CanvasObjectBase):
     """Draws an image on a ImageViewCanvas.
     Parameters are:
@@ -134,6 +139,13 @@ class Image(OnePointMixin, CanvasObjectBase):
         if self.showcap:
             self.draw_caps(cr, self.cap, cpoints)
 
+    def get_canvas_rects(self, viewer):
+        # the image itself is composited into the backing image, which
+        # is only remade by a full redraw
+        return None
+
+    def get_index_llur(self):
+        return None
 
     def draw_image(self, viewer, dstarr, whence=0.0):
         if self.image is None:
@@ -145,7 +157,7 @@ class Image(OnePointMixin, CanvasObjectBase):
         dst_order = viewer.get_rgb_order()
         image_order = self.image.get_order()
 
-        if (whence <= 0.0) or (cache.cutout is None) or (not self.optimize):
+        if (whence <= 0.5) or (cache.cutout is None) or (not self.optimize):
             # get extent of our data coverage in the window
             ((x0, y0), (x1, y1), (x2, y2), (x3, y3)) = viewer.get_pan_rect()
             xmin = int(min(x0, x1, x2, x3))
@@ -177,10 +189,12 @@ class Image(OnePointMixin, CanvasObjectBase):
             # scale additionally by our scale
             _scale_x, _scale_y = scale_x * self.scale_x, scale_y * self.scale_y
 
-            res = self.image.get_scaled_cutout(a1, b1, a2, b2,
-                                               _scale_x, _scale_y,
-                                               #flipy=self.flipy,
-                                               method=self.interpolation)
+            with viewer.render_stats.timer('cutout'):
+                interp = self._get_interpolation(viewer)
+                res = self.image.get_scaled_cutout(a1, b1, a2, b2,
+                                                   _scale_x, _scale_y,
+                                                   #flipy=self.flipy,
+                                                   method=interp)
 
             # don't ask for an alpha channel from overlaid image if it
             # doesn't have one
@@ -214,14 +228,25 @@ class Image(OnePointMixin, CanvasObjectBase):
 
         # composite the image into the destination array at the
         # calculated position
-        trcalc.overlay_image(dstarr, cache.cvs_x, cache.cvs_y, cache.cutout,
-                             dst_order=dst_order, src_order=image_order,
-                             alpha=self.alpha, flipy=False)
+        with viewer.render_stats.timer('overlay'):
+            trcalc.overlay_image(dstarr, cache.cvs_x, cache.cvs_y,
+                                 cache.cutout,
+                                 dst_order=dst_order, src_order=image_order,
+                                 alpha=self.alpha, flipy=False)
 
     def _reset_cache(self, cache):
         cache.setvals(cutout=None, drawn=False, cvs_x=0, cvs_y=0)
         return cache
 
+    def _get_interpolation(self, viewer):
+        """Get the interpolation method to use for drawing in `viewer`.
+        While the viewer is drawing drafts during an interaction (see
+        ImageViewBase.start_interaction()) this is the cheapest method.
+        """
+        if viewer.is_draft():
+            return 'basic'
+        return self.interpolation
+
     def reset_optimize(self):
         for cache in self._cache.values():
             self._reset_cache(cache)
@@ -357,6 +382,9 @@ class NormImage(Image):
             Param(name='optimize', type=_bool,
                   default=True, valid=[False, True],
                   description="Optimize rendering for this object"),
+            Param(name='use_lut', type=_bool,
+                  default=True, valid=[False, True],
+                  description="Map 8/16 bit integer data to RGB with a single lookup table"),
             ## Param(name='rgbmap', type=?,
             ##       description="RGB mapper for the image"),
             ## Param(name='autocuts', type=?,
@@ -366,7 +394,8 @@ class NormImage(Image):
     def __init__(self, x, y, image, alpha=1.0, scale_x=1.0, scale_y=1.0,
                  interpolation='basic',
                  linewidth=0, linestyle='solid', color='lightgreen', showcap=False,
-                 optimize=True, rgbmap=None, autocuts=None, **kwdargs):
+                 optimize=True, rgbmap=None, autocuts=None, use_lut=True,
+                 **kwdargs):
         self.kind = 'normimage'
         super(NormImage, self).__init__(x=x, y=y, image=image, alpha=alpha,
                                             scale_x=scale_x, scale_y=scale_y,
@@ -377,6 +406,7 @@ class NormImage(Image):
                                             **kwdargs)
         self.rgbmap = rgbmap
         self.autocuts = autocuts
+        self.use_lut = use_lut
 
 
     def draw_image(self, viewer, dstarr, whence=0.0):
@@ -386,94 +416,510 @@ class NormImage(Image):
         #print("redraw whence=%f" % (whence))
         cache = self.get_cache(viewer)
 
-        if (whence <= 0.0) or (cache.cutout is None) or (not self.optimize):
-            # get extent of our data coverage in the window
-            ((x0, y0), (x1, y1), (x2, y2), (x3, y3)) = viewer.get_pan_rect()
-            xmin = int(min(x0, x1, x2, x3))
-            ymin = int(min(y0, y1, y2, y3))
-            xmax = int(max(x0, x1, x2, x3))
-            ymax = int(max(y0, y1, y2, y3))
-
-            # destination location in data_coords
-            dst_x, dst_y = self.x, self.y
-
-            a1, b1, a2, b2 = 0, 0, self.image.width, self.image.height
+        if self.rgbmap is not None:
+            rgbmap = self.rgbmap
+        else:
+            rgbmap = viewer.get_rgbmap()
 
-            # calculate the cutout that we can make and scale to merge
-            # onto the final image--by only cutting out what is necessary
-            # this speeds scaling greatly at zoomed in sizes
-            dst_x, dst_y, a1, b1, a2, b2 = \
-                   trcalc.calc_image_merge_clip(xmin, ymin, xmax, ymax,
-                                                dst_x, dst_y, a1, b1, a2, b2)
+        dst_order = viewer.get_rgb_order()
+        image_order = self.image.get_order()
+        get_order = dst_order
+        if ('A' in dst_order) and not ('A' in image_order):
+            get_order = dst_order.replace('A', '')
 
+        # if only the pan position has changed, try to shift the pixels
+        # we have already color mapped and only calculate the newly
+        # exposed areas
+        panned = False
+        if (0.0 < whence <= 0.5) and self.optimize:
+            with viewer.render_stats.timer('cutout'):
+                panned = self._pan_cache(viewer, dstarr, cache, rgbmap,
+                                         dst_order, image_order, get_order)
+
+        if (not panned) and ((whence <= 0.5) or (cache.cutout is None) or
+                             (not self.optimize)):
+            rect = self._calc_cutout_rect(viewer, dstarr)
             # is image completely off the screen?
-            if (a2 - a1 <= 0) or (b2 - b1 <= 0):
+            if rect is None:
                 # no overlay needed
                 #print "no overlay needed"
                 return
+            a1, b1, a2, b2, cvs_x, cvs_y = rect
 
             # cutout and scale the piece appropriately by viewer scale
             scale_x, scale_y = viewer.get_scale_xy()
             # scale additionally by our scale
             _scale_x, _scale_y = scale_x * self.scale_x, scale_y * self.scale_y
 
-            res = self.image.get_scaled_cutout(a1, b1, a2, b2,
-                                               _scale_x, _scale_y,
-                                               method=self.interpolation)
+            # while drawing drafts, the cutout may be subsampled and
+            # enlarged again after color mapping
+            subsample = viewer.get_draft_subsample()
+            interp = self._get_interpolation(viewer)
+            with viewer.render_stats.timer('cutout'):
+                res = self.image.get_scaled_cutout(a1, b1, a2, b2,
+                                                   _scale_x / subsample,
+                                                   _scale_y / subsample,
+                                                   method=interp)
             cache.cutout = res.data
+            cache.cvs_x, cache.cvs_y = cvs_x, cvs_y
+            cache.interp, cache.subsample = interp, subsample
+            cache.out_wd = int(round(_scale_x * (a2 - a1 + 1)))
+            cache.out_ht = int(round(_scale_y * (b2 - b1 + 1)))
+
+            # record the pixels sampled for the cutout, so that a later
+            # pan can reuse them (see _pan_cache)
+            cache.scale = (_scale_x, _scale_y)
+            cache.dst_shape = dstarr.shape
+            cache.cut_index = None
+            if (interp == 'basic') and (subsample == 1):
+                cache.cut_index = self._get_cutout_index(
+                    a1, b1, a2, b2, cache.out_wd, cache.out_ht)[1:]
+
+        with viewer.render_stats.timer('cuts'):
+            if self._histeq_mode(rgbmap) == 'image':
+                self._set_histeq_hash(viewer, cache, rgbmap, None)
+            lut = self._get_lut(viewer, cache, rgbmap, cache.cutout,
+                                dst_order, image_order, get_order)
+
+        if lut is not None:
+            # small integer data: cut levels, color distribution, shift
+            # map and color map are all folded into a single lookup table
+            if (not panned) and ((whence <= 2.5) or (cache.rgbarr is None) or
+                                 (not self.optimize)):
+                cache.prergb = None
+                with viewer.render_stats.timer('colormap'):
+                    cache.rgbarr = self._map_strips(
+                        viewer, lambda arr: self._apply_lut(lut, arr),
+                        cache.cutout, cache.cutout.shape + lut.shape[1:],
+                        numpy.uint8)
+                    cache.rgbarr = self._enlarge(cache, cache.rgbarr)
+                cache.visuals = self._get_visual_state(viewer, rgbmap)
 
-            # calculate our offset from the pan position
-            pan_x, pan_y = viewer.get_pan()
-            pan_off = viewer.data_off
-            pan_x, pan_y = pan_x + pan_off, pan_y + pan_off
-            #print "pan x,y=%f,%f" % (pan_x, pan_y)
-            off_x, off_y = dst_x - pan_x, dst_y - pan_y
-            # scale offset
-            off_x *= scale_x
-            off_y *= scale_y
-            #print "off_x,y=%f,%f" % (off_x, off_y)
-
-            # dst position in the pre-transformed array should be calculated
-            # from the center of the array plus offsets
-            ht, wd, dp = dstarr.shape
-            cache.cvs_x = int(round(wd / 2.0  + off_x))
-            cache.cvs_y = int(round(ht / 2.0  + off_y))
-
-        if self.rgbmap is not None:
-            rgbmap = self.rgbmap
         else:
-            rgbmap = viewer.get_rgbmap()
-
-        if (whence <= 1.0) or (cache.prergb is None) or (not self.optimize):
-            # apply visual changes prior to color mapping (cut levels, etc)
-            vmax = rgbmap.get_hash_size() - 1
-            newdata = self.apply_visuals(viewer, cache.cutout, 0, vmax)
-
-            # result becomes an index array fed to the RGB mapper
-            if not numpy.issubdtype(newdata.dtype, numpy.dtype('uint')):
-                newdata = newdata.astype(numpy.uint)
-            idx = newdata
-
-            self.logger.debug("shape of index is %s" % (str(idx.shape)))
-            cache.prergb = idx
-
-        dst_order = viewer.get_rgb_order()
-        image_order = self.image.get_order()
-        get_order = dst_order
-        if ('A' in dst_order) and not ('A' in image_order):
-            get_order = dst_order.replace('A', '')
-
-        if (whence <= 2.5) or (cache.rgbarr is None) or (not self.optimize):
-            # get RGB mapped array
-            rgbobj = rgbmap.get_rgbarray(cache.prergb, order=dst_order,
-                                         image_order=image_order)
-            cache.rgbarr = rgbobj.get_array(get_order)
+            if (not panned) and ((whence <= 1.0) or (cache.prergb is None) or
+                                 (not self.optimize)):
+                # apply visual changes prior to color mapping (cut levels, etc)
+                with viewer.render_stats.timer('cuts'):
+                    idx = self._map_strips(
+                        viewer,
+                        lambda arr: self._get_index_array(viewer, rgbmap, arr),
+                        cache.cutout, cache.cutout.shape, numpy.uint)
+
+                self.logger.debug("shape of index is %s" % (str(idx.shape)))
+                cache.prergb = idx
+                if self._histeq_mode(rgbmap) == 'cutout':
+                    # the table of the old cutout does not apply
+                    cache.histeq_key = None
+
+            if (not panned) and ((whence <= 2.5) or (cache.rgbarr is None) or
+                                 (not self.optimize)):
+                # get RGB mapped array
+                with viewer.render_stats.timer('colormap'):
+                    if self._histeq_mode(rgbmap) == 'cutout':
+                        self._set_histeq_hash(viewer, cache, rgbmap,
+                                              cache.prergb)
+                    cache.rgbarr = self._get_rgb_array(
+                        viewer, cache, rgbmap, cache.prergb,
+                        dst_order, image_order, get_order)
+                    cache.rgbarr = self._enlarge(cache, cache.rgbarr)
+                cache.visuals = self._get_visual_state(viewer, rgbmap)
 
         # composite the image into the destination array at the
         # calculated position
-        trcalc.overlay_image(dstarr, cache.cvs_x, cache.cvs_y, cache.rgbarr,
-                             dst_order=dst_order, src_order=get_order,
-                             alpha=self.alpha, flipy=False)
+        with viewer.render_stats.timer('overlay'):
+            trcalc.overlay_image(dstarr, cache.cvs_x, cache.cvs_y,
+                                 cache.rgbarr,
+                                 dst_order=dst_order, src_order=get_order,
+                                 alpha=self.alpha, flipy=False)
+
+    def _map_strips(self, viewer, func, data, out_shape, out_dtype):
+        """Return ``func(data)``, calculated in horizontal strips on the
+        viewer's render pool if the viewer is set up for that (see
+        ImageView.set_render_pool()).  `func` must work on each pixel
+        independently; the strips are written into one output array of
+        shape `out_shape` and type `out_dtype`.
+        """
+        ht = data.shape[0]
+        num = viewer.get_render_strips(ht)
+        if num <= 1:
+            return func(data)
+
+        out = numpy.empty(out_shape, dtype=out_dtype)
+
+        def _do_strip(y1, y2):
+            out[y1:y2] = func(data[y1:y2])
+
+        viewer.run_strips(_do_strip, ht, num)
+        return out
+
+    def _get_rgb_array(self, viewer, cache, rgbmap, idx,
+                       dst_order, image_order, get_order):
+        # NOTE: any histogram equalization table has been calculated
+        # beforehand (see _set_histeq_hash()), so this can be done in strips
+        hash_key = self._get_histeq_key(cache, rgbmap)
+
+        def _get_rgb(arr):
+            rgbobj = rgbmap.get_rgbarray(arr, order=dst_order,
+                                         image_order=image_order,
+                                         hash_key=hash_key)
+            return rgbobj.get_array(get_order)
+
+        return self._map_strips(viewer, _get_rgb, idx,
+                                idx.shape[:2] + (len(get_order),),
+                                numpy.uint8)
+
+    def _enlarge(self, cache, arr):
+        """Enlarge a color mapped array from a subsampled cutout to the
+        size it would have had without subsampling.
+        """
+        subsample = cache.get('subsample', 1)
+        if subsample <= 1:
+            return arr
+        arr = arr.repeat(subsample, axis=0).repeat(subsample, axis=1)
+        return arr[:cache.out_ht, :cache.out_wd]
+
+    def _calc_cutout_rect(self, viewer, dstarr):
+        """Calculate the part of the image that needs to be cut out to
+        cover the window, and where it goes in the destination array.
+
+        Returns a tuple of (a1, b1, a2, b2, cvs_x, cvs_y), or None if the
+        image is completely off the screen.
+        """
+        # get extent of our data coverage in the window
+        ((x0, y0), (x1, y1), (x2, y2), (x3, y3)) = viewer.get_pan_rect()
+        xmin = int(min(x0, x1, x2, x3))
+        ymin = int(min(y0, y1, y2, y3))
+        xmax = int(max(x0, x1, x2, x3))
+        ymax = int(max(y0, y1, y2, y3))
+
+        # destination location in data_coords
+        dst_x, dst_y = self.x, self.y
+
+        a1, b1, a2, b2 = 0, 0, self.image.width, self.image.height
+
+        # calculate the cutout that we can make and scale to merge
+        # onto the final image--by only cutting out what is necessary
+        # this speeds scaling greatly at zoomed in sizes
+        dst_x, dst_y, a1, b1, a2, b2 = \
+               trcalc.calc_image_merge_clip(xmin, ymin, xmax, ymax,
+                                            dst_x, dst_y, a1, b1, a2, b2)
+
+        # is image completely off the screen?
+        if (a2 - a1 <= 0) or (b2 - b1 <= 0):
+            return None
+
+        scale_x, scale_y = viewer.get_scale_xy()
+
+        # calculate our offset from the pan position
+        pan_x, pan_y = viewer.get_pan()
+        pan_off = viewer.data_off
+        pan_x, pan_y = pan_x + pan_off, pan_y + pan_off
+        #print "pan x,y=%f,%f" % (pan_x, pan_y)
+        off_x, off_y = dst_x - pan_x, dst_y - pan_y
+        # scale offset
+        off_x *= scale_x
+        off_y *= scale_y
+        #print "off_x,y=%f,%f" % (off_x, off_y)
+
+        # dst position in the pre-transformed array should be calculated
+        # from the center of the array plus offsets
+        ht, wd = dstarr.shape[:2]
+        cvs_x = int(round(wd / 2.0  + off_x))
+        cvs_y = int(round(ht / 2.0  + off_y))
+
+        return (a1, b1, a2, b2, cvs_x, cvs_y)
+
+    def _get_index_array(self, viewer, rgbmap, data):
+        # apply visual changes prior to color mapping (cut levels, etc)
+        vmax = rgbmap.get_hash_size() - 1
+        newdata = self.apply_visuals(viewer, data, 0, vmax)
+
+        # result becomes an index array fed to the RGB mapper
+        if not numpy.issubdtype(newdata.dtype, numpy.dtype('uint')):
+            newdata = newdata.astype(numpy.uint)
+        return newdata
+
+    def _get_visual_state(self, viewer, rgbmap):
+        # everything besides the data that went into the color mapped
+        # pixels; the objects are compared by identity because the
+        # RGB mapper replaces its arrays rather than modifying them
+        if self.autocuts is not None:
+            autocuts = self.autocuts
+        else:
+            autocuts = viewer.autocuts
+        return (tuple(viewer.t_['cuts']), autocuts, rgbmap, rgbmap.arr,
+                rgbmap.sarr, rgbmap.dist, rgbmap.dist.hash)
+
+    def _same_visuals(self, visuals1, visuals2):
+        if (visuals1 is None) or (visuals2 is None):
+            return False
+        return ((visuals1[0] == visuals2[0]) and
+                all([a is b for a, b in zip(visuals1[1:], visuals2[1:])]))
+
+    def _get_lut(self, viewer, cache, rgbmap, data,
+                 dst_order, image_order, get_order):
+        """Get a lookup table mapping every possible value of `data`
+        directly to its RGB(A) pixel, or None if this is not possible.
+
+        The table is only built for 2D 8 and 16 bit integer data, and is
+        kept in the cache until the cut levels or RGB mapper change.
+        """
+        if ((not self.use_lut) or (data is None) or (data.ndim != 2) or
+            (data.dtype.kind not in ('i', 'u')) or (data.dtype.itemsize > 2)):
+            return None
+
+        # histogram equalization of the cutout depends on the data
+        # being mapped
+        if self._histeq_mode(rgbmap) == 'cutout':
+            return None
+
+        visuals = self._get_visual_state(viewer, rgbmap)
+        key = (data.dtype.kind, data.dtype.itemsize, dst_order,
+               image_order, get_order)
+        lut = cache.get('lut', None)
+        if ((lut is not None) and (cache.lut_key == key) and
+            self._same_visuals(cache.lut_visuals, visuals)):
+            return lut
+
+        # the table is indexed by the unsigned interpretation of the
+        # data values, so that signed data needs no offset
+        itemsize = data.dtype.itemsize
+        vals = numpy.arange(2 ** (8 * itemsize))
+        vals = vals.astype('u%d' % itemsize).view(
+            '%s%d' % (data.dtype.kind, itemsize)).reshape(1, -1)
+
+        idx = self._get_index_array(viewer, rgbmap, vals)
+        rgbobj = rgbmap.get_rgbarray(idx, order=dst_order,
+                                     image_order=image_order,
+                                     hash_key=self._get_histeq_key(cache,
+                                                                   rgbmap))
+        lut = numpy.ascontiguousarray(rgbobj.get_array(get_order)[0])
+
+        self.logger.debug("built %d entry RGB lookup table" % (len(lut)))
+        cache.setvals(lut=lut, lut_key=key, lut_visuals=visuals)
+        return lut
+
+    def _apply_lut(self, lut, data):
+        # view (not copy) the data as unsigned integers of the same size
+        # and byte order, which are the indexes into the table
+        dtype = data.dtype
+        idx = data.view(numpy.dtype('%su%d' % (dtype.byteorder,
+                                                dtype.itemsize)))
+        depth = lut.shape[1]
+        if depth == 4:
+            # gather whole 32-bit pixels at once
+            lut32 = lut.view(numpy.uint32).reshape(-1)
+            rgbarr = numpy.take(lut32, idx)
+            return rgbarr.view(numpy.uint8).reshape(idx.shape + (4,))
+
+        return numpy.take(lut, idx, axis=0)
+
+    def _get_cutout_index(self, a1, b1, a2, b2, new_wd, new_ht):
+        """Get the pixels sampled by a 'basic' (nearest neighbor) cutout
+        of dimensions (new_wd, new_ht), as get_scaled_cutout() samples
+        them (from a level of the image pyramid if the image has one).
+
+        Returns a tuple of (data, factor, xi, yi), where `data` and
+        `factor` are the pyramid level and its factor (see
+        BaseImage.get_pyramid_level()) and `xi` and `yi` are 1D arrays
+        of indexes into `data`.
+        """
+        old_wd, old_ht = max(a2 - a1 + 1, 1), max(b2 - b1 + 1, 1)
+        scale = max(float(new_wd) / old_wd, float(new_ht) / old_ht)
+        data, factor = self.image.get_pyramid_level(scale)
+        if factor > 1:
+            a1, b1 = a1 // factor, b1 // factor
+            a2, b2 = a2 // factor, b2 // factor
+        xi, yi = trcalc.get_scaled_cutout_wdht_index(a1, b1, a2, b2,
+                                                     new_wd, new_ht)
+        # an unscaled cutout is a slice, which stops at the edges
+        ht, wd = data.shape[:2]
+        return (data, factor, xi[xi < wd], yi[yi < ht])
+
+    def _pan_cache(self, viewer, dstarr, cache, rgbmap,
+                   dst_order, image_order, get_order):
+        """Update the cached arrays for a change of the pan position only.
+
+        The new cutout samples the same pixels as a full redraw would.
+        Where those were sampled for the old cutout as well, the old color
+        mapped values are copied, and only the rest are cut out and color
+        mapped.  This is only done for the 'basic' (nearest neighbor)
+        interpolation, where each output pixel depends on a single pixel
+        of the image.
+
+        Returns True if the cache was updated, False if a full
+        recalculation is needed.
+        """
+        if ((cache.rgbarr is None) or (cache.cutout is None) or
+            (self._get_interpolation(viewer) != 'basic') or
+            (cache.get('cut_index', None) is None) or
+            (viewer.get_draft_subsample() != 1) or
+            (cache.get('dst_shape', None) != dstarr.shape)):
+            return False
+
+        scale_x, scale_y = viewer.get_scale_xy()
+        _scale_x, _scale_y = scale_x * self.scale_x, scale_y * self.scale_y
+        if cache.scale != (_scale_x, _scale_y):
+            return False
+
+        # histogram equalization of the cutout depends on the data being
+        # mapped, so pieces mapped separately would not match the rest
+        histeq = self._histeq_mode(rgbmap)
+        if histeq == 'cutout':
+            return False
+        if histeq == 'image':
+            self._set_histeq_hash(viewer, cache, rgbmap, None)
+
+        # the cuts or color map may have changed in the same (deferred)
+        # redraw as the pan position
+        visuals = self._get_visual_state(viewer, rgbmap)
+        if not self._same_visuals(cache.get('visuals', None), visuals):
+            return False
+
+        lut = self._get_lut(viewer, cache, rgbmap, cache.cutout,
+                            dst_order, image_order, get_order)
+        if (lut is None) and (cache.prergb is None):
+            return False
+
+        rect = self._calc_cutout_rect(viewer, dstarr)
+        if rect is None:
+            return False
+        a1, b1, a2, b2, cvs_x, cvs_y = rect
+        new_wd = int(round(_scale_x * (a2 - a1 + 1)))
+        new_ht = int(round(_scale_y * (b2 - b1 + 1)))
+
+        data, factor, xi, yi = self._get_cutout_index(a1, b1, a2, b2,
+                                                      new_wd, new_ht)
+        old_factor, old_xi, old_yi = cache.cut_index
+        if factor != old_factor:
+            return False
+
+        # find the columns and rows sampled for the old cutout as well
+        # (the indexes are in increasing order)
+        jx, mx = self._match_index(old_xi, xi)
+        jy, my = self._match_index(old_yi, yi)
+        kx, ky = numpy.flatnonzero(mx), numpy.flatnonzero(my)
+        cut_wd, cut_ht = len(xi), len(yi)
+        if len(kx) * len(ky) * 2 < cut_wd * cut_ht:
+            # too little in common
+            return False
+
+        # copy the pixels that we already have
+        arrs = []
+        dst = self._index2d(ky, kx)
+        src = self._index2d(jy[ky], jx[kx])
+        for oldarr in (cache.cutout, cache.prergb, cache.rgbarr):
+            if (oldarr is None) or ((oldarr is cache.prergb) and
+                                    (lut is not None)):
+                arrs.append(None)
+                continue
+            newarr = numpy.empty((cut_ht, cut_wd) + oldarr.shape[2:],
+                                 dtype=oldarr.dtype)
+            newarr[dst] = oldarr[src]
+            arrs.append(newarr)
+        cutout, prergb, rgbarr = arrs
+
+        # calculate the rest: the new columns, and the new rows of the
+        # old columns
+        ux, uy = numpy.flatnonzero(~mx), numpy.flatnonzero(~my)
+        for rows, cols in ((numpy.arange(cut_ht), ux), (uy, kx)):
+            if (len(rows) == 0) or (len(cols) == 0):
+                continue
+            piece = data[yi[rows].reshape(-1, 1), xi[cols].reshape(1, -1)]
+
+            view = self._index2d(rows, cols)
+            cutout[view] = piece
+            if lut is not None:
+                rgbarr[view] = self._apply_lut(lut, piece)
+                continue
+            idx = self._get_index_array(viewer, rgbmap, piece)
+            prergb[view] = idx
+            rgbobj = rgbmap.get_rgbarray(
+                idx, order=dst_order, image_order=image_order,
+                hash_key=self._get_histeq_key(cache, rgbmap))
+            rgbarr[view] = rgbobj.get_array(get_order)
+
+        cache.setvals(cutout=cutout, prergb=prergb, rgbarr=rgbarr,
+                      cvs_x=cvs_x, cvs_y=cvs_y, out_wd=new_wd, out_ht=new_ht,
+                      cut_index=(factor, xi, yi))
+        return True
+
+    def _match_index(self, old_idx, new_idx):
+        # positions in the (sorted) old indexes of the new indexes, and
+        # a mask of the new indexes that were found there
+        pos = numpy.searchsorted(old_idx, new_idx).clip(0, len(old_idx) - 1)
+        return pos, old_idx[pos] == new_idx
+
+    def _index2d(self, rows, cols):
+        # index for the rows and columns of a 2D array, using slices for
+        # runs of consecutive indexes because they are much faster
+        rows, cols = self._as_slice(rows), self._as_slice(cols)
+        if isinstance(rows, slice) or isinstance(cols, slice):
+            return (rows, cols)
+        return numpy.ix_(rows, cols)
+
+    def _as_slice(self, idx):
+        if (len(idx) > 0) and numpy.all(numpy.diff(idx) == 1):
+            return slice(idx[0], idx[-1] + 1)
+        return idx
+
+    def _histeq_mode(self, rgbmap):
+        """Get the kind of histogram equalization done by `rgbmap`:
+        'image' if the table is calculated from the whole image, 'cutout'
+        if from the part being shown, or None for other distributions.
+        """
+        dist = rgbmap.dist
+        if not isinstance(dist, ColorDist.HistogramEqualizationDist):
+            return None
+        if dist.whole_image:
+            return 'image'
+        return 'cutout'
+
+    def _set_histeq_hash(self, viewer, cache, rgbmap, idx):
+        """Calculate the histogram equalization table of `rgbmap`, unless
+        it is already calculated for the same data.
+
+        With the whole image, the table is kept until the image, its data
+        or the cut levels change; otherwise it is calculated from the index
+        array `idx` of the cutout, and kept until the cutout changes.
+        """
+        dist = rgbmap.dist
+        if dist.whole_image:
+            if self.autocuts is not None:
+                autocuts = self.autocuts
+            else:
+                autocuts = viewer.autocuts
+            key = ('image', id(self.image), self.image.get_data_version(),
+                   tuple(viewer.t_['cuts']), id(autocuts),
+                   dist.get_hash_size())
+            cache.histeq_key = key
+            if dist.get_hash_key() == key:
+                return
+            # subsample the data down to about the sample size
+            data = self.image.get_data()
+            step = int(math.ceil(math.sqrt(data.size /
+                                           float(max(dist.sample_size, 1)))))
+            if step > 1:
+                data = data[::step, ::step]
+            idx = self._get_index_array(viewer, rgbmap, data)
+            dist.calc_hash_from(idx, key=key)
+            return
+
+        key = cache.get('histeq_key', None)
+        if (key is not None) and (dist.get_hash_key() == key):
+            return
+        key = ('cutout', next(_histeq_count))
+        dist.calc_hash_from(idx, key=key)
+        cache.histeq_key = key
+
+    def _get_histeq_key(self, cache, rgbmap):
+        """Get the key of the histogram equalization table calculated for
+        this image by _set_histeq_hash(), to be passed to the RGB mapper,
+        or None if the distribution is not histogram equalization.
+        """
+        if self._histeq_mode(rgbmap) is None:
+            return None
+        return cache.get('histeq_key', None)
 
     def apply_visuals(self, viewer, data, vmin, vmax):
         if self.autocuts is not None:
@@ -489,7 +935,9 @@ class NormImage(Image):
 
     def _reset_cache(self, cache):
         cache.setvals(cutout=None, prergb=None, rgbarr=None,
-                      drawn=False, cvs_x=0, cvs_y=0)
+                      drawn=False, cvs_x=0, cvs_y=0, visuals=None,
+                      dst_shape=None, lut=None, lut_key=None,
+                      lut_visuals=None, histeq_key=None)
         return cache
 
     def set_image(self, image):
@@ -0,0 +1,401 @@
+#
+# markers.py -- classes for collections of markers drawn on ginga canvases.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+import math
+import numpy
+
+from ginga.canvas.CanvasObject import (CanvasObjectBase, _bool, _color,
+                                       MovePoint, register_canvas_types,
+                                       colors_plus_none)
+from ginga import trcalc
+from ginga.misc.ParamSet import Param
+from ginga.util.six.moves import map, zip
+
+__all__ = ['MarkerCollection']
+
+
+class MarkerCollection(CanvasObjectBase):
+    """Draws a collection of markers on a DrawingCanvas.
+    Parameters are:
+    x, y: sequences of 0-based coordinates of the centers in the data space
+    radius: radius (or sequence of radii) based on the number of pixels
+      in data space
+    Optional parameters for style, color, linewidth, etc.
+    The styles are 'circle', 'cross', 'plus', 'square' (squares are
+    drawn aligned with the window) and 'box' (squares aligned with the
+    data, which turn with a rotated view).  Per-marker colors can be
+    given with the `colors` parameter.
+
+    The markers are kept in Numpy arrays and mapped to the window and
+    drawn in batches, which is much faster than making an object for
+    each marker of a large catalog.  Markers are drawn in order, and
+    each run of markers of the same color is one batch.
+    """
+
+    @classmethod
+    def get_params_metadata(cls):
+        return [
+            ## Param(name='coord', type=str, default='data',
+            ##       valid=['data', 'wcs'],
+            ##       description="Set type of coordinates"),
+            Param(name='style', type=str, default='circle',
+                  valid=['circle', 'cross', 'plus', 'square', 'box'],
+                  description="Style of markers (default 'circle')"),
+            Param(name='linewidth', type=int, default=1,
+                  min=1, max=20, widget='spinbutton', incr=1,
+                  description="Width of outline"),
+            Param(name='linestyle', type=str, default='solid',
+                  valid=['solid', 'dash'],
+                  description="Style of outline (default solid)"),
+            Param(name='color',
+                  valid=colors_plus_none, type=_color, default='yellow',
+                  description="Color of outline"),
+            Param(name='alpha', type=float, default=1.0,
+                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
+                  description="Opacity of outline"),
+            Param(name='fill', type=_bool,
+                  default=False, valid=[False, True],
+                  description="Fill the interior"),
+            Param(name='fillcolor', default=None,
+                  valid=colors_plus_none, type=_color,
+                  description="Color of fill"),
+            Param(name='fillalpha', type=float, default=1.0,
+                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
+                  description="Opacity of fill"),
+            ]
+
+    def __init__(self, x, y, radius, style='circle', color='yellow',
+                 colors=None, linewidth=1, linestyle='solid', alpha=1.0,
+                 fill=False, fillcolor=None, fillalpha=1.0, **kwdargs):
+        CanvasObjectBase.__init__(self, color=color, style=style,
+                                  linewidth=linewidth, linestyle=linestyle,
+                                  alpha=alpha, fill=fill,
+                                  fillcolor=fillcolor, fillalpha=fillalpha,
+                                  **kwdargs)
+        self.kind = 'markercollection'
+        self.set_markers(x, y, radius=radius, colors=colors)
+
+    def set_markers(self, x, y, radius=None, colors=None):
+        """Replace the markers.
+
+        Parameters
+        ----------
+        x, y : sequences of float
+            Coordinates of the centers (in the coordinates of this object)
+        radius : float, sequence of float or None
+            Radius of all the markers or of each one; None keeps the
+            current radius
+        colors : sequence or None
+            Color of each marker; None draws them all in `color`
+        """
+        self.x = numpy.array(x, dtype=numpy.double, ndmin=1)
+        self.y = numpy.array(y, dtype=numpy.double, ndmin=1)
+        if radius is not None:
+            self.radius = radius
+        self.set_colors(colors)
+
+    def set_colors(self, colors):
+        """Set the color of each marker, or None to use `color`."""
+        if colors is None:
+            self.colors = None
+            self._color_codes = None
+            return
+        self.colors = list(colors)
+        lut = {}
+        self._color_codes = numpy.array([lut.setdefault(color, len(lut))
+                                         for color in self.colors])
+        self._color_list = sorted(lut.keys(), key=lambda color: lut[color])
+
+    def get_num_markers(self):
+        return len(self.x)
+
+    def get_num_points(self):
+        return self.get_num_markers()
+
+    def _get_radius_array(self):
+        radius = numpy.asarray(self.radius, dtype=numpy.double)
+        if radius.ndim == 0:
+            radius = numpy.zeros(len(self.x)) + radius
+        return radius
+
+    def get_data_arrays(self):
+        """Get (copies of) the marker centers in data coordinates."""
+        if (self.crdmap is None) or (self.coord == 'data'):
+            return numpy.array(self.x), numpy.array(self.y)
+        try:
+            x, y = self.crdmap.to_data(self.x, self.y)
+        except Exception as e:
+            # mapper does not handle arrays
+            points = list(map(lambda pt: self.crdmap.to_data(pt[0], pt[1]),
+                              zip(self.x, self.y)))
+            x, y = numpy.asarray(points, dtype=numpy.double).T
+        return (numpy.array(x, dtype=numpy.double, ndmin=1),
+                numpy.array(y, dtype=numpy.double, ndmin=1))
+
+    def set_data_arrays(self, x, y):
+        """Set the marker centers from data coordinates."""
+        if (self.crdmap is None) or (self.coord == 'data'):
+            self.x = numpy.array(x, dtype=numpy.double, ndmin=1)
+            self.y = numpy.array(y, dtype=numpy.double, ndmin=1)
+            return
+        try:
+            x, y = self.crdmap.data_to(x, y)
+        except Exception as e:
+            points = list(map(lambda pt: self.crdmap.data_to(pt[0], pt[1]),
+                              zip(x, y)))
+            x, y = numpy.asarray(points, dtype=numpy.double).T
+        self.x = numpy.array(x, dtype=numpy.double, ndmin=1)
+        self.y = numpy.array(y, dtype=numpy.double, ndmin=1)
+
+    def get_points(self):
+        x, y = self.get_data_arrays()
+        return list(zip(x, y))
+
+    def get_data_points(self, points=None):
+        if points is None:
+            return self.get_points()
+        return super(MarkerCollection, self).get_data_points(points=points)
+
+    def get_center_pt(self):
+        x, y = self.get_data_arrays()
+        return (x.mean(), y.mean())
+
+    def get_llur(self):
+        x, y = self.get_data_arrays()
+        radius = self._get_radius_array()
+        return ((x - radius).min(), (y - radius).min(),
+                (x + radius).max(), (y + radius).max())
+
+    def get_edit_points(self, viewer):
+        return [MovePoint(*self.get_center_pt())]
+
+    def setup_edit(self, detail):
+        detail.center_pos = self.get_center_pt()
+
+    def set_edit_point(self, i, pt, detail):
+        if i == 0:
+            x, y = pt
+            self.move_to(x, y)
+        else:
+            raise ValueError("No point corresponding to index %d" % (i))
+
+    def move_delta(self, xoff, yoff):
+        x, y = self.get_data_arrays()
+        self.set_data_arrays(x + xoff, y + yoff)
+
+    def rotate(self, theta_deg, xoff=0, yoff=0):
+        x, y = self.get_data_arrays()
+        x, y = trcalc.rotate_pt(x, y, theta_deg, xoff=xoff, yoff=yoff)
+        self.set_data_arrays(x, y)
+
+    def scale_by(self, scale_x, scale_y):
+        self.radius = self._get_radius_array() * scale_x
+
+    def get_indices_at(self, data_x, data_y, tolerance=0.0):
+        """Get the indices of the markers covering a data point.
+
+        Parameters
+        ----------
+        data_x, data_y : float
+            The point in data coordinates
+        tolerance : float
+            Distance in data coordinates by which to extend the markers
+
+        Returns
+        -------
+        indices : ndarray
+            Indices of the covering markers, in order
+        """
+        x, y = self.get_data_arrays()
+        radius = self._get_radius_array() + tolerance
+        dx, dy = numpy.abs(x - data_x), numpy.abs(y - data_y)
+        if self.style in ('square', 'box'):
+            mask = numpy.logical_and(dx <= radius, dy <= radius)
+        else:
+            mask = (dx * dx + dy * dy) <= radius * radius
+        return numpy.nonzero(mask)[0]
+
+    def contains_arr(self, x_arr, y_arr):
+        x_arr, y_arr = numpy.asarray(x_arr), numpy.asarray(y_arr)
+        return numpy.array([len(self.get_indices_at(x, y)) > 0
+                            for x, y in zip(x_arr.flat, y_arr.flat)],
+                           dtype=bool).reshape(x_arr.shape)
+
+    def contains(self, data_x, data_y):
+        return len(self.get_indices_at(data_x, data_y)) > 0
+
+    def select_contains(self, viewer, data_x, data_y):
+        # allow for the size of the markers' caps in window pixels
+        tolerance = self.cap_radius / self._get_window_scale(viewer)
+        return len(self.get_indices_at(data_x, data_y,
+                                       tolerance=tolerance)) > 0
+
+    def _get_window_scale(self, viewer):
+        # window pixels per data pixel (the data to window mapping only
+        # rotates, flips, scales and shifts)
+        off_x, off_y = viewer.data_to_offset(numpy.array([0.0, 0.0]),
+                                             numpy.array([0.0, 1.0]))
+        win_x, win_y = viewer.offset_to_window(off_x, off_y, asint=False)
+        return math.sqrt((win_x[1] - win_x[0]) ** 2 +
+                         (win_y[1] - win_y[0]) ** 2)
+
+    def get_cmarkers(self, viewer):
+        """Get the marker centers and radii in window coordinates.
+
+        Returns
+        -------
+        cx, cy, cradius : tuple of ndarray
+        """
+        x, y = self.get_data_arrays()
+        cx, cy = viewer.get_canvas_xy(x, y)
+        cradius = self._get_radius_array() * self._get_window_scale(viewer)
+        return (numpy.asarray(cx), numpy.asarray(cy), cradius)
+
+    def get_cbox_corners(self, viewer, idx):
+        """Get the corners of the 'box' markers with indices `idx` in
+        window coordinates.
+
+        Returns
+        -------
+        cx, cy : tuple of ndarray
+            Arrays of shape (4, len(idx)) of the corners of each box
+        """
+        x, y = self.get_data_arrays()
+        radius = self._get_radius_array()
+        x, y, radius = x[idx], y[idx], radius[idx]
+        xs = numpy.array((x - radius, x + radius, x + radius, x - radius))
+        ys = numpy.array((y - radius, y - radius, y + radius, y + radius))
+        cx, cy = viewer.get_canvas_xy(xs.ravel(), ys.ravel())
+        return (numpy.asarray(cx).reshape(xs.shape),
+                numpy.asarray(cy).reshape(ys.shape))
+
+    def _get_reach(self, cradius):
+        # distance from the centers to the farthest drawn points
+        if self.style == 'box':
+            # the corners of a rotated box
+            return cradius * math.sqrt(2.0)
+        return cradius
+
+    def get_canvas_rects(self, viewer):
+        if self.get_num_markers() == 0:
+            return []
+        try:
+            cx, cy, cradius = self.get_cmarkers(viewer)
+        except Exception:
+            return None
+        pad = 16 + self.cap_radius + self.linewidth
+        reach = self._get_reach(cradius)
+        return [((cx - reach).min() - pad, (cy - reach).min() - pad,
+                 (cx + reach).max() + pad, (cy + reach).max() + pad)]
+
+    def draw(self, viewer):
+        if self.get_num_markers() == 0:
+            return
+        cx, cy, cradius = self.get_cmarkers(viewer)
+
+        # skip the markers outside of the window
+        wd, ht = viewer.get_window_size()
+        pad = self.linewidth + 1
+        reach = self._get_reach(cradius) + pad
+        mask = ((cx + reach >= 0) & (cx - reach <= wd) &
+                (cy + reach >= 0) & (cy - reach <= ht))
+        idx = numpy.nonzero(mask)[0]
+        if len(idx) == 0:
+            return
+
+        cr = viewer.renderer.setup_cr(self)
+
+        ccorners = None
+        if self.style == 'box':
+            ccorners = self.get_cbox_corners(viewer, idx)
+
+        # draw in order, batching each run of markers of the same color
+        # (so that overlapping markers stack as they would if drawn
+        # one by one)
+        if self._color_codes is None:
+            runs = [(None, 0, len(idx))]
+        else:
+            codes = self._color_codes[idx]
+            starts = numpy.concatenate(
+                ([0], numpy.flatnonzero(codes[1:] != codes[:-1]) + 1))
+            ends = numpy.concatenate((starts[1:], [len(idx)]))
+            runs = [(self._color_list[codes[i]], i, j)
+                    for i, j in zip(starts.tolist(), ends.tolist())]
+
+        for color, i, j in runs:
+            sub = idx[i:j]
+            if color is not None:
+                cr.set_line(color, alpha=self.alpha,
+                            linewidth=self.linewidth, style=self.linestyle)
+                if self.fill:
+                    fillcolor = self.fillcolor
+                    if fillcolor is None:
+                        fillcolor = color
+                    cr.set_fill(fillcolor, alpha=self.fillalpha)
+            sub_corners = None
+            if ccorners is not None:
+                sub_corners = (ccorners[0][:, i:j], ccorners[1][:, i:j])
+            self.draw_markers(cr, cx[sub], cy[sub], cradius[sub],
+                              ccorners=sub_corners)
+
+    def draw_markers(self, cr, cx, cy, cradius, ccorners=None):
+        """Draw markers with a render context, in one batch if the
+        renderer supports it.  The 'box' style needs the window
+        coordinates of the corners of the boxes in `ccorners` (see
+        `get_cbox_corners`).
+        """
+        if self.style in ('cross', 'plus'):
+            if self.style == 'cross':
+                x1, y1 = cx - cradius, cy - cradius
+                x2, y2 = cx + cradius, cy + cradius
+                # the two diagonals of each marker
+                lines = (numpy.concatenate((x1, x1)),
+                         numpy.concatenate((y1, y2)),
+                         numpy.concatenate((x2, x2)),
+                         numpy.concatenate((y2, y1)))
+            else:
+                # the horizontal and vertical line of each marker
+                lines = (numpy.concatenate((cx - cradius, cx)),
+                         numpy.concatenate((cy, cy - cradius)),
+                         numpy.concatenate((cx + cradius, cx)),
+                         numpy.concatenate((cy, cy + cradius)))
+            if hasattr(cr, 'draw_lines'):
+                cr.draw_lines(*lines)
+            else:
+                for x1, y1, x2, y2 in zip(*[arr.tolist() for arr in lines]):
+                    cr.draw_line(x1, y1, x2, y2)
+
+        elif self.style == 'square':
+            rects = (cx - cradius, cy - cradius, cx + cradius, cy + cradius)
+            if hasattr(cr, 'draw_rectangles'):
+                cr.draw_rectangles(*rects)
+            else:
+                for x1, y1, x2, y2 in zip(*[arr.tolist() for arr in rects]):
+                    cr.draw_polygon(((x1, y1), (x2, y1), (x2, y2), (x1, y2)))
+
+        elif self.style == 'box':
+            xs, ys = ccorners
+            if hasattr(cr, 'draw_lines') and not self.fill:
+                # the four sides of each box
+                xs2 = numpy.roll(xs, -1, axis=0)
+                ys2 = numpy.roll(ys, -1, axis=0)
+                cr.draw_lines(xs.ravel(), ys.ravel(), xs2.ravel(), ys2.ravel())
+            else:
+                for pts in zip(*[arr.T.tolist() for arr in (xs, ys)]):
+                    cr.draw_polygon(list(zip(*pts)))
+
+        else:
+            if hasattr(cr, 'draw_circles'):
+                cr.draw_circles(cx, cy, cradius)
+            else:
+                for x, y, r in zip(cx.tolist(), cy.tolist(), cradius.tolist()):
+                    cr.draw_circle(x, y, r)
+
+
+# register our types
+register_canvas_types(dict(markercollection=MarkerCollection))
+
+#END
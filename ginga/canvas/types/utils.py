@@ -4,81 +4,56 @@
 # This is open-source software licensed under a BSD license.
 # Please see the file LICENSE.txt for details.
 #
+import weakref
+
 from ginga.canvas.CanvasObject import (CanvasObjectBase, _bool, _color,
                                        register_canvas_types, get_canvas_type,
                                        colors_plus_none)
 from .basic import Rectangle
 from ginga.misc.ParamSet import Param
+from ginga.misc import Bunch
 
 
-class ColorBar(CanvasObjectBase):
-
-    @classmethod
-    def get_params_metadata(cls):
-        return [
-            Param(name='height', type=int, default=14,
-                  min=0, max=200, widget='spinbutton', incr=1,
-                  description="Height of colorbar in pixels"),
-            Param(name='offset', type=int, default=10,
-                  min=0, max=200, widget='spinbutton', incr=1,
-                  description="Offset in pixels from the top or bottom of the window"),
-            Param(name='side', type=str,
-                  default='bottom', valid=['top', 'bottom'],
-                  description="Choose side of window to anchor color bar"),
-            Param(name='showrange', type=_bool,
-                  default=True, valid=[False, True],
-                  description="Show the range in the colorbar"),
-            Param(name='font', type=str, default='Sans Serif',
-                  description="Font family for text"),
-            Param(name='fontsize', type=int, default=8,
-                  min=8, max=72,
-                  description="Font size of text (default: 8)"),
-            Param(name='linewidth', type=int, default=1,
-                  min=0, max=20, widget='spinbutton', incr=1,
-                  description="Width of outline"),
-            Param(name='linestyle', type=str, default='solid',
-                  valid=['solid', 'dash'],
-                  description="Style of outline (default: solid)"),
-            Param(name='color',
-                  valid=colors_plus_none, type=_color, default='black',
-                  description="Color of outline"),
-            Param(name='alpha', type=float, default=1.0,
-                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
-                  description="Opacity of outline"),
-            Param(name='fillalpha', type=float, default=1.0,
-                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
-                  description="Opacity of fill"),
-            ]
-
-    def __init__(self, height=14, offset=10, side='bottom', showrange=True,
-                 font='Sans Serif', fontsize=8,
-                 color='black', linewidth=1, linestyle='solid', alpha=1.0,
-                 fillalpha=1.0, rgbmap=None, optimize=True, **kwdargs):
-        super(ColorBar, self).__init__(height=height, offset=offset, side=side,
-                                       showrange=showrange,
-                                       font=font, fontsize=fontsize,
-                                       color=color, linewidth=linewidth,
-                                       linestyle=linestyle, alpha=alpha,
-                                       fillalpha=fillalpha, **kwdargs)
-        self.rgbmap = rgbmap
-        self.kind = 'colorbar'
-
-        # for drawing range
-        self.t_spacing = 40
-        self.tick_ht = 4
-
-
-    def draw(self, viewer):
-        rgbmap = self.rgbmap
-        if rgbmap is None:
-            rgbmap = viewer.get_rgbmap()
-
-        width, height = viewer.get_window_size()
-
-        loval, hival = viewer.get_cut_levels()
-
-        cr = viewer.renderer.setup_cr(self)
+class ColorBarMixin(object):
+    """Mixin for the color bar types: works out the color bands and range
+    labels of a color bar and caches them for each viewer, so that they
+    are only recalculated when the color map, cut levels or size change.
+    """
 
+    def __init__(self):
+        # keyed weakly by viewer, so that caching a layout does not keep
+        # a closed viewer alive
+        self._layout_cache = weakref.WeakKeyDictionary()
+
+    def get_layout(self, viewer, cr, rgbmap, x0, y_base, width, height,
+                   loval, hival, anchor_bottom=False):
+        """Get the layout of the color bar drawn with its left edge at
+        `x0` and its top (or bottom, if `anchor_bottom` is True) at
+        `y_base`, `width` pixels wide and at least `height` pixels high.
+        """
+        dist = rgbmap.get_dist()
+        key = (x0, y_base, width, height, anchor_bottom, loval, hival,
+               self.showrange, self.font, self.fontsize, self.t_spacing,
+               self.tick_ht, weakref.ref(rgbmap), weakref.ref(dist),
+               str(dist), getattr(dist, 'get_hash_key', lambda: None)())
+        # the lookup table is remade whenever the color map, intensity
+        # map or shift/stretch of the rgbmap change, and the hash table
+        # of the distribution whenever it changes (e.g. for histogram
+        # equalization, with the data)
+        lut = getattr(rgbmap, 'lut', None)
+        hash = getattr(dist, 'hash', None)
+
+        layout = self._layout_cache.get(viewer, None)
+        if ((layout is None) or (lut is None) or (layout.lut is not lut) or
+                (layout.hash is not hash) or (layout.key != key)):
+            layout = self._calc_layout(cr, rgbmap, x0, y_base, width, height,
+                                       loval, hival, anchor_bottom)
+            layout.setvals(key=key, lut=lut, hash=hash)
+            self._layout_cache[viewer] = layout
+        return layout
+
+    def _calc_layout(self, cr, rgbmap, x0, y_base, width, height,
+                     loval, hival, anchor_bottom):
         # Calculate reasonable spacing for range numbers
         cr.set_font(self.font, self.fontsize, color=self.color,
                     alpha=self.alpha)
@@ -86,34 +61,27 @@ class ColorBar(CanvasObjectBase):
         txt_wd, txt_ht = cr.text_extents(text)
         avg_pixels_per_range_num = self.t_spacing + txt_wd
 
-        pxwd, pxht = width, max(self.height, txt_ht + self.tick_ht + 2)
-        #print("colormap size is %d,%d" % (pxwd, pxht))
+        pxwd, pxht = width, max(height, txt_ht + self.tick_ht + 2)
 
         # calculate intervals for range numbers
         nums = max(int(pxwd // avg_pixels_per_range_num), 1)
         spacing = 256 // nums
         _interval = { i*spacing: True for i in range(nums) }
-        #self.logger.debug("nums=%d spacing=%d intervals=%s" % (
-        #    nums, spacing, _interval))
 
-        y_base = self.offset
-        if self.side == 'bottom':
-            y_base = height - self.offset - pxht
+        if anchor_bottom:
+            y_base -= pxht
 
-        x1 = 0; x2 = pxwd
         clr_wd = pxwd // 256
-        rem_px = x2 - (clr_wd * 256)
+        rem_px = pxwd - (clr_wd * 256)
         if rem_px > 0:
             ival = 256 // rem_px
         else:
             ival = 0
-        clr_ht = pxht
-        #print("clr is %dx%d width=%d rem=%d ival=%d" % (
-        #       width, height, clr_wd, rem_px, ival))
 
         dist = rgbmap.get_dist()
 
-        j = ival; off = 0
+        j = ival; off = x0
+        bands = []
         range_pts = []
         for i in range(256):
 
@@ -129,11 +97,13 @@ class ColorBar(CanvasObjectBase):
             (r, g, b) = rgbmap.get_rgbval(i)
             color = (r/255., g/255., b/255.)
 
-            cr.set_line(color, linewidth=0)
-            cr.set_fill(color, alpha=self.fillalpha)
-
-            cx1, cy1, cx2, cy2 = x, y_base, x+wd, y_base+pxht
-            cr.draw_polygon(((cx1, cy1), (cx2, cy1), (cx2, cy2), (cx1, cy2)))
+            # merge runs of the same color, skip empty bands
+            if wd > 0:
+                if (len(bands) > 0 and bands[-1][2] == color and
+                        bands[-1][1] == x):
+                    bands[-1][1] = x + wd
+                else:
+                    bands.append([x, x + wd, color])
 
             # Draw range scale if we are supposed to
             if self.showrange and i in _interval:
@@ -151,11 +121,22 @@ class ColorBar(CanvasObjectBase):
 
             off += wd
 
+        return Bunch.Bunch(bands=bands, range_pts=range_pts, y_base=y_base,
+                           pxht=pxht, last_wd=wd)
+
+    def draw_layout(self, cr, layout):
+        y_base, pxht = layout.y_base, layout.pxht
+        cy1, cy2 = y_base, y_base + pxht
+        for cx1, cx2, color in layout.bands:
+            cr.set_line(color, linewidth=0)
+            cr.set_fill(color, alpha=self.fillalpha)
+            cr.draw_polygon(((cx1, cy1), (cx2, cy1), (cx2, cy2), (cx1, cy2)))
+
         cr.set_line(color=self.color, linewidth=1, alpha=self.alpha)
 
         # draw optional border
         if self.linewidth > 0:
-            cx1, cy1, cx2, cy2 = 0, y_base, wd, y_base+pxht
+            cx1, cx2 = 0, layout.last_wd
             cpoints = ((cx1, cy1), (cx2, cy1), (cx2, cy2), (cx1, cy2))
             cr.draw_polygon(cpoints)
 
@@ -163,14 +144,100 @@ class ColorBar(CanvasObjectBase):
         if self.showrange:
             cr.set_font(self.font, self.fontsize, color=self.color,
                     alpha=self.alpha)
-            for (cx, cy, cyy, text) in range_pts:
+            for (cx, cy, cyy, text) in layout.range_pts:
                 # tick
                 cr.draw_line(cx, cyy, cx, cyy+self.tick_ht)
                 # number
                 cr.draw_text(cx, cy, text)
 
 
-class DrawableColorBar(Rectangle):
+class ColorBar(ColorBarMixin, CanvasObjectBase):
+
+    @classmethod
+    def get_params_metadata(cls):
+        return [
+            Param(name='height', type=int, default=14,
+                  min=0, max=200, widget='spinbutton', incr=1,
+                  description="Height of colorbar in pixels"),
+            Param(name='offset', type=int, default=10,
+                  min=0, max=200, widget='spinbutton', incr=1,
+                  description="Offset in pixels from the top or bottom of the window"),
+            Param(name='side', type=str,
+                  default='bottom', valid=['top', 'bottom'],
+                  description="Choose side of window to anchor color bar"),
+            Param(name='showrange', type=_bool,
+                  default=True, valid=[False, True],
+                  description="Show the range in the colorbar"),
+            Param(name='font', type=str, default='Sans Serif',
+                  description="Font family for text"),
+            Param(name='fontsize', type=int, default=8,
+                  min=8, max=72,
+                  description="Font size of text (default: 8)"),
+            Param(name='linewidth', type=int, default=1,
+                  min=0, max=20, widget='spinbutton', incr=1,
+                  description="Width of outline"),
+            Param(name='linestyle', type=str, default='solid',
+                  valid=['solid', 'dash'],
+                  description="Style of outline (default: solid)"),
+            Param(name='color',
+                  valid=colors_plus_none, type=_color, default='black',
+                  description="Color of outline"),
+            Param(name='alpha', type=float, default=1.0,
+                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
+                  description="Opacity of outline"),
+            Param(name='fillalpha', type=float, default=1.0,
+                  min=0.0, max=1.0, widget='spinfloat', incr=0.05,
+                  description="Opacity of fill"),
+            ]
+
+    def __init__(self, height=14, offset=10, side='bottom', showrange=True,
+                 font='Sans Serif', fontsize=8,
+                 color='black', linewidth=1, linestyle='solid', alpha=1.0,
+                 fillalpha=1.0, rgbmap=None, optimize=True, **kwdargs):
+        CanvasObjectBase.__init__(self, height=height, offset=offset,
+                                  side=side, showrange=showrange,
+                                  font=font, fontsize=fontsize,
+                                  color=color, linewidth=linewidth,
+                                  linestyle=linestyle, alpha=alpha,
+                                  fillalpha=fillalpha, **kwdargs)
+        ColorBarMixin.__init__(self)
+        self.rgbmap = rgbmap
+        self.kind = 'colorbar'
+
+        # for drawing range
+        self.t_spacing = 40
+        self.tick_ht = 4
+
+    def draw(self, viewer):
+        rgbmap = self.rgbmap
+        if rgbmap is None:
+            rgbmap = viewer.get_rgbmap()
+
+        width, height = viewer.get_window_size()
+
+        loval, hival = viewer.get_cut_levels()
+
+        cr = viewer.renderer.setup_cr(self)
+
+        if self.side == 'bottom':
+            layout = self.get_layout(viewer, cr, rgbmap, 0, height - self.offset,
+                                     width, self.height, loval, hival,
+                                     anchor_bottom=True)
+        else:
+            layout = self.get_layout(viewer, cr, rgbmap, 0, self.offset,
+                                     width, self.height, loval, hival)
+
+        self.draw_layout(cr, layout)
+
+    def get_canvas_rects(self, viewer):
+        # drawn relative to the window, with text of varying extent
+        return None
+
+    def get_index_llur(self):
+        return None
+
+
+class DrawableColorBar(ColorBarMixin, Rectangle):
 
     @classmethod
     def get_params_metadata(cls):
@@ -219,6 +286,7 @@ class DrawableColorBar(Rectangle):
                            color=color, linewidth=linewidth,
                            linestyle=linestyle, alpha=alpha,
                            fillalpha=fillalpha, **kwdargs)
+        ColorBarMixin.__init__(self)
         self.showrange = showrange
         self.rgbmap = rgbmap
         self.kind = 'drawablecolorbar'
@@ -227,7 +295,6 @@ class DrawableColorBar(Rectangle):
         self.t_spacing = 40
         self.tick_ht = 4
 
-
     def draw(self, viewer):
         rgbmap = self.rgbmap
         if rgbmap is None:
@@ -243,91 +310,17 @@ class DrawableColorBar(Rectangle):
 
         cr = viewer.renderer.setup_cr(self)
 
-        # Calculate reasonable spacing for range numbers
-        cr.set_font(self.font, self.fontsize, color=self.color,
-                    alpha=self.alpha)
-        text = "%.4g" % (hival)
-        txt_wd, txt_ht = cr.text_extents(text)
-        avg_pixels_per_range_num = self.t_spacing + txt_wd
+        layout = self.get_layout(viewer, cr, rgbmap, cx1, cy1,
+                                 max(width, 1), max(height, 1), loval, hival)
 
-        pxwd, pxht = width, max(height, txt_ht + self.tick_ht + 2)
-        pxwd, pxht = max(pxwd, 1), max(pxht, 1)
+        self.draw_layout(cr, layout)
 
-        # calculate intervals for range numbers
-        nums = max(int(pxwd // avg_pixels_per_range_num), 1)
-        spacing = 256 // nums
-        _interval = { i*spacing: True for i in range(nums) }
+    def get_canvas_rects(self, viewer):
+        # drawn relative to the window, with text of varying extent
+        return None
 
-        y_base = cy1
-
-        x1 = cx1; x2 = pxwd
-        clr_wd = pxwd // 256
-        rem_px = x2 - (clr_wd * 256)
-        if rem_px > 0:
-            ival = 256 // rem_px
-        else:
-            ival = 0
-        clr_ht = pxht
-        #print("clr is %dx%d width=%d rem=%d ival=%d" % (
-        #       width, height, clr_wd, rem_px, ival))
-
-        dist = rgbmap.get_dist()
-
-        j = ival; off = cx1
-        range_pts = []
-        for i in range(256):
-
-            wd = clr_wd
-            if rem_px > 0:
-                j -= 1
-                if j == 0:
-                    rem_px -= 1
-                    j = ival
-                    wd += 1
-            x = off
-
-            (r, g, b) = rgbmap.get_rgbval(i)
-            color = (r/255., g/255., b/255.)
-
-            cr.set_line(color, linewidth=0)
-            cr.set_fill(color, alpha=self.fillalpha)
-
-            cx1, cy1, cx2, cy2 = x, y_base, x+wd, y_base+pxht
-            cr.draw_polygon(((cx1, cy1), (cx2, cy1), (cx2, cy2), (cx1, cy2)))
-
-            # Draw range scale if we are supposed to
-            if self.showrange and i in _interval:
-                cb_pct = float(x) / pxwd
-                # get inverse of distribution function and calculate value
-                # at this position
-                rng_pct = dist.get_dist_pct(cb_pct)
-                val = float(loval + (rng_pct * (hival - loval)))
-                text = "%.4g" % (val)
-
-                rx = x
-                ry = y_base + self.tick_ht + txt_ht
-                ryy = y_base
-                range_pts.append((rx, ry, ryy, text))
-
-            off += wd
-
-        cr.set_line(color=self.color, linewidth=1, alpha=self.alpha)
-
-        # draw optional border
-        if self.linewidth > 0:
-            cx1, cy1, cx2, cy2 = 0, y_base, wd, y_base+pxht
-            cpoints = ((cx1, cy1), (cx2, cy1), (cx2, cy2), (cx1, cy2))
-            cr.draw_polygon(cpoints)
-
-        # draw range
-        if self.showrange:
-            cr.set_font(self.font, self.fontsize, color=self.color,
-                    alpha=self.alpha)
-            for (cx, cy, cyy, text) in range_pts:
-                # tick
-                cr.draw_line(cx, cyy, cx, cyy+self.tick_ht)
-                # number
-                cr.draw_text(cx, cy, text)
+    def get_index_llur(self):
+        return None
 
 
 class ModeIndicator(CanvasObjectBase):
@@ -422,6 +415,13 @@ class ModeIndicator(CanvasObjectBase):
         cx, cy = x_base + self.xpad, y_base + txt_ht + self.ypad
         cr.draw_text(cx, cy, text)
 
+    def get_canvas_rects(self, viewer):
+        # drawn relative to the window, with text of varying extent
+        return None
+
+    def get_index_llur(self):
+        return None
+
 
 
 # register our types
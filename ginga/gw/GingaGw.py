@@ -10,6 +10,7 @@ import platform
 import glob
 import traceback
 import time
+import multiprocessing
 
 # GUI imports
 from ginga.gw import GwHelp, GwMain, PluginManager
@@ -18,7 +19,7 @@ from ginga import toolkit
 
 # Local application imports
 from ginga import cmap, imap
-from ginga.misc import Bunch
+from ginga.misc import Bunch, Task
 from ginga.canvas.types.layer import DrawingCanvas
 from ginga.util import iohelper
 from ginga.util.six.moves import map, zip
@@ -55,6 +56,8 @@ class GingaView(GwMain.GwMain, Widgets.Application):
 
         self.filesel = None
         self.menubar = None
+        # for rendering in strips (see get_render_pool())
+        self.render_pool = None
 
     def set_layout(self, layout):
         self.layout = layout
@@ -62,6 +65,19 @@ class GingaView(GwMain.GwMain, Widgets.Application):
     def get_screen_dimensions(self):
         return (self.screen_wd, self.screen_ht)
 
+    def get_render_pool(self):
+        """Get the thread pool that the channel viewers render in strips
+        on (see the channel ``render_strips`` setting).  It is kept apart
+        from the main thread pool, so that redrawing does not have to
+        wait for plugin and loader tasks.
+        """
+        if self.render_pool is None:
+            numthreads = max(1, min(multiprocessing.cpu_count(), 8) - 1)
+            self.render_pool = Task.ThreadPool(numthreads, self.logger,
+                                               ev_quit=self.ev_quit)
+            self.render_pool.startall()
+        return self.render_pool
+
     def build_toplevel(self):
 
         self.font = self.getFont('fixedFont', 12)
@@ -310,6 +326,8 @@ class GingaView(GwMain.GwMain, Widgets.Application):
                                      settings=settings,
                                      bindings=bd)
         fi.set_desired_size(size[0], size[1])
+        # used if the channel's render_strips setting is > 1
+        fi.set_render_pool(self.get_render_pool())
 
         canvas = DrawingCanvas()
         canvas.enable_draw(False)
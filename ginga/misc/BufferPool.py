@@ -0,0 +1,58 @@
+#
+# BufferPool.py -- reusable numpy buffers.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+import threading
+import numpy
+
+
+class BufferPool(object):
+    """
+    A pool of preallocated numpy arrays, keyed by name, shape and dtype.
+
+    Each name (e.g. a stage of a rendering pipeline) holds at most one
+    buffer; asking for a different shape or dtype under the same name
+    replaces the old buffer, so the pool does not grow when e.g. a window
+    is resized.  The caller must be finished with the contents of a buffer
+    before asking for it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buffers = {}
+
+    def get_buffer(self, name, shape, dtype=numpy.uint8, fill=None):
+        """
+        Return the buffer `name` with shape `shape` and type `dtype`,
+        allocating it if necessary.  If `fill` is not None, the buffer
+        is filled with that value; otherwise its contents are undefined.
+        """
+        shape, dtype = tuple(shape), numpy.dtype(dtype)
+        with self._lock:
+            buf = self._buffers.get(name, None)
+            if (buf is None) or (buf.shape != shape) or (buf.dtype != dtype):
+                buf = numpy.empty(shape, dtype=dtype)
+                self._buffers[name] = buf
+
+        if fill is not None:
+            buf.fill(fill)
+        return buf
+
+    def release(self, name=None):
+        """
+        Drop buffer `name` from the pool, or all of them if `name` is None.
+        """
+        with self._lock:
+            if name is None:
+                self._buffers = {}
+            else:
+                self._buffers.pop(name, None)
+
+    def get_nbytes(self):
+        """Return the total size of the buffers in the pool."""
+        with self._lock:
+            return sum([buf.nbytes for buf in self._buffers.values()])
+
+#END
@@ -0,0 +1,61 @@
+#
+# LRUCache.py -- a small least recently used cache.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A cache of at most `maxsize` items, dropping the least recently
+    used item when it is full.
+
+    The canvas renderers use one to reuse pens, brushes, fonts and text
+    extents from one shape (and one redraw) to the next.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, make_fn):
+        """
+        Return the item cached under `key`, calling `make_fn()` to
+        create and cache it if it is not there.  Keys that cannot be
+        hashed (e.g. a color given as a list) are not cached.
+        """
+        try:
+            with self._lock:
+                val = self._items.pop(key)
+                # reinsert as the most recently used
+                self._items[key] = val
+                self.hits += 1
+                return val
+        except KeyError:
+            pass
+        except TypeError:
+            return make_fn()
+
+        val = make_fn()
+        with self._lock:
+            self.misses += 1
+            self._items[key] = val
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return val
+
+    def clear(self):
+        """Drop all the cached items."""
+        with self._lock:
+            self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+#END
@@ -0,0 +1,123 @@
+#
+# RenderStats.py -- rolling timing statistics for rendering stages.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+import threading
+import time
+from collections import deque
+
+import numpy
+
+
+class RenderStats(object):
+    """
+    Keeps the durations of the stages of the most recent redraws (e.g.
+    'cutout', 'cuts', 'colormap', ...) and calculates statistics on them.
+
+    Times recorded between start_frame() and end_frame() are summed per
+    stage, so that a stage that runs several times in one redraw (e.g.
+    for several images on a canvas) counts as one sample.  Times recorded
+    outside of a frame are each added as a sample of their own.  Each
+    thread has its own frame (e.g. a viewer's render thread and the GUI
+    thread finishing the previous redraw).
+    """
+
+    def __init__(self, window=100):
+        self.lock = threading.RLock()
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Discard all samples."""
+        with self.lock:
+            self.samples = {}
+            self.counts = {}
+            # the frame of each thread
+            self._local = threading.local()
+
+    def set_window(self, window):
+        """Set the number of samples kept per stage to `window`."""
+        with self.lock:
+            self.window = window
+            for stage, samples in list(self.samples.items()):
+                self.samples[stage] = deque(samples, maxlen=window)
+
+    def start_frame(self):
+        local = self._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        if getattr(local, 'frame', None) is None:
+            local.frame = {}
+
+    def end_frame(self):
+        local = self._local
+        local.depth = getattr(local, 'depth', 0) - 1
+        if local.depth > 0:
+            return
+        local.depth = 0
+        frame, local.frame = getattr(local, 'frame', None), None
+        if frame is not None:
+            with self.lock:
+                for stage, secs in frame.items():
+                    self._add_sample(stage, secs)
+
+    def record(self, stage, secs):
+        """Record that `stage` took `secs` seconds."""
+        frame = getattr(self._local, 'frame', None)
+        if frame is not None:
+            frame[stage] = frame.get(stage, 0.0) + secs
+        else:
+            with self.lock:
+                self._add_sample(stage, secs)
+
+    def timer(self, stage):
+        """
+        Return a context manager that records the time spent in its
+        block as `stage`.
+        """
+        return StageTimer(self, stage)
+
+    def _add_sample(self, stage, secs):
+        try:
+            self.samples[stage].append(secs)
+            self.counts[stage] += 1
+        except KeyError:
+            self.samples[stage] = deque([secs], maxlen=self.window)
+            self.counts[stage] = 1
+
+    def get_stats(self, percentiles=(50, 90, 99)):
+        """
+        Return a dict, keyed by stage, of dicts with the number of samples
+        ever recorded ('count'), and the 'last', 'mean' and 'max' times and
+        the requested percentiles (as e.g. 'p90') of the recent samples.
+        All times are in seconds.
+        """
+        with self.lock:
+            items = [(stage, numpy.array(samples), self.counts[stage])
+                     for stage, samples in self.samples.items()]
+
+        res = {}
+        for stage, arr, count in items:
+            d = dict(count=count, last=float(arr[-1]),
+                     mean=float(arr.mean()), max=float(arr.max()))
+            for pct in percentiles:
+                d['p%g' % pct] = float(numpy.percentile(arr, pct))
+            res[stage] = d
+        return res
+
+
+class StageTimer(object):
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.time_start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stats.record(self.stage, time.time() - self.time_start)
+        return False
+
+#END
@@ -59,6 +59,8 @@ class Catalogs(GingaPlugin.LocalPlugin):
         canvas.set_callback('cursor-down', self.btndown)
         canvas.set_callback('cursor-up', self.btnup)
         canvas.set_callback('draw-event', self.draw_cb)
+        # catalogs can have many stars
+        canvas.enable_spatial_index(True)
         canvas.setSurface(self.fitsimage)
         self.canvas = canvas
 
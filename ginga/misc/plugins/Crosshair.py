@@ -134,6 +134,8 @@ class Crosshair(GingaPlugin.LocalPlugin):
 
     def move_crosshair(self, viewer, data_x, data_y):
         self.logger.debug("move crosshair data x,y=%f,%f" % (data_x, data_y))
+        # only the old and new positions of the crosshair need redrawing
+        self.canvas.mark_dirty(self.xh)
         self.xh.move_to(data_x, data_y)
         self.canvas.update_canvas(whence=3)
 
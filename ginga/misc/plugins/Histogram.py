@@ -27,12 +27,15 @@ class Histogram(GingaPlugin.LocalPlugin):
         prefs = self.fv.get_preferences()
         self.settings = prefs.createCategory('plugin_Histogram')
         self.settings.addDefaults(draw_then_move=True, num_bins=2048,
-                                  hist_color='aquamarine')
+                                  hist_color='aquamarine',
+                                  num_samples=1000000)
         self.settings.load(onError='silent')
 
         # Set up histogram control parameters
         self.histcolor = self.settings.get('hist_color', 'aquamarine')
         self.numbins = self.settings.get('num_bins', 2048)
+        # regions larger than this are histogrammed from a sample
+        self.num_samples = self.settings.get('num_samples', 1000000)
         self.autocuts = AutoCuts.Histogram(self.logger)
 
         self.dc = self.fv.getDrawClasses()
@@ -246,6 +249,15 @@ class Histogram(GingaPlugin.LocalPlugin):
             tup = image.cutout_adjust(x1, y1, x2, y2)
             data = tup[0]
 
+        # for a large region (e.g. the full image) use a sample of it,
+        # and scale the counts up to the whole region
+        total_px = data.shape[0] * data.shape[1]
+        if (self.num_samples > 0) and (total_px > self.num_samples):
+            data = self.autocuts.get_sample(data, self.num_samples)
+            res = self.autocuts.calc_histogram(data, pct=pct, numbins=numbins)
+            res.dist = res.dist * (float(total_px) / data.size)
+            return res
+
         return self.autocuts.calc_histogram(data, pct=pct, numbins=numbins)
 
     def redo(self):
@@ -64,7 +64,8 @@ class Mosaic(GingaPlugin.LocalPlugin):
                                   mosaic_hdus=False, skew_limit=0.1,
                                   allow_expand=True, expand_pad_deg=0.01,
                                   max_center_deg_delta=2.0,
-                                  make_thumbs=True, reuse_image=False)
+                                  make_thumbs=True, reuse_image=False,
+                                  use_pyramid=False)
         self.settings.load(onError='silent')
 
         # channel where mosaic should appear (default=ours)
@@ -256,6 +257,8 @@ class Mosaic(GingaPlugin.LocalPlugin):
 
             if name is not None:
                 img_mosaic.set(name=name)
+            # large mosaics are usually viewed zoomed out
+            img_mosaic.enable_pyramid(self.settings.get('use_pyramid', False))
             imname = img_mosaic.get('name', image.get('name', "NoName"))
 
             # avoid making a thumbnail of this if seed image is also that way
@@ -69,6 +69,10 @@ Examples:
  Change intensity map:
  $ grc channel FOO set_intensity_map neg
 
+ Show render timing statistics (optionally with percentiles):
+ $ grc render_stats FOO
+ $ grc render_stats FOO 50 95 99.9
+
 """
 import sys
 import numpy
@@ -346,5 +350,38 @@ class GingaWrapper(object):
         _method = getattr(self.fv, method_name)
         return self.fv.gui_call(_method, *args, **kwdargs)
 
+    def render_stats(self, chname, *percentiles):
+        """Get timing statistics for the recent redraws of a channel.
+
+        Examples
+        --------
+        render_stats(`chname`)
+           statistics with the 50th, 90th and 99th percentiles
+
+        render_stats(`chname`, 50, 95, 99.9)
+           statistics with the given percentiles
+
+        Returns
+        -------
+        stats: string
+          a table of the times, in milliseconds, of each rendering stage
+        """
+        chinfo = self.fv.get_channelInfo(chname)
+        if len(percentiles) == 0:
+            percentiles = (50, 90, 99)
+        percentiles = [float(pct) for pct in percentiles]
+        stats = self.fv.gui_call(chinfo.fitsimage.get_render_stats,
+                                 percentiles=percentiles)
+
+        cols = ['mean', 'max'] + ['p%g' % pct for pct in percentiles]
+        lines = ["%-10s %8s " % ('stage', 'count') +
+                 ' '.join(["%9s" % col for col in cols])]
+        for stage in sorted(stats.keys()):
+            d = stats[stage]
+            lines.append("%-10s %8d " % (stage, d['count']) +
+                         ' '.join(["%9.3f" % (d[col] * 1000.0)
+                                   for col in cols]))
+        return '\n'.join(lines)
+
 
 #END
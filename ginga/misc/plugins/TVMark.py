@@ -261,6 +261,7 @@ Press "Hide" to clear all markings (does not clear memory). Press "Show" to repl
             kstr = ','.join(map(str, key))
             sub_dict = {}
             bad_sub_dict = {}
+            xlist, ylist = [], []
             self.tree_dict[kstr] = sub_dict
             bad_tree_dict[kstr] = bad_sub_dict
 
@@ -295,9 +296,8 @@ Press "Hide" to clear all markings (does not clear memory). Press "Show" to repl
 
                 # Display point
                 else:
-                    obj = self._get_markobj(
-                        x, y, marktype, marksize, markcolor, self.markwidth)
-                    objlist.append(obj)
+                    xlist.append(x)
+                    ylist.append(y)
 
                     sub_dict[seqstr] = bnch
                     self._xarr.append(x)
@@ -306,7 +306,13 @@ Press "Hide" to clear all markings (does not clear memory). Press "Show" to repl
 
                 seqno += 1
 
-        n_obj = len(objlist)
+            # Draw all the markings of this type in one object
+            if len(xlist) > 0:
+                objlist.append(self._get_markobj(
+                    xlist, ylist, marktype, marksize, markcolor,
+                    self.markwidth))
+
+        n_obj = len(self._xarr)
         self.logger.debug('Displaying {0} markings'.format(n_obj))
 
         if nbad > 0:
@@ -328,22 +334,22 @@ Press "Hide" to clear all markings (does not clear memory). Press "Show" to repl
         self.fitsimage.redraw()  # Force immediate redraw
 
     def _get_markobj(self, x, y, marktype, marksize, markcolor, markwidth):
-        """Generate canvas object for given mark parameters."""
-        if marktype == 'circle':
-            obj = self.dc.Circle(
-                x=x, y=y, radius=marksize, color=markcolor, linewidth=markwidth)
-        elif marktype in ('cross', 'plus'):
-            obj = self.dc.Point(
-                x=x, y=y, radius=marksize, color=markcolor, linewidth=markwidth,
-                style=marktype)
+        """Generate canvas object for given mark parameters.
+        X and Y are sequences of positions, which are marked by a single
+        object."""
+        if marktype in ('circle', 'cross', 'plus'):
+            obj = self.dc.MarkerCollection(
+                x=x, y=y, radius=marksize, color=markcolor,
+                linewidth=markwidth, style=marktype)
         elif marktype == 'box':
-            obj = self.dc.Box(
-                x=x, y=y, xradius=marksize, yradius=marksize, color=markcolor,
-                linewidth=markwidth)
+            obj = self.dc.MarkerCollection(
+                x=x, y=y, radius=marksize, color=markcolor,
+                linewidth=markwidth, style='box')
         else:  # point, marksize
-            obj = self.dc.Box(
-                x=x, y=y, xradius=1, yradius=1, color=markcolor,
-                linewidth=markwidth, fill=True, fillcolor=markcolor)
+            obj = self.dc.MarkerCollection(
+                x=x, y=y, radius=1, color=markcolor,
+                linewidth=markwidth, style='box', fill=True,
+                fillcolor=markcolor)
 
         return obj
 
@@ -501,19 +507,20 @@ Press "Hide" to clear all markings (does not clear memory). Press "Show" to repl
         # Display highlighted entries only in second table
         self.treeviewsel.set_tree(res_dict)
 
+        nsel = 0
+
         for kstr, sub_dict in iteritems(res_dict):
             s = kstr.split(',')
             marktype = s[0]
             marksize = float(s[1])
             markcolor = s[2]
 
-            for bnch in itervalues(sub_dict):
-                obj = self._get_markobj(bnch.X - self.pixelstart,
-                                        bnch.Y - self.pixelstart,
-                                        marktype, marksize, markcolor, width)
-                objlist.append(obj)
-
-        nsel = len(objlist)
+            xlist = [bnch.X - self.pixelstart for bnch in itervalues(sub_dict)]
+            ylist = [bnch.Y - self.pixelstart for bnch in itervalues(sub_dict)]
+            if len(xlist) > 0:
+                objlist.append(self._get_markobj(
+                    xlist, ylist, marktype, marksize, markcolor, width))
+                nsel += len(xlist)
         self.w.nselected.set_text(str(nsel))
 
         # Draw on canvas
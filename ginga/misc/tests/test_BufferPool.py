@@ -0,0 +1,49 @@
+#
+# Unit Tests for the BufferPool class
+#
+import unittest
+import numpy
+
+from ginga.misc.BufferPool import BufferPool
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = BufferPool()
+
+    def test_reuse(self):
+        buf1 = self.pool.get_buffer('a', (10, 20, 4), numpy.uint8)
+        buf2 = self.pool.get_buffer('a', (10, 20, 4), numpy.uint8)
+        assert buf1 is buf2
+
+        # different names get different buffers
+        buf3 = self.pool.get_buffer('b', (10, 20, 4), numpy.uint8)
+        assert buf3 is not buf1
+
+    def test_replace(self):
+        buf1 = self.pool.get_buffer('a', (10, 20, 4), numpy.uint8)
+        buf2 = self.pool.get_buffer('a', (20, 20, 4), numpy.uint8)
+        assert buf2 is not buf1
+        assert buf2.shape == (20, 20, 4)
+        assert self.pool.get_nbytes() == buf2.nbytes
+
+        buf3 = self.pool.get_buffer('a', (20, 20, 4), numpy.float32)
+        assert buf3.dtype == numpy.float32
+
+    def test_fill(self):
+        buf = self.pool.get_buffer('a', (5, 5), numpy.uint8, fill=7)
+        assert numpy.all(buf == 7)
+        buf = self.pool.get_buffer('a', (5, 5), numpy.uint8, fill=0)
+        assert numpy.all(buf == 0)
+
+    def test_release(self):
+        self.pool.get_buffer('a', (5, 5))
+        self.pool.get_buffer('b', (5, 5))
+        self.pool.release('a')
+        assert self.pool.get_nbytes() == 25
+        self.pool.release()
+        assert self.pool.get_nbytes() == 0
+
+
+#END
@@ -0,0 +1,51 @@
+#
+# Unit Tests for the RenderStats class
+#
+import unittest
+import numpy
+
+from ginga.misc.RenderStats import RenderStats
+
+
+class TestRenderStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = RenderStats(window=10)
+
+    def test_window(self):
+        for i in range(20):
+            self.stats.record('cutout', float(i))
+        d = self.stats.get_stats(percentiles=(50,))['cutout']
+        assert d['count'] == 20
+        assert d['last'] == 19.0
+        assert d['max'] == 19.0
+        # only the last 10 samples are used for the statistics
+        assert d['mean'] == numpy.mean(numpy.arange(10, 20))
+        assert d['p50'] == numpy.median(numpy.arange(10, 20))
+
+    def test_frame(self):
+        # stages timed several times within one frame count once
+        self.stats.start_frame()
+        self.stats.record('overlay', 1.0)
+        self.stats.start_frame()
+        self.stats.record('overlay', 2.0)
+        self.stats.end_frame()
+        assert self.stats.get_stats() == {}
+        self.stats.end_frame()
+
+        d = self.stats.get_stats()['overlay']
+        assert d['count'] == 1
+        assert d['last'] == 3.0
+
+    def test_timer(self):
+        with self.stats.timer('cuts'):
+            pass
+        d = self.stats.get_stats(percentiles=(90, 99.9))['cuts']
+        assert d['count'] == 1
+        assert ('p90' in d) and ('p99.9' in d)
+
+        self.stats.reset()
+        assert self.stats.get_stats() == {}
+
+
+#END
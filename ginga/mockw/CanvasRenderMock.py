@@ -88,6 +88,22 @@ class RenderContext(object):
     def draw_bezier_curve(self, cp):
         pass
 
+    # Optional batched operations, used to draw collections of markers.
+    # They take arrays of window coordinates; if not defined, the markers
+    # are drawn one by one with the operations above.
+
+    def draw_lines(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        #self.cr.draw_lines(cx1_arr, cy1_arr, cx2_arr, cy2_arr)
+        pass
+
+    def draw_circles(self, cx_arr, cy_arr, cradius_arr):
+        #self.cr.draw_circles(cx_arr, cy_arr, cradius_arr)
+        pass
+
+    def draw_rectangles(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        #self.cr.draw_rectangles(cx1_arr, cy1_arr, cx2_arr, cy2_arr)
+        pass
+
 class CanvasRenderer(object):
 
     def __init__(self, viewer):
@@ -49,6 +49,10 @@ class ImageViewMock(ImageView.ImageViewBase):
         # cursors
         self.cursor = {}
 
+        # Set this if your widget set can restrict drawing to some areas
+        # of the pixmap (see set_clip_rects())
+        self._can_clip = False
+
         # override default
         #self.defer_redraw = False
         self.rgb_fh = RGBFileHandler(self.logger)
@@ -74,6 +78,10 @@ class ImageViewMock(ImageView.ImageViewBase):
         daht, dawd, depth = data.shape
         self.logger.debug("data shape is %dx%dx%d" % (dawd, daht, depth))
 
+        # restrict drawing to the areas being redrawn, if any
+        # if self.get_clip_rects() is not None:
+        #     setClipRegion(...)
+
         # fill pixmap with background color
         imgwin_wd, imgwin_ht = self.get_window_size()
         # fillRect(Rect(0, 0, imgwin_wd, imgwin_ht), bgclr)
@@ -189,6 +197,14 @@ class ImageViewMock(ImageView.ImageViewBase):
         # invalidate the display and force a refresh from
         # offscreen pixmap
 
+    def update_image_rects(self, rects):
+        if (not self.pixmap) or (not self.imgwin):
+            return
+
+        self.logger.debug("updating window areas from pixmap")
+        # invalidate only the (x1, y1, x2, y2) rects of the display
+        # and force a refresh of them from offscreen pixmap
+
     def set_cursor(self, cursor):
         if self.imgwin:
             # set the cursor on self.imgwin
@@ -5,30 +5,58 @@
 # Please see the file LICENSE.txt for details.
 
 import math
+import numpy
 
 from PIL import Image, ImageDraw, ImageFont
 from . import PilHelp
 from itertools import chain
+from ginga.misc.LRUCache import LRUCache
 
 # force registration of all canvas types
 import ginga.canvas.types.all
 
 class RenderContext(object):
 
-    def __init__(self, viewer):
+    def __init__(self, viewer, cache=None):
         self.viewer = viewer
+        # cache of pens, brushes, fonts and text extents (an LRUCache)
+        self.cache = cache
 
         # TODO: encapsulate this drawable
-        self.cr = PilHelp.PilContext(self.viewer.get_surface())
+        surface, self.origin = self.viewer.get_draw_surface()
+        self.cr = PilHelp.PilContext(surface)
 
         self.pen = None
         self.brush = None
         self.font = None
+        self._font_key = None
 
-    def set_line_from_shape(self, shape):
+    def _get_cached(self, key, make_fn):
+        if self.cache is None:
+            return make_fn()
+        return self.cache.get(key, make_fn)
+
+    def _get_pen(self, color, alpha, linewidth, style):
         # TODO: support line width and style
+        return self._get_cached(('pen', color, alpha, linewidth, style),
+                                lambda: self.cr.get_pen(color, alpha=alpha))
+
+    def _get_brush(self, color, alpha):
+        return self._get_cached(('brush', color, alpha),
+                                lambda: self.cr.get_brush(color, alpha=alpha))
+
+    def _set_font(self, fontname, fontsize, color, alpha):
+        key = ('font', fontname, fontsize, color, alpha)
+        self.font = self._get_cached(
+            key, lambda: self.cr.get_font(fontname, fontsize, color,
+                                          alpha=alpha))
+        self._font_key = key
+
+    def set_line_from_shape(self, shape):
         alpha = getattr(shape, 'alpha', 1.0)
-        self.pen = self.cr.get_pen(shape.color, alpha=alpha)
+        linewidth = getattr(shape, 'linewidth', 1)
+        style = getattr(shape, 'linestyle', 'solid')
+        self.pen = self._get_pen(shape.color, alpha, linewidth, style)
 
     def set_fill_from_shape(self, shape):
         fill = getattr(shape, 'fill', False)
@@ -39,7 +67,7 @@ class RenderContext(object):
                 color = shape.color
             alpha = getattr(shape, 'alpha', 1.0)
             alpha = getattr(shape, 'fillalpha', alpha)
-            self.brush = self.cr.get_brush(color, alpha=alpha)
+            self.brush = self._get_brush(color, alpha)
         else:
             self.brush = None
 
@@ -50,10 +78,10 @@ class RenderContext(object):
             else:
                 fontsize = shape.scale_font(self.viewer)
             alpha = getattr(shape, 'alpha', 1.0)
-            self.font = self.cr.get_font(shape.font, fontsize, shape.color,
-                                         alpha=alpha)
+            self._set_font(shape.font, fontsize, shape.color, alpha)
         else:
             self.font = None
+            self._font_key = None
 
     def initialize_from_shape(self, shape, line=True, fill=True, font=True):
         if line:
@@ -64,21 +92,22 @@ class RenderContext(object):
             self.set_font_from_shape(shape)
 
     def set_line(self, color, alpha=1.0, linewidth=1, style='solid'):
-        # TODO: support line width and style
-        self.pen = self.cr.get_pen(color, alpha=alpha)
+        self.pen = self._get_pen(color, alpha, linewidth, style)
 
     def set_fill(self, color, alpha=1.0):
         if color is None:
             self.brush = None
         else:
-            self.brush = self.cr.get_brush(color, alpha=alpha)
+            self.brush = self._get_brush(color, alpha)
 
     def set_font(self, fontname, fontsize, color='black', alpha=1.0):
-        self.font = self.cr.get_font(fontname, fontsize, color,
-                                     alpha=alpha)
+        self._set_font(fontname, fontsize, color, alpha)
 
     def text_extents(self, text):
-        return self.cr.text_extents(text, self.font)
+        if self._font_key is None:
+            return self.cr.text_extents(text, self.font)
+        return self._get_cached(('extents', self._font_key, text),
+                                lambda: self.cr.text_extents(text, self.font))
 
     def get_affine_transform(self, cx, cy, rot_deg):
         x, y = 0, 0          # old center
@@ -94,33 +123,64 @@ class RenderContext(object):
         f = y - nx*d - ny*e
         return (a, b, c, d, e, f)
 
+    def _to_surface(self, cpoints):
+        # window coordinates to those of the surface being drawn on
+        x0, y0 = self.origin
+        if x0 == 0 and y0 == 0:
+            return cpoints
+        return [(cx - x0, cy - y0) for cx, cy in cpoints]
+
     ##### DRAWING OPERATIONS #####
 
     def draw_text(self, cx, cy, text, rot_deg=0.0):
-        wd, ht = self.cr.text_extents(text, self.font)
+        wd, ht = self.text_extents(text)
+        x0, y0 = self.origin
 
-        self.cr.text((cx, cy-ht), text, self.font, self.pen)
+        self.cr.text((cx - x0, cy - ht - y0), text, self.font, self.pen)
 
     def draw_polygon(self, cpoints):
-        self.cr.polygon(cpoints, self.pen, self.brush)
+        self.cr.polygon(self._to_surface(cpoints), self.pen, self.brush)
 
     def draw_circle(self, cx, cy, cradius):
-        self.cr.circle((cx, cy), cradius, self.pen, self.brush)
+        x0, y0 = self.origin
+        self.cr.circle((cx - x0, cy - y0), cradius, self.pen, self.brush)
 
     def draw_line(self, cx1, cy1, cx2, cy2):
-        self.cr.line((cx1, cy1), (cx2, cy2), self.pen)
+        x0, y0 = self.origin
+        self.cr.line((cx1 - x0, cy1 - y0), (cx2 - x0, cy2 - y0), self.pen)
 
     def draw_path(self, cpoints):
-        self.cr.path(cpoints, self.pen)
+        self.cr.path(self._to_surface(cpoints), self.pen)
+
+    def draw_lines(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        x0, y0 = self.origin
+        self.cr.lines(numpy.subtract(cx1_arr, x0), numpy.subtract(cy1_arr, y0),
+                      numpy.subtract(cx2_arr, x0), numpy.subtract(cy2_arr, y0),
+                      self.pen)
+
+    def draw_circles(self, cx_arr, cy_arr, cradius_arr):
+        x0, y0 = self.origin
+        self.cr.circles(numpy.subtract(cx_arr, x0), numpy.subtract(cy_arr, y0),
+                        cradius_arr, self.pen, self.brush)
+
+    def draw_rectangles(self, cx1_arr, cy1_arr, cx2_arr, cy2_arr):
+        x0, y0 = self.origin
+        self.cr.rectangles(numpy.subtract(cx1_arr, x0),
+                           numpy.subtract(cy1_arr, y0),
+                           numpy.subtract(cx2_arr, x0),
+                           numpy.subtract(cy2_arr, y0),
+                           self.pen, self.brush)
 
 
 class CanvasRenderer(object):
 
     def __init__(self, viewer):
         self.viewer = viewer
+        # pens, brushes, fonts and text extents reused between shapes
+        self.cache = LRUCache(maxsize=1024)
 
     def setup_cr(self, shape):
-        cr = RenderContext(self.viewer)
+        cr = RenderContext(self.viewer, cache=self.cache)
         cr.initialize_from_shape(shape, font=False)
         return cr
 
@@ -26,6 +26,9 @@ class ImageViewPil(ImageView.ImageViewBase):
 
         self.surface = None
         self._rgb_order = 'RGBA'
+        # we can redraw only parts of the surface (see set_clip_rects())
+        self._can_clip = True
+        self._clip_surface = None
 
         self.renderer = CanvasRenderer(self)
 
@@ -35,6 +38,15 @@ class ImageViewPil(ImageView.ImageViewBase):
     def get_surface(self):
         return self.surface
 
+    def get_draw_surface(self):
+        """Get the surface to draw on, and the position of its origin in
+        the window (this is only part of the window when redrawing some
+        areas of it, see set_clip_rects()).
+        """
+        if self._clip_surface is not None:
+            return self._clip_surface
+        return (self.surface, (0, 0))
+
     def render_image(self, rgbobj, dst_x, dst_y):
         """Render the image represented by (rgbobj) at dst_x, dst_y
         in the pixel space.
@@ -44,6 +56,16 @@ class ImageViewPil(ImageView.ImageViewBase):
         canvas = self.surface
         self.logger.debug("redraw surface")
 
+        rects = self.get_clip_rects()
+        if rects is not None:
+            # paste only the areas being redrawn
+            canvas, (x0, y0) = self.get_draw_surface()
+            for rect in rects:
+                rgb_arr = self.getwin_array(order=self._rgb_order, rect=rect)
+                canvas.paste(Image.fromarray(rgb_arr),
+                             (rect[0] - x0, rect[1] - y0))
+            return
+
         # get window contents as a buffer and paste it into the PIL surface
         rgb_arr = self.getwin_array(order=self._rgb_order)
         p_image = Image.fromarray(rgb_arr)
@@ -58,6 +80,25 @@ class ImageViewPil(ImageView.ImageViewBase):
 
         canvas.paste(p_image)
 
+    def set_clip_rects(self, rects):
+        # PIL cannot clip drawing, so we redraw the areas on a copy of
+        # their bounding box and then copy only the areas back
+        if (rects is not None) and (self.surface is not None):
+            wd, ht = self.surface.size
+            t_ = list(zip(*rects))
+            bbox = (max(0, min(t_[0])), max(0, min(t_[1])),
+                    min(wd, max(t_[2])), min(ht, max(t_[3])))
+            self._clip_surface = (self.surface.crop(bbox), bbox[:2])
+
+        elif self._clip_surface is not None:
+            clip_surface, (x0, y0) = self._clip_surface
+            for x1, y1, x2, y2 in self.get_clip_rects():
+                crop = clip_surface.crop((x1 - x0, y1 - y0, x2 - x0, y2 - y0))
+                self.surface.paste(crop, (x1, y1))
+            self._clip_surface = None
+
+        ImageView.ImageViewBase.set_clip_rects(self, rects)
+
     def configure_surface(self, width, height):
         # create PIL surface the size of the window
         # NOTE: pillow needs an RGB image in order to draw with alpha
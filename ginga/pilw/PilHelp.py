@@ -5,6 +5,7 @@
 # Please see the file LICENSE.txt for details.
 
 import os.path
+import numpy
 from PIL import Image, ImageFont, ImageDraw
 
 from ginga import colors
@@ -133,4 +134,31 @@ class PilContext(object):
             self.line(p0, pt, pen)
             p0 = pt
 
+    def _int_lists(self, *arrs):
+        return [numpy.rint(arr).astype(numpy.int64).tolist() for arr in arrs]
+
+    def lines(self, x1_arr, y1_arr, x2_arr, y2_arr, pen):
+        line = self.ctx.line
+        for x1, y1, x2, y2 in zip(*self._int_lists(x1_arr, y1_arr,
+                                                   x2_arr, y2_arr)):
+            line(((x1, y1), (x2, y2)), fill=pen.color, width=pen.linewidth)
+
+    def circles(self, x_arr, y_arr, radius_arr, pen, brush):
+        fill = None
+        if (brush is not None) and brush.fill:
+            fill = brush.color
+        ellipse = self.ctx.ellipse
+        for x, y, radius in zip(*self._int_lists(x_arr, y_arr, radius_arr)):
+            ellipse(((x-radius, y-radius), (x+radius, y+radius)),
+                    fill=fill, outline=pen.color)
+
+    def rectangles(self, x1_arr, y1_arr, x2_arr, y2_arr, pen, brush):
+        fill = None
+        if (brush is not None) and brush.fill:
+            fill = brush.color
+        rectangle = self.ctx.rectangle
+        for x1, y1, x2, y2 in zip(*self._int_lists(x1_arr, y1_arr,
+                                                   x2_arr, y2_arr)):
+            rectangle(((x1, y1), (x2, y2)), fill=fill, outline=pen.color)
+
 #END
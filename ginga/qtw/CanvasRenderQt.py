@@ -21,6 +21,11 @@ class RenderContext(object):
         # TODO: encapsulate this drawable
         self.cr = QPainter(self.viewer.pixmap)
 
+        # only draw in the areas being redrawn, if any
+        region = self.viewer.get_clip_region()
+        if region is not None:
+            self.cr.setClipRegion(region)
+
     def __get_color(self, color, alpha):
         clr = QColor()
         if isinstance(color, tuple):
@@ -10,7 +10,7 @@ import numpy
 from io import BytesIO
 
 from ginga.qtw.QtHelp import QtGui, QtCore, QFont, QColor, QImage, \
-     QPixmap, QCursor, QPainter, have_pyqt5, get_scroll_info
+     QPixmap, QCursor, QPainter, QRegion, have_pyqt5, get_scroll_info
 from ginga import ImageView, Mixins, Bindings
 import ginga.util.six as six
 from ginga.util.six.moves import map, zip
@@ -128,6 +128,9 @@ class ImageViewQt(ImageView.ImageViewBase):
         self.pixmap = None
         # Qt expects 32bit BGRA data for color images
         self._rgb_order = 'BGRA'
+        # for redrawing only some areas of the pixmap
+        self._can_clip = True
+        self._clip_region = None
 
         self.renderer = CanvasRenderer(self)
 
@@ -157,6 +160,8 @@ class ImageViewQt(ImageView.ImageViewBase):
 
         painter = QPainter(drawable)
         painter.setWorldMatrixEnabled(True)
+        if self._clip_region is not None:
+            painter.setClipRegion(self._clip_region)
 
         # fill pixmap with background color
         imgwin_wd, imgwin_ht = self.get_window_size()
@@ -186,6 +191,20 @@ class ImageViewQt(ImageView.ImageViewBase):
         return self._render_offscreen(self.pixmap, arr, dst_x, dst_y,
                                       width, height)
 
+    def set_clip_rects(self, rects):
+        if rects is None:
+            self._clip_region = None
+        else:
+            region = QRegion()
+            for x1, y1, x2, y2 in rects:
+                region = region.united(QRegion(x1, y1, x2 - x1, y2 - y1))
+            self._clip_region = region
+
+        ImageView.ImageViewBase.set_clip_rects(self, rects)
+
+    def get_clip_region(self):
+        return self._clip_region
+
     def configure_window(self, width, height):
         self.logger.debug("window size reconfigured to %dx%d" % (
             width, height))
@@ -270,6 +289,18 @@ class ImageViewQt(ImageView.ImageViewBase):
             self.imgwin.update()
             #self.imgwin.show()
 
+    def update_image_rects(self, rects):
+        if (not self.pixmap) or (not self.imgwin):
+            return
+
+        self.logger.debug("updating window areas from pixmap")
+        for x1, y1, x2, y2 in rects:
+            if hasattr(self, 'scene'):
+                self.scene.invalidate(x1, y1, x2 - x1, y2 - y1,
+                                      QtGui.QGraphicsScene.BackgroundLayer)
+            else:
+                self.imgwin.update(x1, y1, x2 - x1, y2 - y1)
+
     def set_cursor(self, cursor):
         if self.imgwin is not None:
             self.imgwin.setCursor(cursor)
@@ -25,7 +25,7 @@ if toolkit in ('qt5', 'choose') and (not configured):
         from PyQt5 import QtWidgets as QtGui
         from PyQt5.QtGui import QImage, QColor, QFont, QPixmap, QIcon, \
              QCursor, QPainter, QPen, QPolygonF, QPolygon, QTextCursor, \
-             QDrag, QPainterPath, QBrush
+             QDrag, QPainterPath, QBrush, QRegion
         from PyQt5.QtCore import QItemSelectionModel
         from PyQt5.QtWidgets import QApplication
         have_pyqt5 = True
@@ -51,7 +51,7 @@ if toolkit in ('qt4', 'choose') and (not configured):
         from PyQt4.QtGui import QImage, QColor, QFont, QPixmap, QIcon, \
              QCursor, QPainter, QPen, QPolygonF, QPolygon, QTextCursor, \
              QDrag, QItemSelectionModel, QPainterPath, QApplication, \
-             QBrush
+             QBrush, QRegion
         have_pyqt4 = True
         try:
             from PyQt4 import QtWebKit
@@ -70,7 +70,7 @@ if toolkit in ('pyside', 'choose') and (not configured):
         from PySide import QtCore, QtGui
         from PySide.QtGui import QImage, QColor, QFont, QPixmap, QIcon, \
              QCursor, QPainter, QPen, QPolygonF, QPolygon, QTextCursor, \
-             QDrag, QItemSelectionModel, QPainterPath, QBrush
+             QDrag, QItemSelectionModel, QPainterPath, QBrush, QRegion
         have_pyside = True
         try:
             from PySide import QtWebKit
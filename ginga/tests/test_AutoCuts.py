@@ -0,0 +1,120 @@
+#
+# Unit Tests for the AutoCuts classes
+#
+import unittest
+import logging
+import warnings
+import numpy
+
+from ginga import AutoCuts
+from ginga.BaseImage import BaseImage
+
+
+class CountingHistogram(AutoCuts.Histogram):
+
+    def __init__(self, logger, **kwdargs):
+        super(CountingHistogram, self).__init__(logger, **kwdargs)
+        self.count = 0
+
+    def calc_cut_levels(self, image):
+        self.count += 1
+        return super(CountingHistogram, self).calc_cut_levels(image)
+
+
+class TestAutoCuts(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("TestAutoCuts")
+        self.data = numpy.random.RandomState(1).normal(
+            100.0, 10.0, size=(600, 700)).astype(numpy.float32)
+        self.image = BaseImage(data_np=self.data, logger=self.logger)
+
+    def test_cached_levels(self):
+        autocuts = CountingHistogram(self.logger)
+        levels = autocuts.get_autocut_levels(self.image)
+        assert levels == autocuts.calc_cut_levels(self.image)
+        autocuts.count = 0
+
+        # reused by another instance with the same parameters
+        other = CountingHistogram(self.logger)
+        assert other.get_autocut_levels(self.image) == levels
+        assert autocuts.get_autocut_levels(self.image) == levels
+        assert autocuts.count == 0 and other.count == 0
+
+        # but not with different parameters
+        other.pct = 0.9
+        assert other.get_autocut_levels(self.image) != levels
+        assert other.count == 1
+
+        # or after the data has changed
+        self.image.set_data(self.data * 2.0)
+        lo, hi = autocuts.get_autocut_levels(self.image)
+        assert autocuts.count == 1
+        assert numpy.isclose(lo, levels[0] * 2.0, rtol=0.01)
+
+    def test_sample(self):
+        autocuts = AutoCuts.Histogram(self.logger)
+        sample = autocuts.get_sample(self.data, 10000)
+        assert 8000 <= sample.size <= 10000
+        assert numpy.all(sample == autocuts.get_sample(self.data, 10000))
+        # small arrays are used whole
+        assert autocuts.get_sample(self.data, 10 ** 6) is self.data
+
+    def test_sampled_histogram(self):
+        # a wide field, where the center is not representative
+        data = numpy.zeros((1000, 4000), dtype=numpy.float32)
+        data[:, :1000] = 1000.0
+        data += numpy.random.RandomState(2).uniform(0, 1, size=data.shape)
+        image = BaseImage(data_np=data, logger=self.logger)
+
+        whole = AutoCuts.Histogram(self.logger, usecrop=False, pct=0.99)
+        sampled = AutoCuts.Histogram(self.logger, usesample=True,
+                                     num_samples=40000, pct=0.99)
+        lo1, hi1 = whole.calc_cut_levels(image)
+        lo2, hi2 = sampled.calc_cut_levels(image)
+        assert numpy.isclose(lo1, lo2, atol=1.0)
+        assert numpy.isclose(hi1, hi2, atol=1.0)
+
+    def test_int_histogram(self):
+        autocuts = AutoCuts.Histogram(self.logger)
+        for dtype in (numpy.uint16, numpy.int32):
+            data = self.data.astype(dtype) - 20
+            res = autocuts.calc_histogram(data, pct=0.99, numbins=37)
+            dist, bins = numpy.histogram(data, bins=37)
+            assert numpy.all(res.dist == dist)
+            assert numpy.allclose(res.bins, bins)
+
+        # values that land on a bin edge are binned as numpy does
+        rs = numpy.random.RandomState(3)
+        for lo, hi, numbins in ((251, 32767, 100), (-7, 1000, 256),
+                                (0, 65535, 2048), (13, 20, 37)):
+            data = rs.randint(lo, hi + 1, size=(300, 400)).astype(numpy.int32)
+            data[0, :2] = lo, hi
+            res = autocuts.calc_histogram(data, pct=0.99, numbins=numbins)
+            dist, bins = numpy.histogram(data, bins=numbins)
+            assert numpy.all(res.dist == dist), \
+                   "Histogram of %d..%d differs from numpy" % (lo, hi)
+
+    def test_nonfinite_histogram(self):
+        autocuts = AutoCuts.Histogram(self.logger)
+        data = self.data.copy()
+        data[::7, ::3] = numpy.nan
+        data[100, 100] = numpy.inf
+        data[200, 200] = -numpy.inf
+        finite = data[numpy.isfinite(data)]
+        res = autocuts.calc_histogram(data, pct=0.99, numbins=256)
+        dist, bins = numpy.histogram(finite, bins=256)
+        assert numpy.all(res.dist == dist)
+        assert numpy.allclose(res.bins, bins)
+        # the data is left alone
+        assert numpy.isnan(data[0, 0]) and numpy.isinf(data[100, 100])
+
+        # all-NaN data gives no warnings
+        data[:] = numpy.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            res = autocuts.calc_histogram(data, pct=0.99, numbins=256)
+        assert res.dist.sum() == 0
+
+
+#END
@@ -0,0 +1,55 @@
+#
+# Unit Tests for the BaseImage class
+#
+import unittest
+import logging
+import numpy
+
+from ginga.BaseImage import BaseImage
+
+
+class TestBaseImage(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("TestBaseImage")
+        self.data = numpy.arange(1024 * 1024,
+                                 dtype=numpy.float32).reshape(1024, 1024)
+        self.image = BaseImage(data_np=self.data, logger=self.logger)
+
+    def test_pyramid_disabled(self):
+        data, factor = self.image.get_pyramid_level(0.1)
+        assert factor == 1
+        assert data is self.data
+
+    def test_pyramid_level(self):
+        self.image.enable_pyramid(True)
+        data, factor = self.image.get_pyramid_level(0.1)
+        assert factor == 8
+        assert data.shape == (128, 128)
+        assert numpy.all(data == self.data[::8, ::8])
+
+        # no coarser level needed above a scale of 0.5
+        data, factor = self.image.get_pyramid_level(0.6)
+        assert factor == 1
+
+    def test_pyramid_cutout(self):
+        res1 = self.image.get_scaled_cutout(0, 0, 1023, 1023, 0.1, 0.1)
+        self.image.enable_pyramid(True)
+        res2 = self.image.get_scaled_cutout(0, 0, 1023, 1023, 0.1, 0.1)
+        assert res1.data.shape == res2.data.shape
+        assert numpy.isclose(res1.scale_x, res2.scale_x)
+        assert numpy.isclose(res1.scale_y, res2.scale_y)
+
+    def test_pyramid_invalidate(self):
+        self.image.enable_pyramid(True)
+        data, factor = self.image.get_pyramid_level(0.25)
+        assert len(self.image._pyramid) == 2
+
+        self.image.set_data(numpy.zeros((512, 512)))
+        assert len(self.image._pyramid) == 0
+        data, factor = self.image.get_pyramid_level(0.25)
+        assert data.shape == (128, 128)
+        assert numpy.all(data == 0)
+
+
+#END
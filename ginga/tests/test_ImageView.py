@@ -1,8 +1,11 @@
 import unittest
 import logging
+import time
+import gc
+import threading
 import numpy
 
-from ginga import AstroImage
+from ginga import AstroImage, ColorDist
 from ginga.mockw.ImageViewCanvasMock import ImageViewCanvas
 
 class TestError(Exception):
@@ -57,6 +60,652 @@ class TestImageView(unittest.TestCase):
         ## print (dst_x, dst_y)
         
         
+    def test_pan_redraw(self):
+        viewer = self.viewer
+        viewer.set_window_size(300, 200)
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        viewer.set_image(image)
+        viewer.scale_to(1.0, 1.0)
+        viewer.get_rgb_object(whence=0)
+
+        # a pan-only redraw should shift the cached pixels and fill in
+        # the exposed areas to give the same result as a full redraw
+        for pan_x, pan_y in ((260, 240), (190, 310), (350, 150)):
+            viewer.set_pan(pan_x, pan_y)
+            arr1 = numpy.copy(viewer.get_rgb_object(whence=0.5).get_array('RGB'))
+            arr2 = viewer.get_rgb_object(whence=0).get_array('RGB')
+            assert numpy.all(arr1 == arr2), \
+                   TestError("Pan redraw differs from full redraw at %d,%d" % (
+                pan_x, pan_y))
+
+        # also where the cutout is clipped at the edges of the image,
+        # for an image smaller than the window, and when zoomed
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(300, 300))
+        viewer.set_image(image)
+        viewer.set_window_size(400, 300)
+        for scale in (1.0, 1.7, 0.37):
+            viewer.scale_to(scale, scale)
+            viewer.set_pan(293, 283)
+            viewer.get_rgb_object(whence=0)
+            for pan_x, pan_y in ((150, 150), (120, 140), (5, 290), (-20, 8)):
+                viewer.set_pan(pan_x, pan_y)
+                arr1 = numpy.copy(viewer.get_rgb_object(whence=0.5).get_array('RGB'))
+                arr2 = viewer.get_rgb_object(whence=0).get_array('RGB')
+                assert numpy.all(arr1 == arr2), \
+                       TestError("Pan redraw differs from full redraw at "
+                                 "%d,%d scale %.2f" % (pan_x, pan_y, scale))
+
+    def test_lut_redraw(self):
+        viewer = self.viewer
+        viewer.set_window_size(300, 200)
+        image = AstroImage.AstroImage(logger=self.logger)
+        data = numpy.random.randint(-500, 3000, size=(500, 600))
+        image.set_data(data.astype('>i2'))
+        viewer.set_image(image)
+        viewer.set_color_algorithm('log')
+        viewer.cut_levels(-20, 2000)
+        canvas_img = viewer.get_canvas_image()
+
+        # mapping integer data through the lookup table should give
+        # the same result as mapping it step by step
+        arr1 = numpy.copy(viewer.get_rgb_object(whence=0).get_array('RGB'))
+        assert canvas_img.get_cache(viewer).lut is not None, \
+               TestError("Lookup table was not used for 16-bit data")
+        canvas_img.use_lut = False
+        arr2 = viewer.get_rgb_object(whence=0).get_array('RGB')
+        assert numpy.all(arr1 == arr2), \
+               TestError("Lookup table result differs from normal mapping")
+
+    def test_backing_size(self):
+        viewer = self.viewer
+        viewer.set_window_size(900, 500)
+        viewer.set_image(self.image)
+
+        # without rotation the backing image only needs to cover the window
+        ht, wd = viewer.get_rgb_object(whence=0).get_size()
+        assert (900 <= wd < 950) and (500 <= ht < 550), \
+               TestError("Unexpected backing image size %dx%d" % (wd, ht))
+
+        viewer.transform(False, False, True)
+        ht, wd = viewer.get_rgb_object(whence=0).get_size()
+        assert (900 <= wd < 950) and (500 <= ht < 550), \
+               TestError("Unexpected swapped backing image size %dx%d" % (
+            wd, ht))
+
+        # with rotation it must have room to rotate the window
+        viewer.rotate(30.0)
+        ht, wd = viewer.get_rgb_object(whence=0).get_size()
+        assert (wd == ht) and (wd >= 1029), \
+               TestError("Unexpected rotated backing image size %dx%d" % (
+            wd, ht))
+
+    def test_render_stats(self):
+        viewer = self.viewer
+        viewer.configure_window(300, 200)
+        viewer.set_image(self.image)
+        viewer.reset_render_stats()
+        for i in range(3):
+            viewer.redraw_now(whence=0)
+
+        stats = viewer.get_render_stats(percentiles=(50, 95))
+        for stage in ('cutout', 'cuts', 'colormap', 'overlay', 'total'):
+            assert stats[stage]['count'] == 3, \
+                   TestError("Stage '%s' was not timed" % (stage))
+        assert 'rotate' not in stats, \
+               TestError("Rotate stage timed without rotation")
+        d = stats['total']
+        assert 0.0 <= d['p50'] <= d['p95'] <= d['max'], \
+               TestError("Inconsistent percentiles for total time")
+
+        # each thread sums the stages of its own frame
+        render_stats = viewer.render_stats
+        render_stats.reset()
+        render_stats.start_frame()
+        render_stats.record('cuts', 1.0)
+
+        def _other_frame():
+            render_stats.start_frame()
+            render_stats.record('cuts', 2.0)
+            render_stats.end_frame()
+        thread = threading.Thread(target=_other_frame)
+        thread.start()
+        thread.join()
+        render_stats.record('cuts', 3.0)
+        render_stats.end_frame()
+        samples = sorted(render_stats.samples['cuts'])
+        assert samples == [2.0, 4.0], \
+               TestError("Frames of different threads were merged")
+
+    def test_redraw_coalesce(self):
+        viewer = self.viewer
+        viewer.configure_window(300, 200)
+        viewer.set_image(self.image)
+        viewer.set_redraw_rate(30.0)
+        # first drawing of the image requests another redraw
+        viewer.delayed_redraw()
+        viewer.delayed_redraw()
+        viewer.reset_redraw_stats()
+
+        # a burst of changes right after a redraw is merged into one redraw
+        viewer.time_last_redraw = time.time()
+        viewer.set_color_map('rainbow3')
+        viewer.cut_levels(0.0, 0.5)
+        viewer.set_pan(900, 1000)
+        viewer.delayed_redraw()
+        # a scheduled redraw with nothing left to do is dropped
+        viewer.delayed_redraw()
+        stats = viewer.get_redraw_stats()
+        assert stats['frames'] == 1, \
+               TestError("Expected one redraw, got %d" % (stats['frames']))
+        assert stats['coalesced'] == stats['requests'] - 1 >= 2, \
+               TestError("Redraw requests were not coalesced")
+        assert stats['dropped'] == 1, \
+               TestError("Expected one dropped redraw")
+
+        # the lag adapts to the cost of recent redraws
+        viewer._frame_cost = 0.005
+        lagtime = viewer.get_redraw_stats()['lagtime']
+        assert abs(lagtime - (1 / 30.0 - 0.005)) < 1e-9
+        viewer._frame_cost = 0.2
+        assert viewer.get_redraw_stats()['lagtime'] == 0.1
+        viewer.set_redraw_rate(30.0, adaptive=False)
+        assert viewer.get_redraw_stats()['lagtime'] == viewer.defer_lagtime
+
+    def test_progressive_redraw(self):
+        viewer = self.viewer
+        viewer.configure_window(300, 200)
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        viewer.set_image(image)
+        viewer.get_settings().set(interpolation='linear',
+                                  progressive_redraw=True,
+                                  progressive_subsample=2)
+        canvas_img = viewer.get_canvas_image()
+
+        # while interacting, redraws are cheap drafts
+        viewer.start_interaction()
+        viewer.redraw_now(whence=0)
+        cache = canvas_img.get_cache(viewer)
+        assert (cache.interp == 'basic') and (cache.subsample == 2), \
+               TestError("Redraw during interaction was not a draft")
+        arr1 = numpy.copy(viewer.get_rgb_object(whence=3).get_array('RGB'))
+
+        # once idle, the view is redrawn at full quality
+        viewer.end_interaction()
+        viewer._time_interaction -= 1.0
+        viewer.delayed_redraw()
+        assert (cache.interp == 'linear') and (cache.subsample == 1), \
+               TestError("View was not redrawn at full quality")
+        arr2 = viewer.get_rgb_object(whence=3).get_array('RGB')
+        assert arr1.shape == arr2.shape
+        diff = numpy.abs(arr1.astype(float) - arr2.astype(float))
+        assert diff.mean() < 64.0, \
+               TestError("Draft differs too much from the full redraw")
+
+    def test_render_thread(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        viewers = []
+        for i in range(2):
+            viewer = ImageViewPil(logger=self.logger)
+            viewer.configure_surface(300, 200)
+            viewer.set_image(image)
+            viewer.set_pan(220, 180)
+            viewers.append(viewer)
+        v_sync, v_thr = viewers
+        v_sync.redraw_now(whence=0)
+
+        # the image made in the background is only blitted via gui_do
+        calls = []
+        v_thr.enable_render_thread(True,
+                                   gui_do=lambda *args: calls.append(args))
+        try:
+            v_thr.reset_redraw_stats()
+            # the geometry used by the GUI thread is left alone until the
+            # image is handed over
+            v_thr._org_x1 = -1
+            v_thr.redraw_now(whence=0)
+            time_end = time.time() + 10.0
+            while (len(calls) == 0) and (time.time() < time_end):
+                time.sleep(0.01)
+            assert len(calls) == 1, \
+                   TestError("Render thread did not finish an image")
+            assert v_thr.get_redraw_stats()['frames'] == 0
+            assert v_thr._org_x1 == -1, \
+                   TestError("Render thread changed the viewer geometry")
+
+            method, args = calls[0][0], calls[0][1:]
+            method(*args)
+            assert v_thr.get_redraw_stats()['frames'] == 1
+            assert v_thr.get_datarect() == v_sync.get_datarect()
+            arr1 = v_sync.get_image_as_array()
+            arr2 = v_thr.get_image_as_array()
+            assert numpy.all(arr1 == arr2), \
+                   TestError("Background rendering differs from foreground")
+
+        finally:
+            v_thr.enable_render_thread(False)
+
+    def test_render_strips(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+        from ginga.misc import Task
+
+        pool = Task.ThreadPool(3, self.logger)
+        pool.startall(wait=True)
+        try:
+            viewers = []
+            for i in range(2):
+                viewer = ImageViewPil(logger=self.logger)
+                viewer.configure_surface(300, 200)
+                viewers.append(viewer)
+            v_one, v_strips = viewers
+            v_strips.set_render_pool(pool)
+            v_strips.get_settings().set(render_strips=4)
+            assert v_strips.get_render_strips(200) == 4
+            assert v_strips.get_render_strips(50) == 1
+
+            for dtype in (numpy.float32, numpy.uint8):
+                for dist in ('linear', 'histeq'):
+                    data = numpy.random.randint(0, 256, size=(500, 600))
+                    image = AstroImage.AstroImage(logger=self.logger)
+                    image.set_data(data.astype(dtype))
+                    for viewer in viewers:
+                        viewer.set_color_algorithm(dist)
+                        viewer.set_image(image)
+                        viewer.redraw_now(whence=0)
+                    arr1 = v_one.get_image_as_array()
+                    arr2 = v_strips.get_image_as_array()
+                    assert numpy.all(arr1 == arr2), \
+                           TestError("Rendering in strips differs")
+        finally:
+            pool.stopall(wait=True)
+
+    def test_histeq_table(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        viewer = ImageViewPil(logger=self.logger)
+        viewer.configure_surface(300, 200)
+        data = numpy.random.RandomState(3).randint(0, 1000, size=(800, 900))
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(data.astype(numpy.float32))
+        viewer.set_color_algorithm('histeq', whole_image=True,
+                                   sample_size=10000)
+        viewer.set_image(image)
+        viewer.redraw_now(whence=0)
+        dist = viewer.get_rgbmap().get_dist()
+        table, key = dist.hash, dist.get_hash_key()
+        assert key is not None, TestError("Equalization table not kept")
+
+        # the table from the whole image is kept while panning
+        viewer.set_pan(100, 100)
+        viewer.redraw_now(whence=0)
+        assert dist.hash is table, \
+               TestError("Equalization table recalculated on pan")
+
+        # ... until the data changes
+        image.set_data(data.astype(numpy.float32) ** 2)
+        viewer.redraw_now(whence=0)
+        assert dist.get_hash_key() != key, \
+               TestError("Equalization table not recalculated")
+
+        # other users of the RGB mapper (e.g. a pan viewer) equalize
+        # their own data, and leave the kept table alone
+        rgbmap = viewer.get_rgbmap()
+        table = dist.hash
+        other = numpy.arange(20000).reshape(-1, 200) // 7
+        fresh = ColorDist.HistogramEqualizationDist(dist.get_hash_size())
+        fresh.calc_hash_from(other)
+        assert numpy.all(rgbmap.get_hasharray(other) == fresh.hash[other]), \
+               TestError("Kept equalization table used for other data")
+        assert dist.hash is table
+        assert numpy.all(rgbmap.get_hasharray(other, hash_key=dist.hash_key)
+                         == table[other])
+
+        # uniform data is equalized about linearly
+        idx = numpy.arange(dist.get_hash_size()).repeat(4)
+        dist.calc_hash_from(idx)
+        assert dist.hash[0] == 0 and dist.hash[-1] == 255
+        assert numpy.all(numpy.diff(dist.hash.astype(int)) >= 0)
+
+    def test_partial_redraw(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        viewers, circles = [], []
+        for i in range(2):
+            viewer = ImageViewPil(logger=self.logger)
+            viewer.configure_surface(300, 200)
+            viewer.set_image(image)
+            viewer.set_pan(220, 180)
+            viewer.redraw_now(whence=0)
+            Circle = viewer.get_canvas().get_draw_class('circle')
+            circles.append(Circle(230, 190, 10, color='yellow'))
+            viewers.append(viewer)
+        v_part, v_full = viewers
+        v_part.reset_redraw_stats()
+
+        def _move(canvas, circle):
+            canvas.mark_dirty(circle)
+            circle.move_to(250, 170)
+            canvas.update_canvas(whence=3)
+
+        # adding, moving and deleting a small object only redraws the
+        # areas it covers, which must give the same result as a full redraw
+        for action in (lambda canvas, circle: canvas.add(circle),
+                       _move,
+                       lambda canvas, circle: canvas.delete_object(circle)):
+            for viewer, circle in zip(viewers, circles):
+                action(viewer.get_canvas(), circle)
+            v_full.redraw_now(whence=0)
+            arr1 = v_part.get_image_as_array()
+            arr2 = v_full.get_image_as_array()
+            assert numpy.all(arr1 == arr2), \
+                   TestError("Partial redraw differs from full redraw")
+
+        stats = v_part.get_redraw_stats()
+        assert stats['partial'] == stats['frames'] == 3, \
+               TestError("Expected three partial redraws")
+
+        # changes that are not marked redraw the whole window
+        v_part.get_canvas().update_canvas(whence=3)
+        assert v_part.get_redraw_stats()['partial'] == 3
+
+        # objects deleted without redrawing are still erased by the
+        # next redraw, as are objects changed without being marked
+        def _delete_add(canvas, circle):
+            Box = canvas.get_draw_class('box')
+            canvas.add(Box(320, 250, 5, 5, color='cyan'), tag='box')
+            canvas.delete_object_by_tag('box', redraw=False)
+            canvas.add(circle)
+
+        def _change_add(canvas, circle):
+            box = canvas.get_object_by_tag('box')
+            box.color = 'red'
+            canvas.add(circle)
+
+        for action in (_delete_add, _change_add):
+            for viewer, circle in zip(viewers, circles):
+                canvas = viewer.get_canvas()
+                if circle in canvas.objects:
+                    canvas.delete_object(circle)
+                if action is _change_add:
+                    Box = canvas.get_draw_class('box')
+                    canvas.add(Box(320, 250, 5, 5, color='cyan'),
+                               tag='box')
+                action(canvas, circle)
+            v_full.redraw_now(whence=0)
+            arr1 = v_part.get_image_as_array()
+            arr2 = v_full.get_image_as_array()
+            assert numpy.all(arr1 == arr2), \
+                   TestError("Redraw after '%s' left stale pixels" % (
+                action.__name__))
+        stats = v_part.get_redraw_stats()
+        assert stats['partial'] > 3, \
+               TestError("Expected deleting and adding to redraw partially")
+
+        # objects crossing the areas are only redrawn inside of them
+        for viewer, circle in zip(viewers, circles):
+            canvas = viewer.get_canvas()
+            canvas.delete_object(circle)
+            Box = canvas.get_draw_class('box')
+            canvas.add(Box(220, 180, 120, 80, color='cyan', fill=True,
+                           fillcolor='cyan',
+                           fillalpha=0.5))
+            canvas.add(circle)
+        v_full.redraw_now(whence=0)
+        assert numpy.all(v_part.get_image_as_array() ==
+                         v_full.get_image_as_array()), \
+               TestError("Partial redraw drew outside of the areas")
+        assert v_part.get_redraw_stats()['partial'] > stats['partial']
+
+    def test_spatial_index(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        pts = numpy.random.RandomState(42).uniform(0, 500, size=(2000, 2))
+        viewers, layers = [], []
+        for i in range(2):
+            viewer = ImageViewPil(logger=self.logger)
+            viewer.configure_surface(300, 200)
+            viewer.set_image(image)
+            viewer.zoom_to(1)
+            viewer.set_pan(220, 180)
+            canvas = viewer.get_canvas()
+            Point = canvas.get_draw_class('point')
+            layer = canvas.get_draw_class('canvas')()
+            canvas.add(layer)
+            for x, y in pts:
+                layer.add(Point(x, y, 3, color='yellow'), redraw=False)
+            viewers.append(viewer)
+            layers.append(layer)
+        layers[0].enable_spatial_index(True)
+
+        def _check_same():
+            for viewer in viewers:
+                viewer.redraw_now(whence=0)
+            arr1, arr2 = [viewer.get_image_as_array() for viewer in viewers]
+            assert numpy.all(arr1 == arr2), \
+                   TestError("Drawing with spatial index differs")
+            for x, y in pts[:50]:
+                res1, res2 = [[layer.objects.index(obj)
+                               for obj in layer.get_items_at(x, y)]
+                              for layer in layers]
+                assert res1 == res2, \
+                       TestError("Items found with spatial index differ")
+
+        _check_same()
+        # only the objects near the window are drawn
+        visible = layers[0]._get_visible_objects(viewers[0])
+        assert 0 < len(visible) < len(pts), \
+               TestError("Expected objects outside the window to be culled")
+
+        # objects moved after marking them stay in the index
+        for layer in layers:
+            obj = layer.objects[0]
+            layer.mark_dirty(obj)
+            obj.move_to(220, 180)
+            layer.update_canvas()
+        assert layers[0].objects[0] in layers[0].get_items_at(220, 180), \
+               TestError("Moved object not found with spatial index")
+        _check_same()
+
+    def test_marker_collection(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(500, 600))
+        pts = numpy.random.RandomState(42).uniform(0, 500, size=(500, 2))
+        colors = ['yellow', 'cyan'] * 250
+        viewers = []
+        for i in range(2):
+            viewer = ImageViewPil(logger=self.logger)
+            viewer.configure_surface(300, 200)
+            viewer.set_image(image)
+            viewer.zoom_to(1)
+            viewer.set_pan(220, 180)
+            viewers.append(viewer)
+
+        # a collection of markers draws the same as an object per marker
+        canvas = viewers[0].get_canvas()
+        Point = canvas.get_draw_class('point')
+        for (x, y), color in zip(pts, colors):
+            canvas.add(Point(x, y, 3, style='cross', color=color),
+                       redraw=False)
+        canvas = viewers[1].get_canvas()
+        MarkerCollection = canvas.get_draw_class('markercollection')
+        markers = MarkerCollection(pts.T[0], pts.T[1], 3, style='cross',
+                                   colors=colors)
+        canvas.add(markers, redraw=False)
+        for viewer in viewers:
+            viewer.redraw_now(whence=0)
+        arr1, arr2 = [viewer.get_image_as_array() for viewer in viewers]
+        assert numpy.all(arr1 == arr2), \
+               TestError("Marker collection differs from separate markers")
+
+        # hit testing finds the markers covering a point
+        x, y = pts[7]
+        idxs = markers.get_indices_at(x + 1, y - 1)
+        assert 7 in idxs, TestError("Marker not found at its position")
+        assert markers.contains(x + 1, y - 1)
+        assert not markers.contains(-10, -10)
+        assert markers in canvas.get_items_at(x, y)
+
+        # filled boxes turn with the view like Box objects do
+        for viewer in viewers:
+            viewer.get_canvas().delete_all_objects(redraw=False)
+            viewer.rotate(30.0)
+        canvas = viewers[0].get_canvas()
+        Box = canvas.get_draw_class('box')
+        for (x, y), color in zip(pts, colors):
+            canvas.add(Box(x, y, 4, 4, color=color, fill=True,
+                           fillcolor=color), redraw=False)
+        viewers[1].get_canvas().add(
+            MarkerCollection(pts.T[0], pts.T[1], 4, style='box',
+                             colors=colors, fill=True), redraw=False)
+        for viewer in viewers:
+            viewer.redraw_now(whence=0)
+        arr1, arr2 = [viewer.get_image_as_array() for viewer in viewers]
+        assert numpy.all(arr1 == arr2), \
+               TestError("Box markers differ from Box objects")
+
+    def test_render_cache(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        viewer = ImageViewPil(logger=self.logger)
+        viewer.configure_surface(300, 200)
+        viewer.set_image(self.image)
+        canvas = viewer.get_canvas()
+        Text = canvas.get_draw_class('text')
+        for i in range(200):
+            canvas.add(Text(i * 7 % 2000, i * 11 % 2000, "star %d" % (i % 10),
+                            color=('yellow', 'cyan')[i % 2], fontsize=12),
+                       redraw=False)
+        viewer.redraw_now(whence=0)
+        arr1 = viewer.get_image_as_array()
+
+        # pens, fonts and extents are made once, then reused
+        cache = viewer.renderer.cache
+        num_items, misses = len(cache), cache.misses
+        assert num_items < 40, \
+               TestError("Too many cached items (%d)" % (num_items))
+        viewer.redraw_now(whence=0)
+        assert cache.misses == misses, \
+               TestError("Cache missed on redraw (%d != %d)" % (
+            cache.misses, misses))
+        arr2 = viewer.get_image_as_array()
+        assert numpy.all(arr1 == arr2), \
+               TestError("Cached drawing differs")
+
+    def test_colorbar_cache(self):
+        from ginga.pilw.ImageViewPil import ImageViewPil
+
+        viewer = ImageViewPil(logger=self.logger)
+        viewer.configure_surface(300, 200)
+        viewer.set_image(self.image)
+        canvas = viewer.get_canvas()
+        ColorBar = canvas.get_draw_class('colorbar')
+        cbar = ColorBar(offset=0, height=20)
+        canvas.add(cbar)
+        viewer.redraw_now(whence=0)
+        layout = cbar.get_layout(viewer, viewer.renderer.setup_cr(cbar),
+                                 viewer.get_rgbmap(), 0, 200, 300, 20,
+                                 *viewer.get_cut_levels(), anchor_bottom=True)
+        arr1 = viewer.get_image_as_array()
+
+        # the layout is reused until the color map changes
+        viewer.redraw_now(whence=0)
+        assert cbar._layout_cache[viewer] is layout, \
+               TestError("Color bar layout was not reused")
+        assert numpy.all(viewer.get_image_as_array() == arr1)
+        assert len(layout.bands) <= 256
+
+        viewer.set_color_map('rainbow3')
+        viewer.redraw_now(whence=0)
+        assert cbar._layout_cache[viewer] is not layout, \
+               TestError("Color bar layout was not recalculated")
+        arr2 = viewer.get_image_as_array()
+        assert not numpy.all(arr2[-10:] == arr1[-10:]), \
+               TestError("Color bar did not change with the color map")
+
+        # or, with histogram equalization, until the data changes
+        viewer.enable_autocuts('off')
+        viewer.set_color_algorithm('histeq')
+        viewer.redraw_now(whence=0)
+        layout = cbar._layout_cache[viewer]
+        viewer.redraw_now(whence=2)
+        assert cbar._layout_cache[viewer] is layout, \
+               TestError("Color bar layout was not reused with histeq")
+        image = AstroImage.AstroImage(logger=self.logger)
+        image.set_data(numpy.random.rand(2000, 2000))
+        viewer.set_image(image)
+        viewer.redraw_now(whence=0)
+        assert cbar._layout_cache[viewer] is not layout, \
+               TestError("Color bar layout was not recalculated for new data")
+
+        # the cache does not keep its viewers alive
+        class Viewer(object):
+            pass
+        other = Viewer()
+        cbar.get_layout(other, viewer.renderer.setup_cr(cbar),
+                        viewer.get_rgbmap(), 0, 200, 300, 20,
+                        *viewer.get_cut_levels(), anchor_bottom=True)
+        assert other in cbar._layout_cache
+        other = None
+        gc.collect()
+        assert list(cbar._layout_cache.keys()) == [viewer], \
+               TestError("Color bar layout cache kept a viewer alive")
+
+    def test_transform_matrix(self):
+        viewer = self.viewer
+        viewer.set_window_size(900, 1100)
+        viewer.set_image(self.image)
+        data_x, data_y = numpy.random.RandomState(7).uniform(
+            -100, 2100, size=(2, 1000))
+
+        for flip_x, flip_y, swap_xy, rot_deg in ((False, False, False, 0.0),
+                                                 (True, False, True, 0.0),
+                                                 (False, True, False, 30.0),
+                                                 (True, True, True, 275.0)):
+            viewer.transform(flip_x, flip_y, swap_xy)
+            viewer.rotate(rot_deg)
+            viewer.scale_to(1.7, 0.6)
+            viewer.set_pan(812.3, 1250.8)
+
+            # whole arrays map as the point by point conversions do
+            off_x, off_y = viewer.data_to_offset(data_x, data_y)
+            win_x, win_y = viewer.offset_to_window(off_x, off_y)
+            cx, cy = viewer.get_canvas_xy(data_x, data_y)
+            if rot_deg == 0.0:
+                assert numpy.all(cx == win_x) and numpy.all(cy == win_y), \
+                       TestError("Matrix transform differs from step by step")
+            else:
+                # allow for rounding at the pixel edges
+                assert (numpy.all(numpy.abs(cx - win_x) <= 1) and
+                        numpy.all(numpy.abs(cy - win_y) <= 1)), \
+                       TestError("Matrix transform differs from step by step")
+            cx1, cy1 = viewer.get_canvas_xy(data_x[5], data_y[5])
+            assert (cx1, cy1) == (cx[5], cy[5])
+
+            # and back again
+            off_x, off_y = viewer.window_to_offset(cx, cy)
+            x1, y1 = viewer.offset_to_data(off_x, off_y)
+            x2, y2 = viewer.get_data_xy(cx, cy)
+            assert (numpy.allclose(x1, x2) and numpy.allclose(y1, y2)), \
+                   TestError("Matrix inverse differs from step by step")
+
+        # input arrays are not modified
+        data_x0 = data_x.copy()
+        viewer.data_to_offset(data_x, data_y)
+        viewer.get_canvas_xy(data_x, data_y)
+        assert numpy.all(data_x == data_x0), \
+               TestError("Conversion modified its input")
+
     def tearDown(self):
         pass
 
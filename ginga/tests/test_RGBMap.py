@@ -0,0 +1,46 @@
+#
+# Unit Tests for the RGBMap.py functions
+#
+import unittest
+import logging
+import numpy
+
+from ginga import RGBMap, cmap, imap
+
+
+class TestRGBMapper(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("TestRGBMapper")
+        self.rgbmap = RGBMap.RGBMapper(self.logger)
+        self.rgbmap.set_cmap(cmap.get_cmap('rainbow3'))
+        self.rgbmap.set_imap(imap.get_imap('ramp'))
+        self.idx = numpy.random.randint(0, 65536, size=(50, 60))
+
+    def _expected(self):
+        rgbmap = self.rgbmap
+        idx = rgbmap.get_hasharray(self.idx).clip(0, 255)
+        idx = rgbmap.get_sarr()[idx].clip(0, 255)
+        return numpy.dstack([rgbmap.arr[i][idx] for i in range(3)])
+
+    def test_get_rgbarray(self):
+        expected = self._expected()
+        for order in ('RGB', 'BGR', 'RGBA', 'BGRA', 'ARGB'):
+            res = self.rgbmap.get_rgbarray(self.idx.astype(numpy.uint),
+                                           order=order)
+            assert numpy.all(res.get_array('RGB') == expected)
+            if 'A' in order:
+                assert numpy.all(res.get_slice('A') == 255)
+
+    def test_lut_recalc(self):
+        # the lookup table must follow changes to the shift array
+        # and color map
+        self.rgbmap.scale_and_shift(0.6, 0.1)
+        self.rgbmap.invert_cmap()
+        expected = self._expected()
+        res = self.rgbmap.get_rgbarray(self.idx.astype(numpy.uint),
+                                       order='BGRA')
+        assert numpy.all(res.get_array('RGB') == expected)
+
+
+#END
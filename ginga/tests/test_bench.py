@@ -0,0 +1,30 @@
+#
+# Unit Tests for the headless rendering benchmarks
+#
+import unittest
+
+from ginga.util import bench
+
+
+class TestBench(unittest.TestCase):
+
+    def test_run_benchmarks(self):
+        res = bench.run_benchmarks(viewers=('mock', 'pil'), sizes=(64,),
+                                   types=('float32', 'int16'),
+                                   window=(40, 30), repeat=2)
+        results = res['results']
+        assert len(results) == 2 * 2 * len(bench.operation_names)
+        for d in results:
+            assert d['count'] == 2
+            assert 0.0 <= d['p50_ms'] <= d['max_ms']
+        ops = [d['operation'] for d in results
+               if (d['viewer'] == 'mock') and (d['dtype'] == 'int16')]
+        assert ops == bench.operation_names
+
+        # a run compared with itself has a ratio of one
+        ratios = [ratio for d, ratio in bench.compare(res, res)]
+        assert len(ratios) > 0
+        assert all([ratio == 1.0 for ratio in ratios])
+
+
+#END
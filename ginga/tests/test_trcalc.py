@@ -0,0 +1,127 @@
+#
+# Unit Tests for the trcalc functions
+#
+import unittest
+import numpy
+
+from ginga import trcalc
+
+
+class TestTrcalc(unittest.TestCase):
+
+    def setUp(self):
+        self.data = numpy.arange(64, dtype=numpy.float64).reshape(8, 8)
+
+    def test_resize_area(self):
+        newdata = trcalc.resize_interp(self.data, 4, 4, interpolation='area')
+        expected = self.data.reshape(4, 2, 4, 2).mean(axis=3).mean(axis=1)
+        assert numpy.allclose(newdata, expected)
+
+    def test_resize_area_nan(self):
+        data = self.data.copy()
+        data[0, 0] = numpy.nan
+        data[4:6, 6:8] = numpy.nan
+        newdata = trcalc.resize_interp(data, 4, 4, interpolation='area')
+        expected = self.data.reshape(4, 2, 4, 2).mean(axis=3).mean(axis=1)
+        # NaNs are left out of the averages, and only blocks without any
+        # other values are NaN
+        expected[0, 0] = (1.0 + 8.0 + 9.0) / 3.0
+        expected[2, 3] = numpy.nan
+        assert numpy.allclose(newdata, expected, equal_nan=True)
+
+    def test_resize_linear(self):
+        newdata = trcalc.resize_interp(self.data, 16, 16,
+                                       interpolation='linear')
+        assert newdata.shape == (16, 16)
+        # a linear ramp is reproduced exactly away from the edges
+        assert numpy.isclose(newdata[4, 4], 15.75)
+        assert numpy.isclose(newdata[5, 5], 20.25)
+
+    def test_resize_bicubic(self):
+        lin = trcalc.resize_interp(self.data, 16, 16, interpolation='linear')
+        cub = trcalc.resize_interp(self.data, 16, 16, interpolation='bicubic')
+        assert numpy.allclose(lin[3:-3, 3:-3], cub[3:-3, 3:-3])
+
+    def test_resize_rgb(self):
+        data = numpy.full((5, 7, 3), 200, dtype=numpy.uint8)
+        for method in ('linear', 'area', 'bicubic'):
+            newdata = trcalc.resize_interp(data, 11, 2, interpolation=method)
+            assert newdata.shape == (2, 11, 3)
+            assert newdata.dtype == numpy.uint8
+            assert numpy.all(newdata == 200)
+
+    def test_scaled_cutout(self):
+        for method in ('linear', 'area', 'bicubic'):
+            newdata, (scale_x, scale_y) = trcalc.get_scaled_cutout_basic(
+                self.data, 0, 0, 7, 7, 0.5, 0.5, interpolation=method)
+            assert newdata.shape == (4, 4)
+            assert scale_x == scale_y == 0.5
+
+            newdata, (scale_x, scale_y) = trcalc.get_scaled_cutout_wdht(
+                self.data, 2, 2, 5, 5, 8, 8, interpolation=method)
+            assert newdata.shape == (8, 8)
+            assert scale_x == scale_y == 2.0
+
+    def test_rotate_clip_rot90(self):
+        data = numpy.arange(81, dtype=numpy.uint8).reshape(9, 9)
+        for theta in (90.0, 180.0, 270.0, -90.0):
+            newdata = trcalc.rotate_clip(data, theta)
+            # same result as the general index calculation
+            idx = trcalc.get_rotate_index(9, 9, theta, 4, 4)
+            assert numpy.all(newdata == data.ravel()[idx])
+
+    def test_rotate_index_cache(self):
+        # indexes are only kept when they are asked for again
+        idx1 = trcalc.get_rotate_index(20, 30, 33.0, 15, 10)
+        idx2 = trcalc.get_rotate_index(20, 30, 33.0, 15, 10)
+        idx3 = trcalc.get_rotate_index(20, 30, 33.0, 15, 10)
+        assert (idx1 is not idx2) and (idx2 is idx3)
+        assert numpy.all(idx1 == idx2)
+
+        # up to the size limit
+        save_bytes = trcalc.rotate_cache_bytes
+        try:
+            trcalc.rotate_cache_bytes = 3 * idx1.nbytes
+            for theta in range(5):
+                for i in range(2):
+                    trcalc.get_rotate_index(20, 30, float(theta), 15, 10)
+            assert len(trcalc._rotate_cache) == 3
+        finally:
+            trcalc.rotate_cache_bytes = save_bytes
+
+        # the index is into the array flattened to two dimensions
+        if not trcalc.have_opencv:
+            data = numpy.random.rand(20, 30, 3)[:, ::-1]
+            newdata = trcalc.rotate_clip(data, 33.0, 15, 10,
+                                         use_opencl=False)
+            assert numpy.all(newdata ==
+                             numpy.ascontiguousarray(data).reshape(600, 3)[idx3])
+
+    def test_overlay_image(self):
+        dst = numpy.random.randint(0, 256, size=(20, 30, 4)).astype(numpy.uint8)
+        src = numpy.random.randint(0, 256, size=(10, 12, 4)).astype(numpy.uint8)
+
+        # opaque source is copied exactly
+        res = trcalc.overlay_image(numpy.copy(dst), 3, 4, src[..., 0:3],
+                                   dst_order='RGBA', src_order='RGB')
+        assert numpy.all(res[4:14, 3:15, 0:3] == src[..., 0:3])
+        assert numpy.all(res[4:14, 3:15, 3] == 255)
+        assert numpy.all(res[0:4] == dst[0:4])
+
+        # partial alpha blends to within one level
+        res = trcalc.overlay_image(numpy.copy(dst), 3, 4, src[..., 0:3],
+                                   dst_order='RGBA', src_order='RGB',
+                                   alpha=0.3)
+        expected = 0.3 * src[..., 0:3] + 0.7 * dst[4:14, 3:15, 0:3]
+        assert numpy.abs(res[4:14, 3:15, 0:3] - expected).max() <= 1.0
+
+        # per-pixel alpha from the source
+        res = trcalc.overlay_image(numpy.copy(dst), 3, 4, src,
+                                   dst_order='RGBA', src_order='RGBA')
+        alpha = src[..., 3:4] / 255.0
+        expected = (alpha * src[..., 0:3] +
+                    (1.0 - alpha) * dst[4:14, 3:15, 0:3])
+        assert numpy.abs(res[4:14, 3:15, 0:3] - expected).max() <= 1.0
+
+
+#END
@@ -7,8 +7,10 @@
 import math
 import numpy
 import time
+import threading
+from collections import OrderedDict
 
-interpolation_methods = ['basic']
+interpolation_methods = ['area', 'basic', 'bicubic', 'linear']
 def use(pkgname):
     global have_opencv, cv2, cv2_resize
     global have_opencl, trcalc_cl
@@ -24,7 +26,8 @@ def use(pkgname):
             'lanczos': cv2.INTER_LANCZOS4,
             }
         if not 'nearest' in interpolation_methods:
-            interpolation_methods.extend(cv2_resize.keys())
+            interpolation_methods.extend([name for name in cv2_resize.keys()
+                                          if name not in interpolation_methods])
             interpolation_methods.sort()
 
     elif pkgname == 'opencl':
@@ -77,6 +80,14 @@ except ImportError:
 #have_opencv = False
 #have_opencl = False
 
+# cache of index arrays for rotate_clip(), keyed by (shape, angle, center),
+# holding at most this many bytes of indexes
+rotate_cache_bytes = 128 * 1024 ** 2
+_rotate_cache = OrderedDict()
+# keys of indexes computed recently, which are cached when asked for again
+_rotate_seen = OrderedDict()
+_rotate_lock = threading.RLock()
+
 def get_center(data_np):
     ht, wd = data_np.shape[:2]
 
@@ -163,37 +174,28 @@ def rotate_clip(data_np, theta_deg, rotctr_x=None, rotctr_y=None,
                                             rotctr_x, rotctr_y,
                                             out=out)
 
+    elif _can_rot90(data_np, theta_deg, rotctr_x, rotctr_y):
+        # multiples of 90 deg around the exact center need no indexes
+        if logger is not None:
+            logger.debug("rotating with rot90")
+        k = int(round(theta_deg / 90.0)) % 4
+        newdata = numpy.rot90(data_np, k)
+        if out is not None:
+            out[:, :, ...] = newdata
+            newdata = out
+
     else:
         if logger is not None:
             logger.debug("rotating with numpy")
-        yi, xi = numpy.mgrid[0:ht, 0:wd]
-        xi -= rotctr_x
-        yi -= rotctr_y
-        cos_t = numpy.cos(numpy.radians(theta_deg))
-        sin_t = numpy.sin(numpy.radians(theta_deg))
-
-        if have_numexpr:
-            ap = ne.evaluate("(xi * cos_t) - (yi * sin_t) + rotctr_x")
-            bp = ne.evaluate("(xi * sin_t) + (yi * cos_t) + rotctr_y")
-        else:
-            ap = (xi * cos_t) - (yi * sin_t) + rotctr_x
-            bp = (xi * sin_t) + (yi * cos_t) + rotctr_y
-
-        #ap = numpy.rint(ap).astype('int').clip(0, wd-1)
-        #bp = numpy.rint(bp).astype('int').clip(0, ht-1)
-        # Optomizations to reuse existing intermediate arrays
-        numpy.rint(ap, out=ap)
-        ap = ap.astype('int')
-        ap.clip(0, wd-1, out=ap)
-        numpy.rint(bp, out=bp)
-        bp = bp.astype('int')
-        bp.clip(0, ht-1, out=bp)
+        idx = get_rotate_index(ht, wd, theta_deg, rotctr_x, rotctr_y)
+        # (copies the data if it is not contiguous)
+        flat = data_np.reshape((ht * wd,) + data_np.shape[2:])
 
         if out is not None:
-            out[:, :, ...] = data_np[bp, ap]
+            out[:, :, ...] = flat[idx]
             newdata = out
         else:
-            newdata = data_np[bp, ap]
+            newdata = flat[idx]
             new_ht, new_wd = newdata.shape[:2]
 
             assert (wd == new_wd) and (ht == new_ht), \
@@ -203,6 +205,79 @@ def rotate_clip(data_np, theta_deg, rotctr_x=None, rotctr_y=None,
     return newdata
 
 
+def _can_rot90(data_np, theta_deg, rotctr_x, rotctr_y):
+    # rotate_clip() by a multiple of 90 deg is the same as numpy.rot90()
+    # if the center is the exact middle of an odd sized array (and the
+    # array is square, unless the angle is 180 deg)
+    if math.fmod(theta_deg, 90.0) != 0.0:
+        return False
+    ht, wd = data_np.shape[:2]
+    if ((wd % 2 == 0) or (ht % 2 == 0) or (rotctr_x != wd // 2) or
+        (rotctr_y != ht // 2)):
+        return False
+    return (wd == ht) or (math.fmod(theta_deg, 180.0) == 0.0)
+
+
+def get_rotate_index(ht, wd, theta_deg, rotctr_x, rotctr_y):
+    """
+    Return the index array needed to rotate an array of shape (`ht`, `wd`)
+    by `theta_deg` around (`rotctr_x`, `rotctr_y`), as used by
+    rotate_clip().  It indexes the array flattened to its first two
+    dimensions.  Indexes asked for more than once are cached, up to
+    `rotate_cache_bytes`, so that redrawing a rotated view of the same
+    size only costs the gather.
+    """
+    key = (ht, wd, theta_deg, rotctr_x, rotctr_y)
+    with _rotate_lock:
+        try:
+            idx = _rotate_cache.pop(key)
+            _rotate_cache[key] = idx
+            return idx
+        except KeyError:
+            pass
+
+    yi, xi = numpy.mgrid[0:ht, 0:wd]
+    xi -= rotctr_x
+    yi -= rotctr_y
+    cos_t = numpy.cos(numpy.radians(theta_deg))
+    sin_t = numpy.sin(numpy.radians(theta_deg))
+
+    if have_numexpr:
+        ap = ne.evaluate("(xi * cos_t) - (yi * sin_t) + rotctr_x")
+        bp = ne.evaluate("(xi * sin_t) + (yi * cos_t) + rotctr_y")
+    else:
+        ap = (xi * cos_t) - (yi * sin_t) + rotctr_x
+        bp = (xi * sin_t) + (yi * cos_t) + rotctr_y
+
+    #ap = numpy.rint(ap).astype('int').clip(0, wd-1)
+    #bp = numpy.rint(bp).astype('int').clip(0, ht-1)
+    # Optomizations to reuse existing intermediate arrays
+    numpy.rint(ap, out=ap)
+    ap = ap.astype(numpy.intp)
+    ap.clip(0, wd-1, out=ap)
+    numpy.rint(bp, out=bp)
+    bp.clip(0, ht-1, out=bp)
+    # flat index of (bp, ap)
+    idx = ap
+    idx += (bp * wd).astype(numpy.intp)
+
+    with _rotate_lock:
+        if key not in _rotate_seen:
+            # (e.g. while rotating continuously each angle is only
+            # used once, so there is no point in keeping it)
+            _rotate_seen[key] = True
+            while len(_rotate_seen) > 16:
+                _rotate_seen.popitem(last=False)
+
+        elif idx.nbytes <= rotate_cache_bytes:
+            _rotate_cache[key] = idx
+            nbytes = sum([arr.nbytes for arr in _rotate_cache.values()])
+            while nbytes > rotate_cache_bytes:
+                _, arr = _rotate_cache.popitem(last=False)
+                nbytes -= arr.nbytes
+    return idx
+
+
 def rotate(data_np, theta_deg, rotctr_x=None, rotctr_y=None, pad=20,
            use_opencl=True, logger=None):
 
@@ -249,6 +324,139 @@ def rotate(data_np, theta_deg, rotctr_x=None, rotctr_y=None, pad=20,
     return newdata
 
 
+def _resample_axis(data_np, new_len, axis, interpolation):
+    """Resample `data_np` to length `new_len` along `axis`."""
+    old_len = data_np.shape[axis]
+    scale = float(old_len) / float(new_len)
+    # shape for broadcasting per-sample weights along the axis
+    wshp = [1] * data_np.ndim
+    wshp[axis] = new_len
+
+    if (interpolation == 'area') and (new_len < old_len):
+        # average over the area covered by each new pixel, using the
+        # running sum to get the integral at fractional pixel boundaries
+        csum = numpy.cumsum(data_np, axis=axis, dtype=numpy.float64)
+        zshp = list(data_np.shape)
+        zshp[axis] = 1
+        csum = numpy.concatenate((numpy.zeros(zshp), csum), axis=axis)
+
+        edges = numpy.arange(new_len + 1) * scale
+        i0 = numpy.floor(edges).astype(numpy.int_).clip(0, old_len - 1)
+        frac = (edges - i0).reshape([new_len + 1 if i == axis else n
+                                     for i, n in enumerate(wshp)])
+        total = (numpy.take(csum, i0, axis=axis) +
+                 numpy.take(data_np, i0, axis=axis) * frac)
+        lo = [slice(None)] * data_np.ndim
+        hi = [slice(None)] * data_np.ndim
+        lo[axis], hi[axis] = slice(0, -1), slice(1, None)
+        return (total[tuple(hi)] - total[tuple(lo)]) / scale
+
+    # source positions of the centers of the new pixels
+    pos = (numpy.arange(new_len) + 0.5) * scale - 0.5
+    i0 = numpy.floor(pos).astype(numpy.int_)
+    t = pos - i0
+
+    if interpolation == 'bicubic':
+        # cubic convolution kernel (a = -0.5)
+        a = -0.5
+        offsets = (-1, 0, 1, 2)
+        dists = (1.0 + t, t, 1.0 - t, 2.0 - t)
+        weights = []
+        for d in dists:
+            d2, d3 = d * d, d * d * d
+            w = numpy.where(d <= 1.0, (a + 2.0) * d3 - (a + 3.0) * d2 + 1.0,
+                            a * d3 - 5.0 * a * d2 + 8.0 * a * d - 4.0 * a)
+            weights.append(w)
+    else:
+        # linear, and area when enlarging
+        offsets = (0, 1)
+        weights = (1.0 - t, t)
+
+    res = numpy.zeros(data_np.shape[:axis] + (new_len,) +
+                      data_np.shape[axis+1:], dtype=numpy.float64)
+    for off, w in zip(offsets, weights):
+        idx = (i0 + off).clip(0, old_len - 1)
+        res += numpy.take(data_np, idx, axis=axis) * w.reshape(wshp)
+    return res
+
+
+def _resample(data_np, new_wd, new_ht, interpolation):
+    newdata = data_np
+    ht, wd = data_np.shape[:2]
+    if new_ht != ht:
+        newdata = _resample_axis(newdata, new_ht, 0, interpolation)
+    if new_wd != wd:
+        newdata = _resample_axis(newdata, new_wd, 1, interpolation)
+    return newdata
+
+
+def resize_interp(data_np, new_wd, new_ht, interpolation='linear'):
+    """Resample 2D (or 2D + depth) array `data_np` to dimensions
+    (`new_wd`, `new_ht`) using only numpy.
+
+    `interpolation` can be 'linear' (bilinear), 'bicubic' or 'area'
+    (averaging over the covered area; same as 'linear' when enlarging).
+    With 'area', NaN and Inf values are left out of the averages.
+    Integer data is rounded and clipped to the range of its type.
+    """
+    if interpolation not in ('linear', 'area', 'bicubic'):
+        raise ValueError("Interpolation method not supported: '%s'" % (
+            interpolation))
+
+    new_wd, new_ht = max(int(new_wd), 1), max(int(new_ht), 1)
+    ht, wd = data_np.shape[:2]
+    if (ht == 0) or (wd == 0):
+        return data_np
+
+    if (interpolation == 'area') and (data_np.dtype.kind == 'f'):
+        finite = numpy.isfinite(data_np)
+        if not finite.all():
+            # a NaN would spread through the running sums, so average
+            # only the finite values (NaN where there are none)
+            total = _resample(numpy.where(finite, data_np, 0.0),
+                              new_wd, new_ht, interpolation)
+            area = _resample(finite.astype(numpy.float64),
+                             new_wd, new_ht, interpolation)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                newdata = total / area
+            newdata[area <= 1.0e-6] = numpy.nan
+            return newdata.astype(data_np.dtype, copy=False)
+
+    newdata = _resample(data_np, new_wd, new_ht, interpolation)
+    if newdata is data_np:
+        return numpy.copy(data_np)
+
+    dtype = data_np.dtype
+    if issubclass(dtype.type, numpy.integer):
+        info = numpy.iinfo(dtype)
+        newdata = numpy.rint(newdata).clip(info.min, info.max)
+    return newdata.astype(dtype, copy=False)
+
+
+def get_scaled_cutout_wdht_index(x1, y1, x2, y2, new_wd, new_ht):
+    """
+    Get the X and Y indexes of the pixels sampled (by nearest neighbor)
+    for a cutout of dimensions (new_wd, new_ht), as 1D arrays.  These
+    are the indexes used by get_scaled_cutout_wdht_view.
+    """
+    # calculate dimensions of NON-scaled cutout
+    old_wd = x2 - x1 + 1
+    old_ht = y2 - y1 + 1
+
+    if (new_wd != old_wd) or (new_ht != old_ht):
+        iscale_x = float(old_wd) / float(new_wd)
+        iscale_y = float(old_ht) / float(new_ht)
+
+        xi = (x1 + numpy.arange(new_wd) * iscale_x).clip(x1, x2-1).astype('int')
+        yi = (y1 + numpy.arange(new_ht) * iscale_y).clip(y1, y2-1).astype('int')
+
+    else:
+        xi = numpy.arange(x1, x2+1)
+        yi = numpy.arange(y1, y2+1)
+
+    return (xi, yi)
+
+
 def get_scaled_cutout_wdht_view(shp, x1, y1, x2, y2, new_wd, new_ht):
     """
     Like get_scaled_cutout_wdht, but returns the view/slice to extract
@@ -260,14 +468,8 @@ def get_scaled_cutout_wdht_view(shp, x1, y1, x2, y2, new_wd, new_ht):
 
     if (new_wd != old_wd) or (new_ht != old_ht):
         # Make indexes and scale them
-        # Is there a more efficient way to do this?
-        yi = numpy.mgrid[0:new_ht].reshape(-1, 1)
-        xi = numpy.mgrid[0:new_wd].reshape(1, -1)
-        iscale_x = float(old_wd) / float(new_wd)
-        iscale_y = float(old_ht) / float(new_ht)
-
-        xi = (x1 + xi * iscale_x).clip(x1, x2-1).astype('int')
-        yi = (y1 + yi * iscale_y).clip(y1, y2-1).astype('int')
+        xi, yi = get_scaled_cutout_wdht_index(x1, y1, x2, y2, new_wd, new_ht)
+        xi, yi = xi.reshape(1, -1), yi.reshape(-1, 1)
         wd, ht = xi.shape[1], yi.shape[0]
 
         # bounds check against shape (to protect future data access)
@@ -319,6 +521,16 @@ def get_scaled_cutout_wdht(data_np, x1, y1, x2, y2, new_wd, new_ht,
                                                                         x1, y1, x2, y2,
                                                                         scale_x, scale_y)
 
+    elif interpolation in ('linear', 'area', 'bicubic'):
+        if logger is not None:
+            logger.debug("resizing with numpy (%s)" % (interpolation))
+        newdata = resize_interp(data_np[y1:y2+1, x1:x2+1], new_wd, new_ht,
+                                interpolation=interpolation)
+
+        old_wd, old_ht = max(x2 - x1 + 1, 1), max(y2 - y1 + 1, 1)
+        ht, wd = newdata.shape[:2]
+        scale_x, scale_y = float(wd) / old_wd, float(ht) / old_ht
+
     elif interpolation not in ('basic', 'nearest'):
         raise ValueError("Interpolation method not supported: '%s'" % (
             interpolation))
@@ -374,6 +586,18 @@ def get_scaled_cutout_basic(data_np, x1, y1, x2, y2, scale_x, scale_y,
                                                                         x1, y1, x2, y2,
                                                                         scale_x, scale_y)
 
+    elif interpolation in ('linear', 'area', 'bicubic'):
+        if logger is not None:
+            logger.debug("resizing with numpy (%s)" % (interpolation))
+        old_wd, old_ht = max(x2 - x1 + 1, 1), max(y2 - y1 + 1, 1)
+        new_wd = int(round(scale_x * old_wd))
+        new_ht = int(round(scale_y * old_ht))
+        newdata = resize_interp(data_np[y1:y2+1, x1:x2+1], new_wd, new_ht,
+                                interpolation=interpolation)
+
+        ht, wd = newdata.shape[:2]
+        scale_x, scale_y = float(wd) / old_wd, float(ht) / old_ht
+
     elif interpolation not in ('basic', 'nearest'):
         raise ValueError("Interpolation method not supported: '%s'" % (
             interpolation))
@@ -510,12 +734,20 @@ def overlay_image(dstarr, dst_x, dst_y, srcarr, dst_order='RGBA',
     if fill and (da_idx >= 0):
         dstarr[dst_y:dst_y+src_ht, dst_x:dst_x+src_wd, da_idx] = 255
 
+    # alpha is used as a fixed point value in the range 0..256
     if src_dp > 3:
         sa_idx = src_order.index('A')
         # if overlay source contains an alpha channel, extract it
         # and use it, otherwise use scalar keyword parameter
-        alpha = srcarr[0:src_ht, 0:src_wd, sa_idx] / 255.0
-        alpha = numpy.dstack((alpha, alpha, alpha))
+        alpha = srcarr[0:src_ht, 0:src_wd, sa_idx].astype(numpy.uint16)
+        # map 0..255 onto 0..256
+        alpha += alpha >> 7
+        alpha = alpha[..., numpy.newaxis]
+    else:
+        alpha = int(round(min(max(alpha, 0.0), 1.0) * 256))
+        if alpha == 0:
+            # fully transparent--nothing to do
+            return dstarr
 
     # reorder srcarr if necessary to match dstarr for alpha merge
     get_order = dst_order
@@ -524,17 +756,27 @@ def overlay_image(dstarr, dst_x, dst_y, srcarr, dst_order='RGBA',
     if get_order != src_order:
         srcarr = reorder_image(get_order, srcarr, src_order)
 
-    # calculate alpha blending
+    src_rgb = srcarr[0:src_ht, 0:src_wd, 0:3]
+    dst_rgb = dstarr[dst_y:dst_y+src_ht, dst_x:dst_x+src_wd, 0:3]
+
+    if numpy.isscalar(alpha) and (alpha >= 256):
+        # opaque--place our srcarr into this dstarr at dst offsets
+        dst_rgb[...] = src_rgb
+        return dstarr
+
+    # calculate alpha blending in 16-bit fixed point
     #   Co = CaAa + CbAb(1 - Aa)
-    a_arr = (alpha * srcarr[0:src_ht, 0:src_wd, 0:3]).astype(numpy.uint8)
-    b_arr = ((1.0 - alpha) * dstarr[dst_y:dst_y+src_ht,
-                                    dst_x:dst_x+src_wd,
-                                    0:3]).astype(numpy.uint8)
-
-    # Place our srcarr into this dstarr at dst offsets
-    #dstarr[dst_y:dst_y+src_ht, dst_x:dst_x+src_wd, 0:3] += addarr[0:src_ht, 0:src_wd, 0:3]
-    dstarr[dst_y:dst_y+src_ht, dst_x:dst_x+src_wd, 0:3] = \
-             a_arr[0:src_ht, 0:src_wd, 0:3] + b_arr[0:src_ht, 0:src_wd, 0:3]
+    # (255 * 256 + 128 still fits in a uint16)
+    res = src_rgb.astype(numpy.uint16)
+    res *= alpha
+    b_arr = dst_rgb.astype(numpy.uint16)
+    b_arr *= (256 - alpha)
+    res += b_arr
+    res += 128
+    res >>= 8
+
+    # Place the blended result into this dstarr at dst offsets
+    dst_rgb[...] = res
 
     return dstarr
 
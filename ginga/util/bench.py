@@ -0,0 +1,471 @@
+#
+# bench.py -- headless rendering benchmarks for Ginga viewers.
+#
+# This is open-source software licensed under a BSD license.
+# Please see the file LICENSE.txt for details.
+#
+"""
+Benchmark the rendering of Ginga viewers without a display.
+
+The benchmarks drive the mock viewer (`ginga.mockw.ImageViewMock`) and the
+PIL viewer (`ginga.pilw.ImageViewPil`) through typical interaction
+sequences on synthetic images: setting the image, zooming to fit, panning,
+zooming in and out, rotating, changing the color and intensity maps,
+dragging the cut levels and adding overlays.  For each operation the
+latency (mean, median, 90th percentile and maximum, in milliseconds)
+and the throughput (operations per second) are reported.
+
+Results can be saved as a baseline and compared against later, e.g.
+before and after a change to `trcalc`, `RGBMap` or `ImageView`::
+
+    $ python -m ginga.util.bench --save=before.json
+    ... make changes ...
+    $ python -m ginga.util.bench --compare=before.json
+
+Larger or more image sizes and types can be selected::
+
+    $ python -m ginga.util.bench --sizes=1024,4096,16384 --types=float32,int16
+
+.. note:: A 16k x 16k float32 image takes 1 GB of memory.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import time
+import json
+import platform
+from optparse import OptionParser
+
+import numpy
+
+from ginga import AstroImage, cmap, imap
+from ginga.misc import log
+from ginga.canvas.CanvasObject import get_canvas_types
+
+try:
+    from ginga.version import version
+except ImportError:
+    version = 'unknown'
+
+# default benchmark parameters
+default_sizes = (1024, 4096)
+default_types = ('float32', 'int16')
+default_viewers = ('mock', 'pil')
+default_window = (800, 600)
+default_repeat = 20
+
+
+def get_viewer(name, logger, width, height):
+    """
+    Make a headless viewer of kind `name` ('mock' or 'pil') with a window
+    of `width` x `height` pixels.  Redraws are not deferred, so every
+    operation on the viewer renders before returning.
+    """
+    if name == 'mock':
+        from ginga.mockw.ImageViewMock import ImageViewMock
+        viewer = ImageViewMock(logger=logger)
+    elif name == 'pil':
+        from ginga.pilw.ImageViewPil import ImageViewPil
+        viewer = ImageViewPil(logger=logger)
+    else:
+        raise ValueError("No viewer of kind '%s'" % (name))
+
+    viewer.set_redraw_lag(0.0)
+    viewer.enable_autocuts('off')
+    viewer.configure_surface(width, height)
+    return viewer
+
+
+def make_image(size, dtype, logger):
+    """
+    Make a synthetic `size` x `size` image of type `dtype`, with smooth
+    structure and noise so that cut levels and color distributions behave
+    as they would on real data.
+    """
+    dtype = numpy.dtype(dtype)
+    rng = numpy.random.RandomState(size)
+    x = numpy.linspace(0.0, 8.0 * numpy.pi, size)
+    xs = numpy.sin(x) + rng.normal(0.0, 0.2, size)
+    ys = numpy.cos(0.7 * x) + rng.normal(0.0, 0.2, size)
+    data = numpy.add.outer(ys, xs).astype(numpy.float32)
+
+    if dtype.kind in ('i', 'u'):
+        info = numpy.iinfo(dtype)
+        lo, hi = max(info.min, -1000), min(info.max, 30000)
+        data = ((data + 2.5) * ((hi - lo) / 5.0) + lo).astype(dtype)
+    else:
+        data = data.astype(dtype)
+
+    image = AstroImage.AstroImage(logger=logger)
+    image.set_data(data)
+    return image
+
+
+class Benchmark(object):
+    """
+    Runs the operation sequences on one viewer and image and collects the
+    time taken by each call.
+    """
+
+    def __init__(self, viewer, image, repeat=default_repeat):
+        self.viewer = viewer
+        self.image = image
+        self.repeat = repeat
+        self.dc = get_canvas_types()
+
+    def _run(self, steps, setup=None):
+        """
+        Time each (function, args) pair in `steps`, calling `setup` (if
+        given) untimed before each one.  Returns the list of times and the
+        mean time of each rendering stage over the steps.
+        """
+        viewer = self.viewer
+        viewer.reset_render_stats()
+        times = []
+        for fn, args in steps:
+            if setup is not None:
+                with viewer.suppress_redraw:
+                    setup()
+            time_start = time.time()
+            fn(*args)
+            times.append(time.time() - time_start)
+
+        stages = dict([(stage, d['mean'])
+                       for stage, d in viewer.get_render_stats(()).items()])
+        return times, stages
+
+    def bench_set_image(self):
+        viewer = self.viewer
+        return self._run([(viewer.set_image, (self.image,))] * self.repeat)
+
+    def bench_zoom_fit(self):
+        viewer = self.viewer
+        # zoom away before each zoom_fit, so that it has something to do
+        return self._run([(viewer.zoom_fit, ())] * self.repeat,
+                         setup=lambda: viewer.zoom_to(1))
+
+    def bench_pan_drag(self):
+        viewer = self.viewer
+        viewer.zoom_to(1)
+        ctr_x, ctr_y = viewer.get_pan()
+        steps = [(viewer.set_pan, (ctr_x + i * 7, ctr_y + i * 5))
+                 for i in range(self.repeat)]
+        return self._run(steps)
+
+    def bench_zoom_step(self):
+        viewer = self.viewer
+        viewer.zoom_to(1)
+        steps = [(viewer.zoom_in, ()), (viewer.zoom_out, ())] * (
+            (self.repeat + 1) // 2)
+        return self._run(steps[:self.repeat])
+
+    def bench_rotate(self):
+        viewer = self.viewer
+        viewer.zoom_fit()
+        steps = [(viewer.rotate, (i * 7.5 + 3.0,))
+                 for i in range(self.repeat)]
+        res = self._run(steps)
+        viewer.rotate(0.0)
+        return res
+
+    def bench_cmap(self):
+        viewer = self.viewer
+        names = cmap.get_names()
+        steps = [(viewer.set_color_map, (names[i % len(names)],))
+                 for i in range(self.repeat)]
+        return self._run(steps)
+
+    def bench_imap(self):
+        viewer = self.viewer
+        names = imap.get_names()
+        steps = [(viewer.set_intensity_map, (names[i % len(names)],))
+                 for i in range(self.repeat)]
+        res = self._run(steps)
+        viewer.set_intensity_map('ramp')
+        return res
+
+    def bench_cut_drag(self):
+        viewer = self.viewer
+        viewer.auto_levels()
+        loval, hival = viewer.get_cut_levels()
+        delta = (hival - loval) / (2.0 * self.repeat)
+        steps = [(viewer.cut_levels, (loval + i * delta, hival - i * delta))
+                 for i in range(self.repeat)]
+        return self._run(steps)
+
+    def bench_overlay(self):
+        viewer = self.viewer
+        canvas = viewer.get_canvas()
+        wd, ht = self.image.get_size()
+        rng = numpy.random.RandomState(0)
+        objs = []
+        for i in range(self.repeat):
+            x, y = rng.uniform(0, wd), rng.uniform(0, ht)
+            kind = i % 3
+            if kind == 0:
+                obj = self.dc.Circle(x, y, wd * 0.02, color='green')
+            elif kind == 1:
+                obj = self.dc.Box(x, y, wd * 0.03, ht * 0.01, color='cyan',
+                                  fill=True, fillalpha=0.4)
+            else:
+                obj = self.dc.Text(x, y, text="Object %d" % (i),
+                                   color='yellow')
+            objs.append(obj)
+
+        tags = []
+        steps = [(self._add_overlay, (canvas, obj, tags)) for obj in objs]
+        res = self._run(steps)
+        canvas.delete_objects_by_tag(tags, redraw=False)
+        return res
+
+    def _add_overlay(self, canvas, obj, tags):
+        tags.append(canvas.add(obj, redraw=True))
+
+    def run(self, operations=None):
+        """
+        Run the benchmarks named in `operations` (all by default), in order.
+        Returns a list of (operation, times, stages) tuples.
+        """
+        if operations is None:
+            operations = operation_names
+
+        # get the viewer into a known state
+        viewer = self.viewer
+        viewer.set_image(self.image)
+        viewer.zoom_fit()
+
+        res = []
+        for name in operations:
+            method = getattr(self, 'bench_' + name)
+            times, stages = method()
+            res.append((name, times, stages))
+        return res
+
+
+operation_names = ['set_image', 'zoom_fit', 'pan_drag', 'zoom_step',
+                   'rotate', 'cmap', 'imap', 'cut_drag', 'overlay']
+
+
+def summarize(times, npixels):
+    """
+    Calculate the latency and throughput statistics for one operation from
+    the list of the times of its calls, for a window of `npixels` pixels.
+    """
+    arr = numpy.array(times)
+    total = arr.sum()
+    if total > 0.0:
+        ops_per_sec = len(arr) / total
+    else:
+        ops_per_sec = float('inf')
+    return dict(count=len(arr),
+                mean_ms=float(arr.mean() * 1000.0),
+                p50_ms=float(numpy.percentile(arr, 50) * 1000.0),
+                p90_ms=float(numpy.percentile(arr, 90) * 1000.0),
+                max_ms=float(arr.max() * 1000.0),
+                ops_per_sec=float(ops_per_sec),
+                mpix_per_sec=float(ops_per_sec * npixels / 1.0e6))
+
+
+def run_benchmarks(viewers=default_viewers, sizes=default_sizes,
+                   types=default_types, operations=None,
+                   window=default_window, repeat=default_repeat,
+                   logger=None, callback=None):
+    """
+    Run the benchmarks for every combination of viewer kind, image size
+    and image type.
+
+    Returns a dict with the versions and parameters of the run ('info')
+    and a list of result dicts ('results'), each with the viewer kind,
+    image size and type, operation, latency statistics (see `summarize`)
+    and the mean time of each rendering stage ('stages').  If `callback`
+    is not None it is called with each result dict as it becomes available.
+    """
+    if logger is None:
+        logger = log.get_logger(null=True)
+    if operations is None:
+        operations = operation_names
+    width, height = window
+
+    info = dict(ginga=version, numpy=numpy.__version__,
+                python=platform.python_version(),
+                platform=platform.platform(), machine=platform.machine(),
+                window=[width, height], repeat=repeat,
+                time=time.strftime('%Y-%m-%d %H:%M:%S'))
+    results = []
+
+    for size in sizes:
+        for dtype in types:
+            image = make_image(size, dtype, logger)
+            for kind in viewers:
+                viewer = get_viewer(kind, logger, width, height)
+                bench = Benchmark(viewer, image, repeat=repeat)
+                for name, times, stages in bench.run(operations):
+                    d = dict(viewer=kind, size=size, dtype=dtype,
+                             operation=name,
+                             stages=dict([(stage, secs * 1000.0)
+                                          for stage, secs in stages.items()]))
+                    d.update(summarize(times, width * height))
+                    results.append(d)
+                    if callback is not None:
+                        callback(d)
+            image = None
+
+    return dict(info=info, results=results)
+
+
+def _key(d):
+    return (d['viewer'], d['size'], d['dtype'], d['operation'])
+
+
+def _ratio(base, d):
+    b = base.get(_key(d), None)
+    if (b is None) or (b['mean_ms'] <= 0.0):
+        return None
+    return d['mean_ms'] / b['mean_ms']
+
+
+def compare(baseline, current):
+    """
+    Compare two benchmark runs (as returned by `run_benchmarks`).
+    Returns a list of (result, ratio) pairs, one for each result in
+    `current` that is also in `baseline`, where `ratio` is the current
+    mean latency divided by the baseline mean latency (i.e. < 1 is faster).
+    """
+    base = dict([(_key(d), d) for d in baseline['results']])
+    res = [(d, _ratio(base, d)) for d in current['results']]
+    return [(d, ratio) for d, ratio in res if ratio is not None]
+
+
+def format_result(d, ratio=None, stages=False):
+    line = "%-5s %6d %-8s %-10s %9.2f %9.2f %9.2f %9.2f %9.1f %9.1f" % (
+        d['viewer'], d['size'], d['dtype'], d['operation'], d['mean_ms'],
+        d['p50_ms'], d['p90_ms'], d['max_ms'], d['ops_per_sec'],
+        d['mpix_per_sec'])
+    if ratio is not None:
+        line += " %7.2fx" % (ratio)
+    if stages:
+        line += "  " + ' '.join(["%s=%.2f" % (stage, d['stages'][stage])
+                                 for stage in sorted(d['stages'].keys())
+                                 if stage != 'total'])
+    return line
+
+
+header = "%-5s %6s %-8s %-10s %9s %9s %9s %9s %9s %9s" % (
+    'view', 'size', 'type', 'operation', 'mean_ms', 'p50_ms', 'p90_ms',
+    'max_ms', 'ops/s', 'Mpix/s')
+
+
+def load_results(filepath):
+    with open(filepath, 'r') as in_f:
+        return json.load(in_f)
+
+
+def save_results(results, filepath):
+    with open(filepath, 'w') as out_f:
+        json.dump(results, out_f, indent=1, sort_keys=True)
+
+
+def main(options, args):
+
+    # logging costs time, so only log if asked to
+    null = (options.logfile is None) and (not options.logstderr)
+    logger = log.get_logger("bench", null=null, options=options)
+
+    sizes = [int(size) for size in options.sizes.split(',')]
+    types = options.types.split(',')
+    viewers = options.viewers.split(',')
+    operations = None
+    if options.operations is not None:
+        operations = options.operations.split(',')
+    width, height = [int(n) for n in options.geometry.split('x')]
+
+    baseline = None
+    if options.compare is not None:
+        baseline = load_results(options.compare)
+        base = dict([(_key(d), d) for d in baseline['results']])
+        print("comparing with %s (ginga %s, numpy %s, python %s)" % (
+            options.compare, baseline['info']['ginga'],
+            baseline['info']['numpy'], baseline['info']['python']))
+
+    print(header + ('    ratio' if baseline is not None else ''))
+
+    def _print_result(d):
+        ratio = None
+        if baseline is not None:
+            ratio = _ratio(base, d)
+        print(format_result(d, ratio=ratio, stages=options.stages))
+        sys.stdout.flush()
+
+    res = run_benchmarks(viewers=viewers, sizes=sizes, types=types,
+                         operations=operations, window=(width, height),
+                         repeat=options.repeat, logger=logger,
+                         callback=_print_result)
+
+    if options.save is not None:
+        save_results(res, options.save)
+        print("results saved to %s" % (options.save))
+
+
+def _main():
+    """Run from command line."""
+    usage = "usage: %prog [options]"
+    optprs = OptionParser(usage=usage, version=version)
+
+    optprs.add_option("--compare", dest="compare", metavar="FILE",
+                      default=None,
+                      help="Compare with the baseline results in FILE")
+    optprs.add_option("--debug", dest="debug", default=False,
+                      action="store_true",
+                      help="Enter the pdb debugger on main()")
+    optprs.add_option("--geometry", dest="geometry", metavar="WDxHT",
+                      default="%dx%d" % default_window,
+                      help="Use a window of WDxHT pixels")
+    optprs.add_option("--operations", dest="operations", metavar="LIST",
+                      default=None,
+                      help="Run only the comma separated operations in LIST "
+                      "(from %s)" % (','.join(operation_names)))
+    optprs.add_option("--profile", dest="profile", action="store_true",
+                      default=False,
+                      help="Run the profiler on main()")
+    optprs.add_option("--repeat", dest="repeat", type="int",
+                      default=default_repeat, metavar="N",
+                      help="Time N calls of each operation")
+    optprs.add_option("--save", dest="save", metavar="FILE", default=None,
+                      help="Save the results to FILE as a baseline")
+    optprs.add_option("--sizes", dest="sizes", metavar="LIST",
+                      default=','.join(map(str, default_sizes)),
+                      help="Comma separated list of image sizes (square)")
+    optprs.add_option("--stages", dest="stages", action="store_true",
+                      default=False,
+                      help="Show the mean time (ms) of each rendering stage")
+    optprs.add_option("--types", dest="types", metavar="LIST",
+                      default=','.join(default_types),
+                      help="Comma separated list of image data types")
+    optprs.add_option("--viewers", dest="viewers", metavar="LIST",
+                      default=','.join(default_viewers),
+                      help="Comma separated list of viewers (mock,pil)")
+    log.addlogopts(optprs)
+
+    (options, args) = optprs.parse_args(sys.argv[1:])
+
+    # Are we debugging this?
+    if options.debug:
+        import pdb
+
+        pdb.run('main(options, args)')
+
+    # Are we profiling this?
+    elif options.profile:
+        import profile
+
+        print("%s profile:" % sys.argv[0])
+        profile.run('main(options, args)')
+
+    else:
+        main(options, args)
+
+
+if __name__ == '__main__':
+    _main()
+
+#END